@@ -0,0 +1,262 @@
+# Times startup, surface builds and frame rendering and prints the results as JSON, e.g.
+#   QT_QPA_PLATFORM=offscreen LIBGL_ALWAYS_SOFTWARE=1 python benchmarks/run_benchmarks.py -o results.json
+# Frame benchmarks need an OpenGL context (Mesa llvmpipe is enough); without one they are reported as
+# skipped and the CPU-side benchmarks still run.
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+from PyQt5.QtCore import PYQT_VERSION_STR, QT_VERSION_STR
+from PyQt5.QtWidgets import QApplication
+
+from visualization_3d_widget.gl_options import PRODUCTION_MODE_VARIABLE
+from visualization_3d_widget.offscreen import OffscreenRenderer
+from visualization_3d_widget.surface_mesh import SurfaceMesh
+from visualization_3d_widget.visualization_3d_widget import Visualization3DWidget
+
+SEED = 0
+DEFAULT_RESOLUTIONS = (100, 250, 500, 1000)
+DEFAULT_CONSTRAINT_COUNTS = (0, 1, 3)
+DEFAULT_PATH_LENGTHS = (10000, 100000)
+DEFAULT_REPEATS = 5
+DEFAULT_FRAMES = 30
+FRAME_SIZE = (800, 600)
+STARTUP_SCRIPT = '''
+import sys
+import time
+start = time.perf_counter()
+import visualization_3d_widget.plugin
+plugin = time.perf_counter()
+import visualization_3d_widget.visualization_3d_widget as module
+imported = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+constructed = time.perf_counter()
+module.Visualization3DWidget()
+print(plugin - start, imported - plugin, time.perf_counter() - constructed)
+'''
+
+
+def rosenbrock(x, y):
+    return (1 - x) ** 2 + 100 * (y - x ** 2) ** 2
+
+
+def rastrigin(x, y):
+    return 20 + x ** 2 - 10 * np.cos(2 * np.pi * x) + y ** 2 - 10 * np.cos(2 * np.pi * y)
+
+
+def himmelblau(x, y):
+    return (x ** 2 + y - 11) ** 2 + (x + y ** 2 - 7) ** 2
+
+
+FUNCTIONS = {'rosenbrock': rosenbrock, 'rastrigin': rastrigin, 'himmelblau': himmelblau}
+
+
+def disk(x, y):
+    return x ** 2 + y ** 2 - 64
+
+
+def half_plane(x, y):
+    return x + y - 6
+
+
+def band(x, y):
+    return np.abs(x - y) - 8
+
+
+CONSTRAINTS = (disk, half_plane, band)
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'median': statistics.median(ordered),
+        'mean': statistics.fmean(ordered),
+        'min': ordered[0],
+        'max': ordered[-1],
+        'p95': ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        'samples': len(ordered),
+    }
+
+
+def timed(function, repeats, setup=None):
+    samples = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def new_widget():
+    widget = Visualization3DWidget()
+    widget.resize(*FRAME_SIZE)
+    return widget
+
+
+def configure(widget, function, resolution, constraint_count):
+    with widget.batch_update():
+        widget.clear_constraints()
+        widget.set_resolution(resolution)
+        widget.set_function(function)
+        for constraint in CONSTRAINTS[:constraint_count]:
+            widget.add_constraint(constraint)
+
+
+def startup_benchmarks(repeats):
+    # Every sample is a fresh interpreter, since imports are only paid once per process.
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = {}
+    for mode, production in (('default', '0'), ('production', '1')):
+        samples = []
+        for _ in range(repeats):
+            environment = dict(os.environ, PYTHONPATH=root, **{PRODUCTION_MODE_VARIABLE: production})
+            output = subprocess.run([sys.executable, '-c', STARTUP_SCRIPT], capture_output=True, text=True, cwd=root,
+                                    env=environment, check=True).stdout
+            samples.append([float(value) for value in output.split()])
+        results[mode] = {name: summarize([sample[index] for sample in samples])
+                         for index, name in enumerate(('plugin_import', 'widget_import', 'construction'))}
+        print(f"startup {mode}: {results[mode]['widget_import']['median']:.3f} s", file=sys.stderr)
+    return results
+
+
+def build_benchmarks(widget, resolutions, constraint_counts, repeats):
+    # The cache is cleared before every run so each one samples the function from scratch.
+    results = []
+    for name, function in FUNCTIONS.items():
+        for resolution in resolutions:
+            for constraint_count in constraint_counts:
+                configure(widget, function, resolution, constraint_count)
+                build = timed(widget.build_objective_function_data, repeats, widget.clear_surface_cache)
+                surface = widget.surface
+                meshes = {}
+                for shaded in (False, True):
+                    meshes['shaded' if shaded else 'fixed_function'] = timed(
+                        lambda: widget.fill_surface_mesh(SurfaceMesh(), surface, shaded), repeats)
+                results.append({
+                    'function': name,
+                    'resolution': resolution,
+                    'constraints': constraint_count,
+                    'build_seconds': build,
+                    'mesh_seconds': meshes,
+                    'surface_bytes': surface.nbytes,
+                    'vertices': surface.vertex_count,
+                })
+                print(f"build {name} {resolution} {constraint_count}: {build['median']:.4f} s", file=sys.stderr)
+    return results
+
+
+def frame_benchmarks(widget, resolutions, path_lengths, frames):
+    # Full scene: grid, axes with ticks and numbers, constraint boundaries and an optimization path.
+    try:
+        renderer = OffscreenRenderer(widget, *FRAME_SIZE)
+    except RuntimeError as error:
+        return {'skipped': str(error)}
+    from OpenGL.GL import GL_RENDERER, GL_VERSION, glFinish, glGetString
+    results = {
+        'renderer': glGetString(GL_RENDERER).decode(),
+        'version': glGetString(GL_VERSION).decode(),
+        'frames': [],
+    }
+    rng = np.random.default_rng(SEED)
+    with renderer:
+        for resolution in resolutions:
+            for path_length in path_lengths:
+                for use_shaders in (False, True):
+                    configure(widget, rosenbrock, resolution, len(CONSTRAINTS))
+                    widget.set_use_shaders(use_shaders)
+                    widget.set_grid_visible(True)
+                    widget.set_axes_visible(True)
+                    widget.set_axis_ticks_and_numbers_visible(True)
+                    widget.set_show_constraints(True)
+                    widget.update_optimization_path(np.cumsum(rng.normal(scale=0.05, size=(path_length, 2)), axis=0))
+
+                    def frame():
+                        renderer.render_scene()
+                        glFinish()
+
+                    # The first frame uploads the buffers and is reported on its own.
+                    renderer.make_current()
+                    first = timed(frame, 1)
+                    steady = timed(frame, frames)
+                    results['frames'].append({
+                        'resolution': resolution,
+                        'path_points': path_length,
+                        'shaders': use_shaders,
+                        'first_frame_seconds': first,
+                        'frame_seconds': steady,
+                    })
+                    print(f"frame {resolution} {path_length} shaders={use_shaders}: {steady['median'] * 1000:.2f} ms",
+                          file=sys.stderr)
+    return results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'qt': QT_VERSION_STR,
+        'pyqt': PYQT_VERSION_STR,
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+        'qpa_platform': os.environ.get('QT_QPA_PLATFORM'),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark surface builds and frame rendering.")
+    parser.add_argument('-o', '--output', help="write the JSON here instead of stdout")
+    parser.add_argument('--resolutions', type=int, nargs='+', default=DEFAULT_RESOLUTIONS)
+    parser.add_argument('--constraints', type=int, nargs='+', default=DEFAULT_CONSTRAINT_COUNTS,
+                        help=f"numbers of constraints, at most {len(CONSTRAINTS)}")
+    parser.add_argument('--path-lengths', type=int, nargs='+', default=DEFAULT_PATH_LENGTHS)
+    parser.add_argument('--repeats', type=int, default=DEFAULT_REPEATS)
+    parser.add_argument('--frames', type=int, default=DEFAULT_FRAMES)
+    parser.add_argument('--skip-frames', action='store_true', help="only run the CPU-side benchmarks")
+    arguments = parser.parse_args()
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    widget = new_widget()
+    results = {
+        'environment': environment(),
+        'settings': {
+            'seed': SEED,
+            'repeats': arguments.repeats,
+            'frames': arguments.frames,
+            'frame_size': FRAME_SIZE,
+        },
+        'startup': startup_benchmarks(arguments.repeats),
+        'build': build_benchmarks(widget, arguments.resolutions, arguments.constraints, arguments.repeats),
+    }
+    if not arguments.skip_frames:
+        results['render'] = frame_benchmarks(widget, arguments.resolutions, arguments.path_lengths, arguments.frames)
+    output = json.dumps(results, indent=2)
+    if arguments.output:
+        with open(arguments.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+    widget.deleteLater()
+    app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def app():
+    from PyQt5.QtWidgets import QApplication
+    return QApplication.instance() or QApplication([])
+
+
+@pytest.fixture
+def widget(app):
+    # Nothing here needs a GL context until the widget is painted.
+    from visualization_3d_widget.visualization_3d_widget import Visualization3DWidget
+    widget = Visualization3DWidget()
+    yield widget
+    widget.wait_for_surface()
+    widget.deleteLater()
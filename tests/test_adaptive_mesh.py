@@ -0,0 +1,68 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from visualization_3d_widget.adaptive_mesh import adaptive_tessellation
+
+
+def peak(x, y):
+    # A narrow bump next to flat regions, so neighbouring cells end up at very different depths.
+    return np.exp(-40 * ((x - 0.3) ** 2 + (y + 0.2) ** 2))
+
+
+@pytest.fixture(scope='module')
+def surface():
+    return adaptive_tessellation(peak, [], (-1, 1), (-1, 1), base_cells=4, max_depth=5, tolerance=1e-3)
+
+
+def triangles(surface):
+    return surface.indices.reshape(-1, 3)
+
+
+def triangle_areas(surface):
+    a, b, c = (np.stack((surface.xs, surface.ys), axis=-1)[triangles(surface)[:, k]] for k in range(3))
+    (ux, uy), (vx, vy) = (b - a).T, (c - a).T
+    return 0.5 * np.abs(ux * vy - uy * vx)
+
+
+def edge_counts(surface):
+    edges = Counter()
+    for a, b, c in triangles(surface):
+        for edge in ((a, b), (b, c), (c, a)):
+            edges[tuple(sorted(edge))] += 1
+    return edges
+
+
+def test_surface_is_refined_around_the_peak(surface):
+    areas = triangle_areas(surface)
+    assert areas.max() / areas.min() >= 64
+    assert np.all(areas > 0)
+
+
+def test_mesh_has_no_cracks(surface):
+    # Every interior edge is shared by exactly two triangles; an edge with a hanging vertex in the middle
+    # would only belong to one.
+    for (a, b), count in edge_counts(surface).items():
+        assert count <= 2
+        if count == 1:
+            on_x = np.isclose(abs(surface.xs[a]), 1) and np.isclose(surface.xs[a], surface.xs[b])
+            on_y = np.isclose(abs(surface.ys[a]), 1) and np.isclose(surface.ys[a], surface.ys[b])
+            assert on_x or on_y
+
+
+def test_neighbouring_cells_differ_by_at_most_one_level(surface):
+    # Triangles cover 1/2, 1/4 or 1/8 of their cell, so with 2:1 balanced cells two triangles sharing an
+    # edge differ in area by at most 16x.
+    areas = triangle_areas(surface)
+    owners = {}
+    for index, (a, b, c) in enumerate(triangles(surface)):
+        for edge in ((a, b), (b, c), (c, a)):
+            owners.setdefault(tuple(sorted(edge)), []).append(index)
+    ratios = [max(areas[i], areas[j]) / min(areas[i], areas[j]) for i, j in
+              (pair for pair in owners.values() if len(pair) == 2)]
+    assert max(ratios) <= 16 + 1e-9
+
+
+def test_vertices_are_sampled_function_values(surface):
+    np.testing.assert_allclose(surface.z_values, peak(surface.xs, surface.ys))
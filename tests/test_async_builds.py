@@ -0,0 +1,93 @@
+import threading
+
+import numpy as np
+import pytest
+
+from visualization_3d_widget.surface_builder import SurfaceBuildJob, SurfaceBuildSignals
+from visualization_3d_widget.surface_sampling import BuildCancelled
+
+
+def saddle(x, y):
+    return x * x - y * y
+
+
+def test_builds_are_synchronous_by_default(widget):
+    widget.set_resolution(64)
+    widget.set_function(saddle)
+    assert widget.surface.resolution == 64
+    assert (widget.z_min, widget.z_max) == (widget.surface.z_min, widget.surface.z_max)
+    strips = widget.objective_function_data
+    assert strips and len(strips) == 63
+    vertex, color = strips[0][0]
+    assert len(vertex) == 3 and len(color) == 3
+
+
+def test_adaptive_surfaces_are_exported_as_strips(widget):
+    widget.set_tessellation_mode('adaptive')
+    widget.set_adaptive_tessellation(base_cells=4, max_depth=2)
+    widget.set_function(saddle)
+    strips = widget.objective_function_data
+    assert strips and len(strips) == len(widget.surface.indices) // 3
+    assert all(len(strip) == 4 for strip in strips)
+
+
+def test_async_build_shows_every_level_and_finishes(widget):
+    progress = []
+    finished = []
+    widget.surface_build_progress.connect(lambda *args: progress.append(args))
+    widget.surface_build_finished.connect(finished.append)
+    widget.set_async_surface_builds(True)
+    widget.set_resolution(256)
+    widget.set_function(saddle)
+    assert widget.wait_for_surface(timeout=60)
+    assert [args[2] for args in progress] == [32, 128, 256]
+    assert len(finished) == 1
+    assert widget.surface.resolution == 256
+
+
+def test_superseded_async_build_is_never_shown(widget):
+    shown = []
+    widget.set_async_surface_builds(True)
+    widget.set_resolution(128)
+    widget.set_function(saddle)
+    widget.set_function(lambda x, y: x + y)
+    widget.surface_build_progress.connect(lambda *args: shown.append(widget.surface))
+    assert widget.wait_for_surface(timeout=60)
+    X, Y = widget.surface.grid()
+    np.testing.assert_allclose(widget.surface.z_values, X + Y, rtol=1e-6, atol=1e-5)
+    for surface in shown:
+        X, Y = surface.grid()
+        np.testing.assert_allclose(surface.z_values, X + Y, rtol=1e-6, atol=1e-5)
+
+
+def test_async_build_failure_is_reported(widget):
+    errors = []
+    widget.surface_build_failed.connect(errors.append)
+    widget.set_async_surface_builds(True)
+    widget.set_function(lambda x, y: undefined_name)  # noqa: F821
+    assert widget.wait_for_surface(timeout=60)
+    assert len(errors) == 1 and isinstance(errors[0], NameError)
+
+
+def test_cancelled_job_stops_between_steps(app):
+    signals = SurfaceBuildSignals()
+    levels = []
+    signals.level_ready.connect(lambda *args: levels.append(args))
+    started = threading.Event()
+    job = None
+
+    def first(cancelled):
+        started.set()
+        job.cancel()
+        return 'first'
+
+    def second(cancelled):
+        if cancelled():
+            raise BuildCancelled()
+        pytest.fail("the job kept running after it was cancelled")
+
+    job = SurfaceBuildJob(signals, 0, [first, second])
+    job.run()
+    app.processEvents()
+    assert started.is_set()
+    assert levels == []
@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+
+from visualization_3d_widget.constraint_boundaries import constraint_boundary_segments, marching_squares
+
+CELL = np.array([0.0, 1.0])
+
+
+def edges_touched(segment):
+    # Which sides of the unit cell a segment's two end points lie on.
+    return {('x0' if x == 0 else 'x1' if x == 1 else 'y0' if y == 0 else 'y1') for x, y in segment}
+
+
+def test_saddle_with_center_below_cuts_off_the_corners_above():
+    values = np.array([[1.0, -1.5], [-1.5, 1.0]])
+    segments = marching_squares(CELL, CELL, values)
+    assert len(segments) == 2
+    assert sorted(sorted(edges_touched(segment)) for segment in segments) == [['x0', 'y0'], ['x1', 'y1']]
+
+
+def test_saddle_with_center_above_cuts_off_the_corners_below():
+    values = np.array([[1.5, -1.0], [-1.0, 1.5]])
+    segments = marching_squares(CELL, CELL, values)
+    assert len(segments) == 2
+    assert sorted(sorted(edges_touched(segment)) for segment in segments) == [['x0', 'y1'], ['x1', 'y0']]
+
+
+def test_crossings_are_interpolated_linearly():
+    values = np.array([[-1.0, -1.0], [3.0, 3.0]])
+    np.testing.assert_allclose(marching_squares(CELL, CELL, values), [[[0.25, 0.0], [0.25, 1.0]]])
+
+
+def test_cells_with_nan_corners_are_skipped():
+    values = np.array([[-1.0, np.nan], [3.0, 3.0]])
+    assert marching_squares(CELL, CELL, values).shape == (0, 2, 2)
+
+
+def test_circle_boundary_points_lie_on_the_circle():
+    segments = constraint_boundary_segments(lambda x, y: x ** 2 + y ** 2 - 4, (-3, 3), (-3, 3), 121)
+    radii = np.linalg.norm(segments.reshape(-1, 2), axis=1)
+    assert len(segments) > 100
+    np.testing.assert_allclose(radii, 2, atol=1e-2)
+
+
+def test_partially_defined_constraint_is_contoured_where_it_is_defined():
+    segments = constraint_boundary_segments(lambda x, y: math.sqrt(x) - 0.5, (-1, 1), (-1, 1), 41)
+    points = segments.reshape(-1, 2)
+    assert len(segments) == 40
+    np.testing.assert_allclose(points[:, 0], 0.25)
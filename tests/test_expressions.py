@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+
+from visualization_3d_widget.expressions import compile_constraint_expression, compile_expression
+
+
+def feasible(source, points):
+    constraint = compile_constraint_expression(source)
+    x, y = np.array(points, dtype=np.float64).T
+    return constraint(x, y) <= 0
+
+
+def test_comparison_is_rewritten_as_difference():
+    constraint = compile_constraint_expression('x**2 + y**2 <= 4')
+    np.testing.assert_allclose(constraint(np.array([1.0, 3.0]), np.array([0.0, 0.0])), [-3.0, 5.0])
+    np.testing.assert_allclose(compile_constraint_expression('x >= 1')(np.array([3.0]), np.array([0.0])), [-2.0])
+
+
+@pytest.mark.parametrize('source, expected', [
+    ('x**2 + y**2 <= 4 and x > 0', [True, False, False]),
+    ('not x > 0', [False, False, True]),
+    ('0 < x < 2', [True, False, False]),
+    ('x == 1', [True, False, False]),
+    ('x != 1', [False, True, True]),
+    ('x > 0 or y > 0', [True, True, False]),
+])
+def test_conditions_are_feasible_where_they_hold(source, expected):
+    np.testing.assert_array_equal(feasible(source, [(1, 0), (5, 0), (-1, 0)]), expected)
+
+
+def test_expression_equality_and_errors():
+    assert compile_expression('x + y') == compile_expression('x+y')
+    with pytest.raises(ValueError):
+        compile_expression('__import__("os")')
+    with pytest.raises(ValueError):
+        compile_expression('z + 1')
+
+
+def test_integer_constants_are_evaluated_as_floats():
+    expression = compile_expression('x + 9**9**9**9 - 7 // 2')
+    np.testing.assert_array_equal(expression(np.array([1.0]), np.array([0.0])), [np.inf])
+    np.testing.assert_allclose(compile_expression('2**-1 + x')(np.array([1.0]), np.array([0.0])), [1.5])
+
+
+@pytest.mark.parametrize('source', ['where(x > 0, 1)', 'sin(x, y)', 'atan2(x)', 'max(x, y, 1)', 'sqrt()', '1e999 * x',
+                                    '1' + '0' * 400])
+def test_invalid_calls_and_constants_are_rejected_when_compiled(source):
+    with pytest.raises(ValueError):
+        compile_expression(source)
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from visualization_3d_widget.height_fields import HeightField
+from visualization_3d_widget.surface_data import strided_indices
+
+
+def no_scan(self):
+    raise AssertionError("the whole array was scanned")
+
+
+def test_tiled_height_field_range_grows_with_loaded_tiles(widget, monkeypatch):
+    monkeypatch.setattr(HeightField, 'z_range', no_scan)
+    z_values = np.zeros((65, 65), dtype=np.float32)
+    z_values[1, 1] = 5.0
+    widget.set_tiled_surface_data(z_values, (0, 1), (0, 1), tile_size=16)
+    terrain = widget.terrain
+    assert widget.z_max == 0.0
+    child = terrain.children(terrain.root)[0]
+    while child[0] > 0:
+        child = terrain.children(child)[0]
+    widget.on_terrain_tile_loaded(terrain, child, terrain.load_tile(child))
+    assert (widget.z_min, widget.z_max) == (0.0, 5.0)
+
+
+def test_given_z_range_is_used(widget, monkeypatch):
+    monkeypatch.setattr(HeightField, 'z_range', no_scan)
+    widget.set_tiled_surface_data(np.zeros((33, 33)), (0, 1), (0, 1), tile_size=16, z_range=(-1, 2))
+    assert (widget.z_min, widget.z_max) == (-1.0, 2.0)
+
+
+def test_height_field_scans_range_by_default():
+    z_values = np.arange(12.0).reshape(3, 4)
+    mask = z_values < 10
+    assert HeightField(z_values, (0, 1), (0, 1), mask).z_range() == (0.0, 9.0)
+    with pytest.raises(ValueError):
+        HeightField(np.zeros(3), (0, 1), (0, 1))
+
+
+@pytest.mark.parametrize('size, max_resolution', [(2000, 1024), (2001, 1024), (10, 4), (5, 1024)])
+def test_surface_keeps_last_row_and_column(size, max_resolution):
+    z_values = np.add.outer(np.arange(size, dtype=np.float64), np.arange(size + 1, dtype=np.float64))
+    surface = HeightField(z_values, (0, 2), (-1, 1), z_values > 3).surface(max_resolution)
+    assert surface.x_values[-1] == 2 and surface.y_values[-1] == 1
+    assert surface.z_values[-1, -1] == z_values[-1, -1]
+    assert max(surface.shape) <= max(max_resolution, 2)
+    assert np.isnan(surface.z_values[0, 0])
+
+
+@pytest.mark.parametrize('size, max_resolution', [(1025, 1024), (2049, 1024), (2001, 1024), (10, 4)])
+def test_surface_only_copies_when_the_stride_misses_the_last_row(size, max_resolution):
+    z_values = np.add.outer(np.arange(size, dtype=np.float64), np.arange(size, dtype=np.float64))
+    field = HeightField(z_values, (0, 1), (0, 1))
+    step = field.step_for(max_resolution)
+    surface = field.surface(max_resolution)
+    assert np.shares_memory(surface.z_values, z_values) == ((size - 1) % step == 0)
+    expected = z_values[np.ix_(strided_indices(size, step), strided_indices(size, step))]
+    np.testing.assert_array_equal(surface.z_values, expected)
@@ -0,0 +1,26 @@
+import numpy as np
+
+from visualization_3d_widget.surface_data import SurfaceData, unique_nbytes
+
+
+def disk(x, y):
+    return x ** 2 + y ** 2 - 25
+
+
+def test_unique_nbytes_counts_shared_arrays_once():
+    values = np.arange(12, dtype=np.float32).reshape(3, 4)
+    surface = SurfaceData(np.arange(3.0), np.arange(4.0), values)
+    constrained = surface.with_constraint(disk, values > 5)
+    counted = set()
+    assert unique_nbytes([surface], counted) == surface.nbytes
+    assert unique_nbytes([constrained, surface.objective()], counted) == constrained.nbytes - surface.nbytes
+
+
+def test_memory_usage_does_not_count_cached_surface_twice(widget):
+    widget.set_resolution(300)
+    widget.set_function(lambda x, y: x * y)
+    widget.add_constraint(disk)
+    usage = widget.memory_usage()
+    assert usage['surface'] == widget.surface.nbytes
+    assert usage['surface'] + usage['surface_cache'] < 1.5 * widget.surface.nbytes
+    assert usage['total'] == sum(value for key, value in usage.items() if key not in ('total', 'gpu'))
@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from PyQt5.QtGui import QImage
+
+from visualization_3d_widget.offscreen import OffscreenRenderer, timeline_frames, write_image
+
+
+def offscreen_renderer(widget, width, height):
+    try:
+        return OffscreenRenderer(widget, width, height)
+    except RuntimeError as error:
+        pytest.skip(f"no offscreen OpenGL context: {error}")
+
+
+def test_timeline_frames_seek_every_step(widget):
+    widget.load_optimization_history(np.zeros((10, 2)))
+    positions = []
+    for setup in timeline_frames(widget, step=3):
+        setup()
+        positions.append(widget.get_timeline_position())
+    assert positions == [0, 3, 6, 9]
+
+
+def test_export_timeline_needs_a_loaded_history(widget, tmp_path):
+    with pytest.raises(RuntimeError):
+        widget.export_timeline(str(tmp_path / 'frame_{:04d}.png'), 64, 48)
+    widget.load_optimization_history(np.zeros((5, 2)))
+    widget.stop_timeline()
+    with pytest.raises(RuntimeError):
+        widget.export_timeline(str(tmp_path / 'frame_{:04d}.png'), 64, 48)
+    assert not list(tmp_path.iterdir())
+
+
+def test_write_image_round_trips(tmp_path):
+    pixels = np.zeros((6, 8, 4), dtype=np.uint8)
+    pixels[..., 3] = 255
+    pixels[0, :, 0] = 255
+    write_image(str(tmp_path / 'image.png'), pixels)
+    image = QImage(str(tmp_path / 'image.png')).convertToFormat(QImage.Format_RGBA8888)
+    assert (image.width(), image.height()) == (8, 6)
+    assert image.pixelColor(0, 0).red() == 255 and image.pixelColor(0, 5).red() == 0
+
+
+def test_renders_and_reads_back_frames(widget, tmp_path):
+    widget.set_function(lambda x, y: x * x + y * y)
+    with offscreen_renderer(widget, 64, 48) as renderer:
+        pixels = renderer.render()
+        paths = renderer.export_frames([lambda: None] * 2, str(tmp_path / 'frame_{}.png'))
+    assert pixels.shape == (48, 64, 4) and pixels.dtype == np.uint8
+    assert len(np.unique(pixels.reshape(-1, 4), axis=0)) > 1
+    assert all(QImage(path).size().width() == 64 for path in paths)
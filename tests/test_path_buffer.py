@@ -0,0 +1,44 @@
+import numpy as np
+
+from visualization_3d_widget.path_buffer import PathBuffer
+
+
+def points(start, count):
+    values = np.arange(start, start + count, dtype=np.float32)
+    return np.stack((values, -values, np.zeros(count, dtype=np.float32)), axis=-1)
+
+
+def test_growable_buffer_keeps_every_point():
+    buffer = PathBuffer(capacity=4)
+    buffer.append(points(0, 3))
+    buffer.append(points(3, 10))
+    assert len(buffer) == 13
+    np.testing.assert_array_equal(buffer.view(), points(0, 13))
+
+
+def test_ring_keeps_the_newest_points_in_one_contiguous_range():
+    buffer = PathBuffer(max_length=5)
+    appended = 0
+    for count in (3, 4, 1, 12, 5, 2):
+        buffer.append(points(appended, count))
+        appended += count
+        length = min(appended, 5)
+        assert len(buffer) == length
+        np.testing.assert_array_equal(buffer.view(), points(appended - length, length))
+        assert 0 <= buffer.start < 5
+
+
+def test_ring_halves_stay_mirrored_after_set_z():
+    buffer = PathBuffer(max_length=5)
+    buffer.append(points(0, 8))
+    z_values = np.arange(5, dtype=np.float32) + 10
+    buffer.set_z(z_values)
+    np.testing.assert_array_equal(buffer.view()[:, 2], z_values)
+    np.testing.assert_array_equal(buffer.vertices[:5], buffer.vertices[5:])
+
+
+def test_set_max_length_keeps_the_newest_points():
+    buffer = PathBuffer()
+    buffer.append(points(0, 20))
+    buffer.set_max_length(6)
+    np.testing.assert_array_equal(buffer.view(), points(14, 6))
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from visualization_3d_widget.picking import GridPicker, TrianglePicker
+from visualization_3d_widget.surface_data import SurfaceData
+
+
+@pytest.fixture(scope='module')
+def surface():
+    x_values = np.linspace(-2, 2, 37)
+    y_values = np.linspace(-3, 3, 41)
+    X, Y = np.meshgrid(x_values, y_values, indexing='ij')
+    z_values = (np.sin(2 * X) * np.cos(Y) + 0.1 * X * Y).astype(np.float32)
+    z_values[10:14, 20:30] = np.nan
+    return SurfaceData(x_values, y_values, z_values)
+
+
+def test_grid_picker_matches_brute_force(surface):
+    grid = GridPicker(surface.x_values, surface.y_values, surface.z_values)
+    brute = TrianglePicker(surface.raw_vertices().reshape(-1, 3), surface.triangle_indices())
+    rng = np.random.default_rng(0)
+    hits = 0
+    for _ in range(100):
+        origin = np.array((rng.uniform(-4, 4), rng.uniform(-5, 5), rng.uniform(3, 6)))
+        target = np.array((rng.uniform(-2, 2), rng.uniform(-3, 3), rng.uniform(-1, 1)))
+        expected = brute.pick(origin, target - origin)
+        actual = grid.pick(origin, target - origin)
+        if expected is None:
+            assert actual is None
+        else:
+            hits += 1
+            np.testing.assert_allclose(actual, expected, atol=1e-5)
+    assert hits > 50
+
+
+def test_rays_through_holes_and_away_from_the_surface_miss(surface):
+    grid = GridPicker(surface.x_values, surface.y_values, surface.z_values)
+    x, y = surface.x_values[11], surface.y_values[25]
+    assert grid.pick((x, y, 10), (0, 0, -1)) is None
+    assert grid.pick((0, 0, 10), (0, 0, 1)) is None
@@ -0,0 +1,79 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from visualization_3d_widget.profiler import FrameProfiler
+
+REPOSITORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+NO_CONTEXT = 77
+
+# PyOpenGL picks its platform when it is first imported, so the GPU test runs in its own process with a
+# surfaceless EGL context (e.g. Mesa llvmpipe), which needs no display or Qt platform plugin.
+GPU_TIMING_SCRIPT = textwrap.dedent(f'''
+    import ctypes
+    import sys
+
+    try:
+        from OpenGL import EGL
+        display = EGL.eglGetDisplay(EGL.EGL_DEFAULT_DISPLAY)
+        if not EGL.eglInitialize(display, None, None):
+            sys.exit({NO_CONTEXT})
+        attributes = (EGL.EGLint * 5)(EGL.EGL_SURFACE_TYPE, EGL.EGL_PBUFFER_BIT, EGL.EGL_RENDERABLE_TYPE,
+                                      EGL.EGL_OPENGL_BIT, EGL.EGL_NONE)
+        config, count = EGL.EGLConfig(), EGL.EGLint()
+        if not EGL.eglChooseConfig(display, attributes, ctypes.pointer(config), 1, ctypes.pointer(count)) \\
+                or not count.value or not EGL.eglBindAPI(EGL.EGL_OPENGL_API):
+            sys.exit({NO_CONTEXT})
+        context = EGL.eglCreateContext(display, config, EGL.EGL_NO_CONTEXT, None)
+        if not context or not EGL.eglMakeCurrent(display, EGL.EGL_NO_SURFACE, EGL.EGL_NO_SURFACE, context):
+            sys.exit({NO_CONTEXT})
+    except Exception:
+        sys.exit({NO_CONTEXT})
+
+    from OpenGL.GL import glFinish, glFlush
+    from visualization_3d_widget.profiler import FrameProfiler
+
+    profiler = FrameProfiler()
+    profiler.gpu_timing = True
+    for frame in range(3):
+        profiler.begin_frame()
+        with profiler.stage('flush'):
+            glFlush()
+        profiler.end_frame()
+    glFinish()
+    profiler.begin_frame()
+    assert not profiler.pending_queries, profiler.pending_queries
+    assert len(profiler.gpu_times['flush']) == 3
+    assert all(0 <= seconds < 1 for seconds in profiler.gpu_times['flush'])
+    assert profiler.stats()['stages']['flush']['gpu'] is not None
+    profiler.release()
+''')
+
+
+def test_gpu_stage_times_are_read_back():
+    environment = dict(os.environ, PYOPENGL_PLATFORM='egl', PYTHONPATH=REPOSITORY)
+    environment.setdefault('EGL_PLATFORM', 'surfaceless')
+    result = subprocess.run([sys.executable, '-c', GPU_TIMING_SCRIPT], env=environment, capture_output=True,
+                            text=True, timeout=120)
+    if result.returncode == NO_CONTEXT:
+        pytest.skip("no EGL OpenGL context")
+    assert result.returncode == 0, result.stderr
+
+
+def test_cpu_stages_and_events_are_summarized():
+    profiler = FrameProfiler(window=4)
+    profiler.gpu_timing = False
+    for frame in range(6):
+        profiler.begin_frame()
+        with profiler.stage('surface'):
+            pass
+        profiler.end_frame()
+    profiler.record_event('surface_build', 0.5)
+    stats = profiler.stats()
+    assert stats['frames'] == 4 and stats['frame_rate'] > 0
+    assert stats['stages']['surface']['gpu'] is None
+    assert stats['events']['surface_build']['count'] == 1
+    assert profiler.overlay_lines()
@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from visualization_3d_widget.surface_builder import DEFAULT_PREVIEW_RESOLUTION, progressive_levels
+
+
+@pytest.mark.parametrize('resolution', [10, 32, 63, 64, 250, 256, 512, 1000, 1024, 4096])
+def test_progressive_levels_end_at_the_resolution_and_stay_cheap(resolution):
+    levels = progressive_levels(resolution)
+    assert levels[-1] == resolution
+    assert levels == sorted(set(levels))
+    previews = sum(level ** 2 for level in levels[:-1])
+    assert previews <= 0.27 * resolution ** 2
+    if resolution >= 2 * DEFAULT_PREVIEW_RESOLUTION:
+        assert levels[0] == DEFAULT_PREVIEW_RESOLUTION
+
+
+def test_progressive_levels_without_previews():
+    assert progressive_levels(300, preview_resolution=0) == [300]
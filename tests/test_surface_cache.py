@@ -0,0 +1,86 @@
+from visualization_3d_widget.surface_cache import SurfaceCache, surface_cache_key
+
+
+class Entry:
+    def __init__(self, nbytes):
+        self.nbytes = nbytes
+
+
+class CountingFunction:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, x, y):
+        self.calls += 1
+        return x * x + y * y
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = SurfaceCache(max_bytes=300)
+    cache.put('a', Entry(100))
+    cache.put('b', Entry(100))
+    cache.put('c', Entry(100))
+    assert cache.get('a') is not None
+    cache.put('d', Entry(100))
+    assert cache.get('b') is None
+    assert set(cache.entries) == {'a', 'c', 'd'}
+    assert cache.current_bytes == 300
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (1, 1, 1)
+
+
+def test_replacing_and_oversized_entries_keep_the_byte_count():
+    cache = SurfaceCache(max_bytes=100)
+    cache.put('a', Entry(60))
+    cache.put('a', Entry(40))
+    assert cache.current_bytes == 40
+    cache.put('b', Entry(101))
+    assert 'b' not in cache.entries and cache.current_bytes == 40
+    cache.set_max_bytes(10)
+    assert len(cache) == 0 and cache.current_bytes == 0
+
+
+def test_unhashable_keys_are_never_cached():
+    cache = SurfaceCache()
+    assert surface_cache_key(lambda x, y: x, [[1]], (-1, 1), (-1, 1), 8) is None
+    assert surface_cache_key(lambda x, y: x, (), ([-1], 1), (-1, 1), 8) is None
+    cache.put(None, Entry(1))
+    assert len(cache) == 0 and cache.get(None) is None
+
+
+def test_revisited_resolution_does_not_resample_the_objective(widget):
+    function = CountingFunction()
+    widget.set_resolution(32)
+    widget.set_function(function)
+    widget.set_resolution(48)
+    calls = function.calls
+    widget.set_resolution(32)
+    assert function.calls == calls
+    assert widget.surface.resolution == 32
+    assert widget.get_surface_cache_stats()['hits'] >= 1
+
+
+def test_constraint_masks_are_reused_independently(widget):
+    function = CountingFunction()
+    constraint = CountingFunction()
+    widget.set_resolution(32)
+    widget.set_function(function)
+    widget.add_constraint(constraint)
+    widget.clear_constraints()
+    widget.add_constraint(constraint)
+    calls = function.calls, constraint.calls
+    assert widget.surface.constraint_masks
+    widget.clear_constraints()
+    widget.add_constraint(constraint)
+    assert (function.calls, constraint.calls) == calls
+
+
+def test_clearing_the_cache_resamples(widget):
+    function = CountingFunction()
+    widget.set_resolution(32)
+    widget.set_function(function)
+    widget.set_resolution(48)
+    widget.clear_surface_cache()
+    calls = function.calls
+    widget.set_resolution(32)
+    assert function.calls > calls
@@ -0,0 +1,65 @@
+import numpy as np
+
+from visualization_3d_widget.surface_data import BitMask, SurfaceData, strided_indices
+
+
+def make_surface():
+    x_values = np.linspace(0, 1, 5)
+    y_values = np.linspace(0, 1, 7)
+    z_values = np.add.outer(x_values, y_values).astype(np.float32)
+    return SurfaceData(x_values, y_values, z_values)
+
+
+def first(x, y):
+    return x - 0.5
+
+
+def second(x, y):
+    return y - 0.5
+
+
+def masks(surface):
+    X, Y = surface.grid()
+    return first(X, Y) <= 0, second(X, Y) <= 0
+
+
+def test_with_constraint_masks_the_objective():
+    surface = make_surface()
+    mask, _ = masks(surface)
+    constrained = surface.with_constraint(first, mask)
+    np.testing.assert_array_equal(np.isnan(constrained.z_values), ~mask)
+    assert constrained.objective_values is surface.objective_values
+    assert isinstance(constrained.constraint_masks[first], BitMask)
+    np.testing.assert_array_equal(np.asarray(constrained.constraint_masks[first]), mask)
+
+
+def test_without_constraint_keeps_the_others():
+    surface = make_surface()
+    first_mask, second_mask = masks(surface)
+    constrained = surface.with_constraint(first, first_mask).with_constraint(second, second_mask)
+    np.testing.assert_array_equal(np.isnan(constrained.z_values), ~(first_mask & second_mask))
+    relaxed = constrained.without_constraint(first)
+    assert list(relaxed.constraint_masks) == [second]
+    np.testing.assert_array_equal(np.isnan(relaxed.z_values), ~second_mask)
+    unconstrained = relaxed.without_constraint(second)
+    np.testing.assert_array_equal(unconstrained.z_values, surface.z_values)
+    assert not unconstrained.constraint_masks
+
+
+def test_bit_mask_round_trips_odd_shapes():
+    mask = np.random.default_rng(1).random((13, 7)) > 0.5
+    packed = BitMask(mask)
+    assert packed.nbytes == 12
+    np.testing.assert_array_equal(packed.unpack(), mask)
+
+
+def test_strided_indices_keep_the_last_index():
+    np.testing.assert_array_equal(strided_indices(10, 4), [0, 4, 8, 9])
+    np.testing.assert_array_equal(strided_indices(9, 4), [0, 4, 8])
+
+
+def test_downsampled_keeps_the_full_z_range():
+    surface = make_surface()
+    coarse = surface.downsampled(3)
+    assert coarse.x_values[-1] == 1 and coarse.y_values[-1] == 1
+    assert (coarse.z_min, coarse.z_max) == (surface.z_min, surface.z_max)
@@ -0,0 +1,96 @@
+import math
+
+import numpy as np
+import pytest
+
+from visualization_3d_widget.surface_builder import sample_surface
+from visualization_3d_widget.surface_sampling import (
+    constraint_mask, evaluate_points, make_grid, single_constraint_mask
+)
+
+
+def left_of_one(x, y):
+    return x - 1
+
+
+def inside_domain(x, y):
+    # Scalar only and undefined for x > 1, i.e. exactly where left_of_one excludes the point.
+    return math.sqrt(1 - x) - 2
+
+
+def test_single_constraint_mask_treats_failures_as_infeasible():
+    _, _, X, Y = make_grid((-2, 2), (-2, 2), 9)
+    mask = single_constraint_mask(inside_domain, X, Y)
+    assert not mask[X > 1].any()
+    assert mask[X <= 1].all()
+
+
+def test_errors_that_are_not_domain_errors_are_raised():
+    _, _, X, Y = make_grid((-2, 2), (-2, 2), 9)
+    with pytest.raises(NameError):
+        single_constraint_mask(lambda x, y: undefined_name, X, Y)  # noqa: F821
+    with pytest.raises(TypeError):
+        single_constraint_mask(lambda x, y: math.sqrt(x) + None, X, Y)
+
+
+def test_constraint_undefined_everywhere_is_raised():
+    _, _, X, Y = make_grid((-2, -1), (-2, 2), 9)
+    with pytest.raises(ValueError):
+        single_constraint_mask(lambda x, y: math.sqrt(x), X, Y)
+
+
+def test_objective_may_be_undefined_on_the_whole_infeasible_part():
+    surface = sample_surface(lambda x, y: math.sqrt(x), [lambda x, y: -x], (-2, 2), (-2, 2), 9)
+    X, _ = np.meshgrid(surface.x_values, surface.y_values, indexing='ij')
+    np.testing.assert_array_equal(np.isnan(surface.z_values), X < 0)
+
+
+def test_constraint_mask_short_circuits():
+    _, _, X, Y = make_grid((-2, 2), (-2, 2), 9)
+    np.testing.assert_array_equal(constraint_mask([left_of_one, inside_domain], X, Y), X <= 1)
+
+
+def test_sample_surface_with_constraint_outside_its_domain():
+    surface = sample_surface(lambda x, y: x + y, [left_of_one, inside_domain], (-2, 2), (-2, 2), 9)
+    X, _ = np.meshgrid(surface.x_values, surface.y_values, indexing='ij')
+    np.testing.assert_array_equal(np.isnan(surface.z_values), X > 1)
+
+
+def test_widget_adds_constraint_outside_its_domain(widget):
+    widget.set_function(lambda x, y: x + y)
+    widget.add_constraint(left_of_one)
+    widget.add_constraint(inside_domain)
+    assert widget.surface is not None
+    widget.set_resolution(widget.resolution + 1)
+    assert not np.isnan(widget.surface.z_values).all()
+
+
+class CountingFunction:
+    def __init__(self):
+        self.scalar_calls = 0
+        self.array_calls = 0
+
+    def __call__(self, x, y):
+        if np.ndim(x):
+            self.array_calls += 1
+        else:
+            self.scalar_calls += 1
+        return np.sin(x) + y
+
+
+def test_vectorized_functions_are_probed_once():
+    function = CountingFunction()
+    _, _, X, Y = make_grid((-1, 1), (-1, 1), 20)
+    for _ in range(4):
+        np.testing.assert_allclose(evaluate_points(function, X, Y), np.sin(X) + Y)
+    assert function.array_calls == 4
+    assert function.scalar_calls == 3
+
+
+def test_functions_that_differ_on_arrays_are_evaluated_point_by_point():
+    def largest(x, y):
+        return max(x, y) if np.ndim(x) == 0 else np.zeros_like(x)
+
+    _, _, X, Y = make_grid((-1, 1), (-1, 1), 5)
+    for _ in range(2):
+        np.testing.assert_array_equal(evaluate_points(largest, X, Y), np.maximum(X, Y))
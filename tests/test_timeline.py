@@ -0,0 +1,58 @@
+import numpy as np
+
+
+def history(count):
+    return np.column_stack((np.linspace(-1, 1, count), np.zeros(count)))
+
+
+def test_loaded_history_starts_at_the_last_iteration(widget):
+    positions = []
+    widget.timeline_position_changed.connect(positions.append)
+    widget.load_optimization_history(history(50))
+    assert widget.get_history_length() == 50
+    assert widget.get_timeline_position() == 49 and positions == [49]
+    assert widget.visible_path_range() == (0, 50)
+
+
+def test_seek_and_trail_select_the_drawn_range(widget):
+    widget.load_optimization_history(history(50))
+    widget.seek_timeline(20)
+    assert widget.visible_path_range() == (0, 21)
+    widget.set_timeline_trail(5)
+    assert widget.visible_path_range() == (16, 5)
+    widget.seek_timeline(1000)
+    assert widget.get_timeline_position() == 49
+
+
+def test_playback_advances_with_time_and_stops_at_the_end(widget):
+    widget.load_optimization_history(history(50))
+    widget.set_playback_speed(10)
+    widget.play_timeline()
+    assert widget.get_timeline_position() == 0 and widget.is_timeline_playing()
+    widget.timeline_last_tick -= 1.0
+    widget.advance_timeline()
+    assert 10 <= widget.get_timeline_position() < 12
+    widget.timeline_last_tick -= 100.0
+    widget.advance_timeline()
+    assert widget.get_timeline_position() == 49 and not widget.is_timeline_playing()
+
+
+def test_path_limit_is_restored_when_the_timeline_stops(widget):
+    widget.set_optimization_path_limit(10)
+    widget.load_optimization_history(history(50))
+    assert widget.get_history_length() == 50
+    assert widget.get_optimization_path_limit() == 10
+    widget.stop_timeline()
+    assert widget.path_buffer.max_length == 10
+    np.testing.assert_allclose(widget.optimization_path, history(50)[-10:], rtol=1e-6)
+    widget.append_optimization_points(history(30))
+    assert len(widget.optimization_path) == 10
+
+
+def test_path_limit_changed_during_playback_applies_afterwards(widget):
+    widget.load_optimization_history(history(50))
+    widget.set_optimization_path_limit(20)
+    assert widget.get_history_length() == 50
+    widget.append_optimization_points(history(5))
+    assert widget.get_history_length() == 20
+    assert widget.visible_path_range() == (0, 20)
@@ -0,0 +1,3 @@
+from visualization_3d_widget.gl_options import apply_environment
+
+apply_environment()
@@ -0,0 +1,213 @@
+import numpy as np
+
+from visualization_3d_widget.colormaps import apply_colormap
+from visualization_3d_widget.surface_sampling import (
+    constraint_mask, evaluate_on_grid, normalize_z, surface_colors, z_range
+)
+
+DEFAULT_BASE_CELLS = 16
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_TOLERANCE = 0.001
+
+# Cell corners in counter-clockwise order and the edge midpoints between them, as offsets in units of
+# half the cell size: corner k and corner k + 1 are joined by edge k.
+_CORNERS = ((0, 0), (2, 0), (2, 2), (0, 2))
+_MIDPOINTS = ((1, 0), (2, 1), (1, 2), (0, 1))
+_CENTER = (1, 1)
+# Odd quarter points along the four edges, in units of a quarter of the cell size.
+_QUARTERS = ((1, 0), (3, 0), (4, 1), (4, 3), (1, 4), (3, 4), (0, 1), (0, 3))
+
+
+class LatticeSamples:
+    # Function values on the integer lattice of the finest quadtree level, stored sorted by vertex key.
+    def __init__(self, function, constraints, x_range, y_range, size, cancelled=None):
+        self.function = function
+        self.constraints = constraints
+        self.x_range = x_range
+        self.y_range = y_range
+        self.size = size
+        self.cancelled = cancelled
+        self.keys = np.empty(0, dtype=np.int64)
+        self.z_values = np.empty(0)
+        self.evaluations = 0
+
+    def key(self, ix, iy):
+        return np.asarray(ix, dtype=np.int64) * (self.size + 1) + iy
+
+    def coordinates(self, keys):
+        ix, iy = np.divmod(keys, self.size + 1)
+        xs = self.x_range[0] + (self.x_range[1] - self.x_range[0]) * ix / self.size
+        ys = self.y_range[0] + (self.y_range[1] - self.y_range[0]) * iy / self.size
+        return xs, ys
+
+    def lookup(self, keys):
+        keys = np.asarray(keys, dtype=np.int64)
+        missing = np.setdiff1d(keys, self.keys)
+        if len(missing):
+            xs, ys = self.coordinates(missing)
+            mask = constraint_mask(self.constraints, xs, ys, cancelled=self.cancelled)
+            z_values = evaluate_on_grid(self.function, xs, ys, mask, cancelled=self.cancelled)
+            self.evaluations += len(missing)
+            order = np.argsort(np.concatenate((self.keys, missing)), kind='stable')
+            self.keys = np.concatenate((self.keys, missing))[order]
+            self.z_values = np.concatenate((self.z_values, z_values))[order]
+        return self.z_values[np.searchsorted(self.keys, keys)]
+
+
+def _cell_points(cells, offsets, divisor):
+    ix, iy, size = cells
+    step = size // divisor
+    return [(ix + dx * step, iy + dy * step) for dx, dy in offsets]
+
+
+def _split(cells):
+    ix, iy, size = cells
+    half = size // 2
+    return (np.concatenate((ix, ix + half, ix + half, ix)),
+            np.concatenate((iy, iy, iy + half, iy + half)),
+            np.concatenate((half, half, half, half)))
+
+
+def _select(cells, selection):
+    return tuple(values[selection] for values in cells)
+
+
+def _concatenate(*cell_sets):
+    return tuple(np.concatenate(values) for values in zip(*cell_sets))
+
+
+def adaptive_tessellation(function, constraints, x_range, y_range, base_cells=DEFAULT_BASE_CELLS,
+                          max_depth=DEFAULT_MAX_DEPTH, tolerance=DEFAULT_TOLERANCE, cancelled=None):
+    # Lattice units are half the size of the finest cells, whose edge midpoints and centers are sampled too.
+    base_size = 2 ** (max_depth + 1)
+    lattice_size = base_cells * base_size
+    samples = LatticeSamples(function, constraints, x_range, y_range, lattice_size, cancelled)
+    base = np.arange(base_cells) * base_size
+    ix, iy = np.meshgrid(base, base, indexing='ij')
+    cells = (ix.ravel(), iy.ravel(), np.full(ix.size, base_size))
+
+    z_min, z_max = z_range(samples.lookup(np.concatenate([samples.key(*point) for point in
+                                                          _cell_points(cells, _CORNERS + _MIDPOINTS, 2)])))
+    threshold = tolerance * (z_max - z_min if z_max != z_min else 1.0)
+
+    # Refine cells whose edge midpoints or center deviate from bilinear interpolation of the corners,
+    # or that straddle the feasibility boundary.
+    leaves = []
+    while len(cells[0]):
+        if cells[2][0] == 2:
+            leaves.append(cells)
+            break
+        corners = np.stack([samples.lookup(samples.key(*point)) for point in _cell_points(cells, _CORNERS, 2)])
+        midpoints = np.stack([samples.lookup(samples.key(*point)) for point in _cell_points(cells, _MIDPOINTS, 2)])
+        center = samples.lookup(samples.key(*_cell_points(cells, (_CENTER,), 2)[0]))
+        values = np.concatenate((corners, midpoints, center[None]))
+        valid = ~np.isnan(values)
+        with np.errstate(invalid='ignore'):
+            edge_error = np.abs(midpoints - (corners + np.roll(corners, -1, axis=0)) / 2).max(axis=0)
+            center_error = np.abs(center - corners.mean(axis=0))
+            error = np.fmax(edge_error, center_error)
+        split = (valid.any(axis=0) & ~valid.all(axis=0)) | (valid.all(axis=0) & (error > threshold))
+        leaves.append(_select(cells, ~split))
+        cells = _split(_select(cells, split))
+    cells = _concatenate(*leaves)
+
+    # Enforce a 2:1 size ratio between neighbours so every edge has at most one hanging vertex.
+    while True:
+        vertex_keys = np.unique(np.concatenate([samples.key(*point) for point in _cell_points(cells, _CORNERS, 2)]))
+        splittable = cells[2] >= 4
+        quarter_present = np.zeros(len(cells[0]), dtype=bool)
+        for point in _cell_points(_select(cells, splittable), _QUARTERS, 4):
+            quarter_present[splittable] |= np.isin(samples.key(*point), vertex_keys)
+        if not quarter_present.any():
+            break
+        cells = _concatenate(_select(cells, ~quarter_present), _split(_select(cells, quarter_present)))
+
+    triangles = _triangulate(cells, vertex_keys, samples)
+    keys, indices = np.unique(triangles, return_inverse=True)
+    z_values = samples.lookup(keys)
+    xs, ys = samples.coordinates(keys)
+    return AdaptiveSurfaceData(xs, ys, z_values, indices.astype(np.uint32), lattice_size + 1, samples.evaluations)
+
+
+def _triangulate(cells, vertex_keys, samples):
+    corners = [samples.key(*point) for point in _cell_points(cells, _CORNERS, 2)]
+    midpoints = [samples.key(*point) for point in _cell_points(cells, _MIDPOINTS, 2)]
+    center = samples.key(*_cell_points(cells, (_CENTER,), 2)[0])
+    hanging = [(cells[2] >= 2) & np.isin(midpoint, vertex_keys) for midpoint in midpoints]
+    fan = np.any(hanging, axis=0)
+
+    triangles = [np.stack((corners[0], corners[1], corners[2]), axis=-1)[~fan],
+                 np.stack((corners[0], corners[2], corners[3]), axis=-1)[~fan]]
+    for k in range(4):
+        with_midpoint = fan & hanging[k]
+        without_midpoint = fan & ~hanging[k]
+        next_corner = corners[(k + 1) % 4]
+        triangles.append(np.stack((center, corners[k], midpoints[k]), axis=-1)[with_midpoint])
+        triangles.append(np.stack((center, midpoints[k], next_corner), axis=-1)[with_midpoint])
+        triangles.append(np.stack((center, corners[k], next_corner), axis=-1)[without_midpoint])
+    triangles = np.concatenate(triangles)
+    valid = ~np.isnan(samples.lookup(triangles.ravel())).reshape(triangles.shape)
+    return triangles[valid.all(axis=1)].ravel()
+
+
+def triangle_gradients(xs, ys, z_values, indices):
+    # Area-weighted average of the planes of the triangles around each vertex.
+    triangles = indices.reshape(-1, 3)
+    p = np.stack((xs, ys, z_values), axis=-1)[triangles]
+    normals = np.cross(p[:, 1] - p[:, 0], p[:, 2] - p[:, 0])
+    accumulated = np.zeros((len(xs), 3))
+    for corner in range(3):
+        np.add.at(accumulated, triangles[:, corner], normals)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        gradients = -accumulated[:, :2] / accumulated[:, 2:3]
+    return np.nan_to_num(gradients, posinf=0.0, neginf=0.0)
+
+
+class AdaptiveSurfaceData:
+    def __init__(self, xs, ys, z_values, indices, resolution, evaluations):
+        self.xs = xs
+        self.ys = ys
+        self.z_values = z_values
+        self.indices = indices
+        self.resolution = resolution
+        self.evaluations = evaluations
+        self.z_min, self.z_max = z_range(z_values)
+
+    @property
+    def vertex_count(self):
+        return len(self.xs)
+
+    @property
+    def arrays(self):
+        return (self.xs, self.ys, self.z_values, self.indices)
+
+    @property
+    def nbytes(self):
+        return self.xs.nbytes + self.ys.nbytes + self.z_values.nbytes + self.indices.nbytes
+
+    def valid_mask(self):
+        return ~np.isnan(self.z_values)
+
+    def triangle_indices(self):
+        return self.indices
+
+    def vertices(self, grid_size_z):
+        return np.stack((self.xs, self.ys, normalize_z(self.z_values, self.z_min, self.z_max, grid_size_z)), axis=-1)
+
+    def raw_vertices(self):
+        return np.stack((self.xs, self.ys, self.z_values), axis=-1)
+
+    def gradients(self):
+        return triangle_gradients(self.xs, self.ys, self.z_values, self.indices)
+
+    def strips(self, grid_size_x, grid_size_y, grid_size_z):
+        # Quad strips (a, b, c, c) draw exactly triangle abc, in the (vertex, color) layout of SurfaceData.strips.
+        strip_data = np.stack((self.vertices(grid_size_z), self.colors(grid_size_x, grid_size_y)), axis=-2)
+        a, b, c = self.indices.reshape(-1, 3).T
+        return strip_data[np.stack((a, b, c, c), axis=-1)]
+
+    def colors(self, grid_size_x, grid_size_y, colormap_lut=None):
+        if colormap_lut is not None:
+            span = self.z_max - self.z_min if self.z_max != self.z_min else 1.0
+            return apply_colormap(colormap_lut, (self.z_values - self.z_min) / span)
+        return surface_colors(self.xs, self.ys, self.z_values, self.z_min, self.z_max, grid_size_x, grid_size_y)
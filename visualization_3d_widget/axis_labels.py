@@ -0,0 +1,119 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from visualization_3d_widget.gl_buffers import GLBuffer, draw_vertex_buffer
+from visualization_3d_widget.transforms import transform_points
+
+BILLBOARD_SCALE = 0.5
+NUMBER_SIZE = 0.3
+NUMBER_LINE_WIDTH = 1.5
+NUMBER_OFFSET = 0.3
+SYMBOL_SIZE = 0.5
+SYMBOL_LINE_WIDTH = 2.0
+SYMBOL_OFFSET = 0.3
+DIGIT_ADVANCE = 0.75
+
+# Line segments of each glyph in units of its size, centered on the origin.
+_TOP = ((-0.5, 0.5), (0.5, 0.5))
+_MIDDLE = ((-0.5, 0.0), (0.5, 0.0))
+_BOTTOM = ((-0.5, -0.5), (0.5, -0.5))
+_LEFT = ((-0.5, 0.5), (-0.5, -0.5))
+_RIGHT = ((0.5, 0.5), (0.5, -0.5))
+_UPPER_LEFT = ((-0.5, 0.5), (-0.5, 0.0))
+_UPPER_RIGHT = ((0.5, 0.5), (0.5, 0.0))
+_LOWER_LEFT = ((-0.5, 0.0), (-0.5, -0.5))
+_LOWER_RIGHT = ((0.5, 0.0), (0.5, -0.5))
+
+GLYPHS = {
+    '0': (_TOP, _BOTTOM, _LEFT, _RIGHT),
+    '1': (((0.0, 0.5), (0.0, -0.5)), ((-0.25, 0.5), (0.0, 0.5))),
+    '2': (_TOP, _MIDDLE, _BOTTOM, _UPPER_RIGHT, _LOWER_LEFT),
+    '3': (_TOP, _MIDDLE, _BOTTOM, _RIGHT),
+    '4': (_UPPER_LEFT, _MIDDLE, _RIGHT),
+    '5': (_TOP, _MIDDLE, _BOTTOM, _UPPER_LEFT, _LOWER_RIGHT),
+    '6': (_TOP, _MIDDLE, _BOTTOM, _LEFT, _LOWER_RIGHT),
+    '7': (_TOP, ((0.5, 0.5), (-0.5, -0.5))),
+    '8': (_TOP, _MIDDLE, _BOTTOM, _LEFT, _RIGHT),
+    '9': (_TOP, _MIDDLE, _BOTTOM, _RIGHT, _UPPER_LEFT),
+    '-': (_MIDDLE,),
+    'X': (((-0.5, 0.5), (0.5, -0.5)), ((-0.5, -0.5), (0.5, 0.5))),
+    'Y': (((-0.5, 0.5), (0.0, 0.0)), ((0.5, 0.5), (0.0, 0.0)), ((0.0, 0.0), (0.0, -0.5))),
+    'Z': (_TOP, ((0.5, 0.5), (-0.5, -0.5)), _BOTTOM),
+}
+
+
+def glyph_vertices(character, size, x=0.0):
+    segments = np.array(GLYPHS[character], dtype=np.float64).reshape(-1, 2) * size
+    segments[:, 0] += x
+    return np.column_stack((segments, np.zeros(len(segments))))
+
+
+def number_vertices(number, size):
+    digits = str(abs(number))
+    start_x = -len(digits) * size * DIGIT_ADVANCE / 2 + size / 2
+    parts = [glyph_vertices(digit, size, start_x + index * size * DIGIT_ADVANCE) for index, digit in enumerate(digits)]
+    if number < 0:
+        parts.insert(0, glyph_vertices('-', size / 2, start_x - size * DIGIT_ADVANCE))
+    return np.concatenate(parts)
+
+
+def axis_label_layout(grid_size_x, grid_size_y, grid_size_z, grid_step, with_numbers):
+    numbers = []
+    if with_numbers:
+        for i in range(-grid_size_x, grid_size_x + 1, grid_step):
+            if i != 0:
+                numbers.append(((i, -NUMBER_OFFSET, 0), i))
+        for i in range(-grid_size_y, grid_size_y + 1, grid_step):
+            if i != 0:
+                numbers.append(((-NUMBER_OFFSET, i, 0), i))
+        for i in range(-grid_size_z, grid_size_z + 1, grid_step):
+            if i != 0:
+                numbers.append(((0, -NUMBER_OFFSET, i), i))
+    symbols = [
+        ((grid_size_x + SYMBOL_OFFSET, 0, 0), 'X'),
+        ((0, grid_size_y + SYMBOL_OFFSET, 0), 'Y'),
+        ((0, 0, grid_size_z + SYMBOL_OFFSET), 'Z'),
+    ]
+    return numbers, symbols
+
+
+class AxisLabelBatch:
+    def __init__(self):
+        self.key = None
+        self.anchors = np.empty((0, 3))
+        self.anchor_index = np.empty(0, dtype=np.intp)
+        self.offsets = np.empty((0, 3))
+        self.number_vertex_count = 0
+        self.buffer = GLBuffer(GL_ARRAY_BUFFER, GL_STREAM_DRAW)
+
+    def build(self, key, numbers, symbols):
+        anchors = []
+        offsets = []
+        for anchor, number in numbers:
+            anchors.append(anchor)
+            offsets.append(number_vertices(number, NUMBER_SIZE))
+        self.number_vertex_count = sum(len(vertices) for vertices in offsets)
+        for anchor, symbol in symbols:
+            anchors.append(anchor)
+            offsets.append(glyph_vertices(symbol, SYMBOL_SIZE))
+        self.anchors = np.array(anchors, dtype=np.float64).reshape(-1, 3)
+        self.anchor_index = np.repeat(np.arange(len(offsets)), [len(vertices) for vertices in offsets])
+        self.offsets = np.concatenate(offsets) * BILLBOARD_SCALE
+        self.key = key
+
+    def draw(self, modelview):
+        # Anchors go through the camera on the CPU and glyphs are offset in eye space, which keeps
+        # them facing the viewer without reading the modelview matrix back from GL.
+        eye_vertices = transform_points(modelview, self.anchors)[self.anchor_index] + self.offsets
+        self.buffer.set_data(eye_vertices.astype(np.float32))
+        glPushMatrix()
+        glLoadIdentity()
+        glLineWidth(NUMBER_LINE_WIDTH)
+        draw_vertex_buffer(self.buffer, GL_LINES, 0, self.number_vertex_count)
+        glLineWidth(SYMBOL_LINE_WIDTH)
+        draw_vertex_buffer(self.buffer, GL_LINES, self.number_vertex_count)
+        glPopMatrix()
+
+    def release(self):
+        self.buffer.release()
@@ -0,0 +1,37 @@
+import numpy as np
+
+COLORMAP_SIZE = 256
+
+# Evenly spaced control colors, linearly interpolated into a lookup table.
+COLORMAPS = {
+    'viridis': ((0.267, 0.005, 0.329), (0.283, 0.141, 0.458), (0.254, 0.265, 0.530), (0.207, 0.372, 0.553),
+                (0.164, 0.471, 0.558), (0.128, 0.567, 0.551), (0.135, 0.659, 0.518), (0.267, 0.749, 0.441),
+                (0.478, 0.821, 0.318), (0.741, 0.873, 0.150), (0.993, 0.906, 0.144)),
+    'plasma': ((0.050, 0.030, 0.528), (0.254, 0.014, 0.615), (0.417, 0.001, 0.658), (0.562, 0.051, 0.642),
+               (0.692, 0.165, 0.565), (0.798, 0.280, 0.470), (0.881, 0.393, 0.383), (0.949, 0.517, 0.296),
+               (0.988, 0.652, 0.211), (0.988, 0.809, 0.145), (0.940, 0.975, 0.131)),
+    'coolwarm': ((0.230, 0.299, 0.754), (0.552, 0.690, 0.996), (0.866, 0.865, 0.865), (0.958, 0.604, 0.482),
+                 (0.706, 0.016, 0.150)),
+    'terrain': ((0.200, 0.200, 0.600), (0.000, 0.600, 1.000), (0.000, 0.800, 0.400), (1.000, 1.000, 0.600),
+                (0.500, 0.360, 0.330), (1.000, 1.000, 1.000)),
+    'gray': ((0.0, 0.0, 0.0), (1.0, 1.0, 1.0)),
+}
+
+
+def available_colormaps():
+    return sorted(COLORMAPS)
+
+
+def colormap_lut(name, size=COLORMAP_SIZE):
+    if name not in COLORMAPS:
+        raise ValueError(f"Unknown colormap '{name}', expected one of {available_colormaps()}")
+    controls = np.array(COLORMAPS[name], dtype=np.float64)
+    positions = np.linspace(0.0, 1.0, len(controls))
+    samples = np.linspace(0.0, 1.0, size)
+    return np.stack([np.interp(samples, positions, controls[:, channel]) for channel in range(3)],
+                    axis=-1).astype(np.float32)
+
+
+def apply_colormap(lut, values):
+    indices = np.clip(np.nan_to_num(values) * (len(lut) - 1), 0, len(lut) - 1).round().astype(np.intp)
+    return lut[indices]
@@ -0,0 +1,60 @@
+import numpy as np
+
+from visualization_3d_widget.surface_sampling import evaluate_points, make_grid
+
+# Edges of a cell, each as a pair of corner indices: 0 = (i, j), 1 = (i + 1, j), 2 = (i + 1, j + 1), 3 = (i, j + 1).
+_EDGES = ((0, 1), (1, 2), (3, 2), (0, 3))
+# Saddle cells have four crossings; they are joined either around corners 1 and 3 or around corners 0 and 2.
+_SADDLE_PAIRS_A = ((0, 1), (2, 3))
+_SADDLE_PAIRS_B = ((3, 0), (1, 2))
+
+
+def marching_squares(x_values, y_values, values, level=0.0):
+    x0, x1 = x_values[:-1, None], x_values[1:, None]
+    y0, y1 = y_values[None, :-1], y_values[None, 1:]
+    corners = (values[:-1, :-1], values[1:, :-1], values[1:, 1:], values[:-1, 1:])
+    corner_x = (x0, x1, x1, x0)
+    corner_y = (y0, y0, y1, y1)
+    shape = corners[0].shape
+    finite = np.isfinite(corners[0]) & np.isfinite(corners[1]) & np.isfinite(corners[2]) & np.isfinite(corners[3])
+    above = [corner > level for corner in corners]
+
+    crossed = np.empty((4,) + shape, dtype=bool)
+    points = np.empty((4,) + shape + (2,))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for k, (a, b) in enumerate(_EDGES):
+            crossed[k] = (above[a] != above[b]) & finite
+            t = np.clip((level - corners[a]) / (corners[b] - corners[a]), 0.0, 1.0)
+            t = np.where(np.isfinite(t), t, 0.5)
+            points[k, ..., 0] = corner_x[a] + t * (corner_x[b] - corner_x[a])
+            points[k, ..., 1] = corner_y[a] + t * (corner_y[b] - corner_y[a])
+
+    crossing_count = crossed.sum(axis=0)
+    segments = []
+
+    i, j = np.nonzero(crossing_count == 2)
+    if len(i):
+        cell_crossed = crossed[:, i, j]
+        first = np.argmax(cell_crossed, axis=0)
+        second = 3 - np.argmax(cell_crossed[::-1], axis=0)
+        segments.append(np.stack((points[first, i, j], points[second, i, j]), axis=1))
+
+    i, j = np.nonzero(crossing_count == 4)
+    if len(i):
+        center_above = (corners[0][i, j] + corners[1][i, j] + corners[2][i, j] + corners[3][i, j]) / 4 > level
+        use_a = center_above == above[0][i, j]
+        for pairs_a, pairs_b in zip(_SADDLE_PAIRS_A, _SADDLE_PAIRS_B):
+            first = np.where(use_a, pairs_a[0], pairs_b[0])
+            second = np.where(use_a, pairs_a[1], pairs_b[1])
+            segments.append(np.stack((points[first, i, j], points[second, i, j]), axis=1))
+
+    if not segments:
+        return np.empty((0, 2, 2))
+    return np.concatenate(segments)
+
+
+def constraint_boundary_segments(constraint, x_range, y_range, resolution):
+    # Sampled like single_constraint_mask: points where the constraint fails are NaN, and the cells around
+    # them are left out of the contour instead of failing the paint.
+    x_values, y_values, X, Y = make_grid(x_range, y_range, resolution)
+    return marching_squares(x_values, y_values, evaluate_points(constraint, X, Y, skip_errors=True))
@@ -0,0 +1,182 @@
+import ast
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# Arrays larger than this are split into chunks of this size and evaluated on a thread pool; NumPy
+# releases the GIL inside its ufuncs, so the chunks run in parallel.
+PARALLEL_CHUNK_SIZE = 1 << 16
+
+VARIABLES = ('x', 'y')
+CONSTANTS = {'pi': np.pi, 'e': np.e}
+FUNCTIONS = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'atan2': np.arctan2,
+    'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+    'exp': np.exp, 'log': np.log, 'log10': np.log10, 'log2': np.log2, 'sqrt': np.sqrt,
+    'abs': np.abs, 'sign': np.sign, 'floor': np.floor, 'ceil': np.ceil, 'hypot': np.hypot,
+    'min': np.minimum, 'max': np.maximum, 'where': np.where,
+}
+# Positional arguments each function takes; the others take one.
+ARITIES = {'atan2': 2, 'hypot': 2, 'min': 2, 'max': 2, 'where': 3}
+
+_OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.USub, ast.UAdd,
+              ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq, ast.And, ast.Or, ast.Not)
+_NODES = (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Compare, ast.BoolOp, ast.Call, ast.Name, ast.Load,
+          ast.Constant, ast.IfExp) + _OPERATORS
+_COMPARISONS = {ast.Lt: False, ast.LtE: False, ast.Gt: True, ast.GtE: True}
+
+_WORKERS = os.cpu_count() or 1
+_executor = None
+
+
+def _thread_pool():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix='expression')
+    return _executor
+
+
+def parse_expression(source):
+    try:
+        tree = ast.parse(source.strip(), mode='eval')
+    except SyntaxError as error:
+        raise ValueError(f"Invalid expression '{source}': {error.msg}") from None
+    for node in ast.walk(tree):
+        if not isinstance(node, _NODES):
+            raise ValueError(f"Unsupported syntax in expression '{source}': {type(node).__name__}")
+        if isinstance(node, ast.Name) and node.id not in VARIABLES and node.id not in CONSTANTS \
+                and node.id not in FUNCTIONS:
+            raise ValueError(f"Unknown name '{node.id}' in expression '{source}'")
+        if isinstance(node, ast.Call) and (not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS
+                                           or node.keywords):
+            raise ValueError(f"Unsupported call in expression '{source}'")
+        if isinstance(node, ast.Call) and len(node.args) != ARITIES.get(node.func.id, 1):
+            raise ValueError(f"{node.func.id}() takes {ARITIES.get(node.func.id, 1)} arguments, "
+                             f"got {len(node.args)} in expression '{source}'")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise ValueError(f"Unsupported constant {node.value!r} in expression '{source}'")
+        if isinstance(node, ast.Constant) and not _is_finite_float(node.value):
+            raise ValueError(f"Constant {node.value!r} out of range in expression '{source}'")
+    return tree
+
+
+def _is_finite_float(value):
+    try:
+        return np.isfinite(float(value))
+    except OverflowError:
+        return False
+
+
+class _VectorizeConditions(ast.NodeTransformer):
+    # and/or/not and conditional expressions become their elementwise NumPy equivalents.
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        function = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.Call(func=ast.Name(id=function, ctx=ast.Load()), args=[result, value], keywords=[])
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.Call(func=ast.Name(id='logical_not', ctx=ast.Load()), args=[node.operand], keywords=[])
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return ast.Call(func=ast.Name(id='where', ctx=ast.Load()), args=[node.test, node.body, node.orelse],
+                        keywords=[])
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # Chained comparisons like 0 < x < 1 are split into pairs joined with logical_and.
+        operands = [node.left] + node.comparators
+        pairs = [ast.Compare(left=left, ops=[op], comparators=[right])
+                 for left, op, right in zip(operands, node.ops, operands[1:])]
+        result = pairs[0]
+        for pair in pairs[1:]:
+            result = ast.Call(func=ast.Name(id='logical_and', ctx=ast.Load()), args=[result, pair], keywords=[])
+        return result
+
+
+class _FloatConstants(ast.NodeTransformer):
+    # Literals become float64 names, so arithmetic on them overflows to inf like it does on arrays instead of
+    # running Python's arbitrary-precision integer math (9**9**9**9 would never finish).
+    def __init__(self):
+        self.constants = {}
+
+    def visit_Constant(self, node):
+        name = f'_constant_{len(self.constants)}'
+        self.constants[name] = np.float64(node.value)
+        return ast.Name(id=name, ctx=ast.Load())
+
+
+class CompiledExpression:
+    # A restricted math expression in x and y, compiled once into NumPy calls. Instances compare equal
+    # when their parsed form is identical, so surfaces of the same formula share cache entries.
+    def __init__(self, source, tree=None):
+        self.source = source
+        tree = parse_expression(source) if tree is None else tree
+        self.canonical = ast.dump(tree)
+        constants = _FloatConstants()
+        tree = ast.fix_missing_locations(constants.visit(_VectorizeConditions().visit(tree)))
+        self.code = compile(tree, '<expression>', 'eval')
+        self.namespace = dict(CONSTANTS, **FUNCTIONS, **constants.constants, logical_and=np.logical_and,
+                              logical_or=np.logical_or, logical_not=np.logical_not)
+
+    def evaluate(self, x, y):
+        with np.errstate(all='ignore'):
+            return eval(self.code, {'__builtins__': {}}, dict(self.namespace, x=x, y=y))
+
+    def __call__(self, x, y):
+        x, y = np.broadcast_arrays(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        if x.size <= PARALLEL_CHUNK_SIZE or _WORKERS == 1:
+            return np.broadcast_to(np.asarray(self.evaluate(x, y), dtype=np.float64), x.shape).copy()
+        flat_x, flat_y = x.ravel(), y.ravel()
+        values = np.empty(flat_x.size)
+
+        def evaluate_chunk(start):
+            stop = min(start + PARALLEL_CHUNK_SIZE, flat_x.size)
+            values[start:stop] = self.evaluate(flat_x[start:stop], flat_y[start:stop])
+
+        list(_thread_pool().map(evaluate_chunk, range(0, flat_x.size, PARALLEL_CHUNK_SIZE)))
+        return values.reshape(x.shape)
+
+    def __eq__(self, other):
+        return isinstance(other, CompiledExpression) and self.canonical == other.canonical
+
+    def __hash__(self):
+        return hash(self.canonical)
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
+def compile_expression(source):
+    return CompiledExpression(source)
+
+
+def _is_condition(node):
+    return isinstance(node, (ast.BoolOp, ast.Compare)) or (isinstance(node, ast.UnaryOp)
+                                                            and isinstance(node.op, ast.Not))
+
+
+def compile_constraint_expression(source):
+    # Constraints are feasible where they are <= 0; 'lhs <= rhs' and 'lhs >= rhs' are rewritten into
+    # that form. Other conditions ('and', 'not', '==', chained comparisons) become -1 where they hold and
+    # 1 elsewhere, anything else is taken as is.
+    tree = parse_expression(source)
+    body = tree.body
+    if isinstance(body, ast.Compare) and len(body.ops) == 1 and type(body.ops[0]) in _COMPARISONS:
+        left, right = body.left, body.comparators[0]
+        if _COMPARISONS[type(body.ops[0])]:
+            left, right = right, left
+        tree = ast.Expression(body=ast.BinOp(left=left, op=ast.Sub(), right=right))
+    elif _is_condition(body):
+        tree = ast.Expression(body=ast.IfExp(test=body, body=ast.Constant(-1.0), orelse=ast.Constant(1.0)))
+    return CompiledExpression(source, tree)
@@ -0,0 +1,96 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+
+class GLBuffer:
+    def __init__(self, target=GL_ARRAY_BUFFER, usage=GL_STATIC_DRAW):
+        self.target = target
+        self.usage = usage
+        self.buffer_id = None
+        self.data = None
+        self.allocated_bytes = 0
+        self.dirty = False
+        self.dirty_ranges = []
+
+    def set_data(self, data):
+        self.data = np.ascontiguousarray(data)
+        self.dirty = True
+
+    def update_range(self, start, stop):
+        # Rows start:stop of the current array were modified in place; only they are re-uploaded.
+        if not self.dirty and stop > start:
+            self.dirty_ranges.append((start, stop))
+
+    def clear(self):
+        self.data = None
+        self.dirty = True
+
+    def __len__(self):
+        return 0 if self.data is None else len(self.data)
+
+    @property
+    def nbytes(self):
+        return 0 if self.data is None else self.data.nbytes
+
+    def bind(self):
+        if self.buffer_id is None:
+            self.buffer_id = glGenBuffers(1)
+        glBindBuffer(self.target, self.buffer_id)
+        if self.dirty:
+            if self.data is None or self.data.nbytes == 0:
+                glBufferData(self.target, 0, None, self.usage)
+                self.allocated_bytes = 0
+            elif self.data.nbytes == self.allocated_bytes:
+                glBufferSubData(self.target, 0, self.data.nbytes, self.data)
+            else:
+                glBufferData(self.target, self.data.nbytes, self.data, self.usage)
+                self.allocated_bytes = self.data.nbytes
+            self.dirty = False
+            self.dirty_ranges.clear()
+        elif self.dirty_ranges:
+            row_bytes = self.data.strides[0]
+            for start, stop in self.dirty_ranges:
+                rows = self.data[start:stop]
+                glBufferSubData(self.target, start * row_bytes, rows.nbytes, rows)
+            self.dirty_ranges.clear()
+
+    def unbind(self):
+        glBindBuffer(self.target, 0)
+
+    def release(self):
+        if self.buffer_id is not None:
+            glDeleteBuffers(1, [self.buffer_id])
+            self.buffer_id = None
+        self.allocated_bytes = 0
+        self.dirty = self.data is not None
+
+
+def draw_vertex_buffer(buffer, mode, first=0, count=None):
+    if count is None:
+        count = len(buffer) - first
+    if count <= 0:
+        return
+    glEnableClientState(GL_VERTEX_ARRAY)
+    buffer.bind()
+    glVertexPointer(3, GL_FLOAT, 0, None)
+    glDrawArrays(mode, first, count)
+    buffer.unbind()
+    glDisableClientState(GL_VERTEX_ARRAY)
+
+
+def draw_colored_vertex_buffers(positions, colors, mode, first=0, count=None):
+    if count is None:
+        count = len(positions) - first
+    if count <= 0:
+        return
+    glEnableClientState(GL_VERTEX_ARRAY)
+    glEnableClientState(GL_COLOR_ARRAY)
+    positions.bind()
+    glVertexPointer(3, GL_FLOAT, 0, None)
+    colors.bind()
+    glColorPointer(3, GL_FLOAT, 0, None)
+    glDrawArrays(mode, first, count)
+    colors.unbind()
+    glDisableClientState(GL_COLOR_ARRAY)
+    glDisableClientState(GL_VERTEX_ARRAY)
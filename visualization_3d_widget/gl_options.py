@@ -0,0 +1,29 @@
+import os
+import sys
+import warnings
+
+# Set to 1 to start in production mode without changing the application.
+PRODUCTION_MODE_VARIABLE = 'VISUALIZATION_3D_PRODUCTION'
+
+
+def set_production_mode(enabled=True):
+    # Production mode drops PyOpenGL's glGetError check and logging wrapper around every GL call. PyOpenGL
+    # copies both flags once, when OpenGL.GL is first imported, so this only has an effect before that.
+    if 'OpenGL._configflags' in sys.modules:
+        warnings.warn("PyOpenGL is already initialized; production mode has to be set before importing the widget")
+        return False
+    import OpenGL
+    OpenGL.ERROR_CHECKING = not enabled
+    OpenGL.ERROR_LOGGING = not enabled
+    return True
+
+
+def get_production_mode():
+    import OpenGL
+    return not OpenGL.ERROR_CHECKING
+
+
+def apply_environment():
+    # OpenGL is imported lazily here so that importing the package stays cheap when the variable is unset.
+    if os.environ.get(PRODUCTION_MODE_VARIABLE) == '1':
+        set_production_mode()
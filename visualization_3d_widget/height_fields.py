@@ -0,0 +1,115 @@
+import numpy as np
+
+from visualization_3d_widget.surface_data import SurfaceData, strided_indices
+
+DEFAULT_HEIGHT_FIELD_RESOLUTION = 1024
+# Elements read at a time when scanning the whole array, so memory-mapped files are streamed.
+RANGE_CHUNK_ELEMENTS = 1 << 22
+
+
+class HeightField:
+    # Precomputed heights on a regular grid: z_values[i, j] is the height at the i-th of nx evenly spaced x
+    # values in x_range and the j-th y value in y_range. The array (e.g. an np.memmap) is never copied.
+    # z_range skips the scan of the whole array for the height range; with scan_range=False and no z_range
+    # the range starts empty and grows through extend_z_range as parts of the array are read.
+    def __init__(self, z_values, x_range, y_range, mask=None, z_range=None, scan_range=True):
+        if np.ndim(z_values) != 2:
+            raise ValueError(f"Height field must be a 2-D array, got shape {np.shape(z_values)}")
+        if mask is not None and np.shape(mask) != np.shape(z_values):
+            raise ValueError(f"Mask shape {np.shape(mask)} does not match height field shape {np.shape(z_values)}")
+        self.z_values = z_values
+        self.x_range = tuple(x_range)
+        self.y_range = tuple(y_range)
+        self.mask = mask
+        if z_range is not None:
+            self.z_min, self.z_max = (float(z) for z in z_range)
+        elif scan_range:
+            self.z_min, self.z_max = self.z_range()
+        else:
+            self.z_min, self.z_max = np.inf, -np.inf
+
+    @property
+    def shape(self):
+        return self.z_values.shape
+
+    def z_range(self):
+        z_min, z_max = np.inf, -np.inf
+        rows = max(1, RANGE_CHUNK_ELEMENTS // max(self.shape[1], 1))
+        for start in range(0, self.shape[0], rows):
+            chunk = np.asarray(self.z_values[start:start + rows])
+            valid = ~np.isnan(chunk)
+            if self.mask is not None:
+                valid &= np.asarray(self.mask[start:start + rows], dtype=bool)
+            if valid.any():
+                z_min = min(z_min, float(chunk[valid].min()))
+                z_max = max(z_max, float(chunk[valid].max()))
+        if z_min > z_max:
+            return 0, 1
+        return z_min, z_max
+
+    def has_z_range(self):
+        return self.z_min <= self.z_max
+
+    def extend_z_range(self, z_min, z_max):
+        # Returns whether the range grew.
+        if z_min >= self.z_min and z_max <= self.z_max:
+            return False
+        self.z_min, self.z_max = min(self.z_min, float(z_min)), max(self.z_max, float(z_max))
+        return True
+
+    def step_for(self, max_resolution):
+        return max(1, -(-(max(self.shape) - 1) // max(max_resolution - 1, 1)))
+
+    def surface(self, max_resolution=DEFAULT_HEIGHT_FIELD_RESOLUTION):
+        # Every step-th sample plus the last row and column, so the surface always reaches the end of
+        # x_range and y_range.
+        step = self.step_for(max_resolution)
+        nx, ny = self.shape
+        x_values = np.linspace(self.x_range[0], self.x_range[1], nx)[strided_indices(nx, step)]
+        y_values = np.linspace(self.y_range[0], self.y_range[1], ny)[strided_indices(ny, step)]
+        z_values = self._decimated(self.z_values, step)
+        if self.mask is not None:
+            z_values = np.where(np.asarray(self._decimated(self.mask, step), dtype=bool), z_values, np.nan)
+        surface = SurfaceData(x_values, y_values, z_values)
+        if self.has_z_range():
+            surface.z_min, surface.z_max = self.z_min, self.z_max
+        return surface
+
+    @staticmethod
+    def _decimated(values, step):
+        # A view when the stride ends on the last row and column; otherwise only the strided grid and the
+        # missing trailing row or column are read and copied.
+        nx, ny = values.shape
+        decimated = np.asarray(values[::step, ::step])
+        if (ny - 1) % step:
+            decimated = np.concatenate((decimated, values[::step, -1:]), axis=1)
+        if (nx - 1) % step:
+            last_row = values[-1:, ::step]
+            if (ny - 1) % step:
+                last_row = np.concatenate((last_row, values[-1:, -1:]), axis=1)
+            decimated = np.concatenate((decimated, last_row), axis=0)
+        return decimated
+
+    def sample(self, xs, ys):
+        # Bilinear interpolation of the full-resolution grid; NaN next to infeasible or missing samples.
+        xs = np.asarray(xs, dtype=np.float64)
+        ys = np.asarray(ys, dtype=np.float64)
+        i, tx = self._cell(xs, self.x_range, self.shape[0])
+        j, ty = self._cell(ys, self.y_range, self.shape[1])
+        i1 = np.minimum(i + 1, self.shape[0] - 1)
+        j1 = np.minimum(j + 1, self.shape[1] - 1)
+        return ((1 - tx) * (1 - ty) * self._heights(i, j) + tx * (1 - ty) * self._heights(i1, j)
+                + (1 - tx) * ty * self._heights(i, j1) + tx * ty * self._heights(i1, j1))
+
+    @staticmethod
+    def _cell(values, value_range, count):
+        span = value_range[1] - value_range[0]
+        position = np.clip((values - value_range[0]) / span * (count - 1) if span else 0.0, 0, count - 1)
+        index = np.minimum(np.floor(position).astype(np.intp), max(count - 2, 0))
+        return index, position - index
+
+    def _heights(self, i, j):
+        heights = np.asarray(self.z_values[i, j], dtype=np.float64)
+        if self.mask is not None:
+            heights = np.where(np.asarray(self.mask[i, j], dtype=bool), heights, np.nan)
+        return heights
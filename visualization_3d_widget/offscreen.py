@@ -0,0 +1,181 @@
+import ctypes
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from OpenGL.GL import *
+from OpenGL.raw.GL.VERSION.GL_1_0 import glReadPixels as read_pixels_raw
+from PyQt5.QtGui import (
+    QImage, QOffscreenSurface, QOpenGLContext, QOpenGLFramebufferObject, QOpenGLFramebufferObjectFormat
+)
+
+# Frames whose pixels are still being transferred while the next ones render.
+DEFAULT_READBACK_BUFFERS = 3
+
+
+def write_image(path, pixels):
+    # pixels are top-down (height, width, 4) RGBA bytes; QImage encodes outside the GIL.
+    pixels = np.ascontiguousarray(pixels)
+    height, width = pixels.shape[:2]
+    image = QImage(pixels.data, width, height, 4 * width, QImage.Format_RGBA8888)
+    if not image.save(path):
+        raise OSError(f"Could not write image '{path}'")
+
+
+def camera_sweep(widget, count, axis='z', degrees=360.0):
+    # Frame setups turning the camera by degrees about one of its rotation axes over count frames.
+    attribute = f'rotation_{axis}'
+    start = getattr(widget, attribute)
+    for index in range(count):
+        yield lambda angle=start + degrees * index / count: setattr(widget, attribute, angle)
+
+
+def timeline_frames(widget, step=1):
+    for iteration in range(0, widget.get_history_length(), step):
+        yield lambda iteration=iteration: widget.seek_timeline(iteration)
+
+
+class OffscreenRenderer:
+    # Renders a widget's scene into a framebuffer object of any size, with no window or display (e.g. Mesa
+    # llvmpipe under QT_QPA_PLATFORM=offscreen). Its context shares objects with the widget's when the widget
+    # has one, so nothing is uploaded twice. Frames are read back through a ring of pixel buffer objects:
+    # a frame's pixels are only copied out once later frames have been submitted, and PNG encoding runs on
+    # a thread pool meanwhile.
+    def __init__(self, widget, width, height, samples=0, readback_buffers=DEFAULT_READBACK_BUFFERS):
+        self.widget = widget
+        self.width = width
+        self.height = height
+        self.context = QOpenGLContext()
+        share_context = widget.context() if widget.context() is not None else QOpenGLContext.globalShareContext()
+        self.shared = share_context is not None and share_context.isValid()
+        if self.shared:
+            self.context.setShareContext(share_context)
+        if not self.context.create():
+            raise RuntimeError("Could not create an OpenGL context for offscreen rendering")
+        self.surface = QOffscreenSurface()
+        self.surface.setFormat(self.context.format())
+        self.surface.create()
+        self.make_current()
+
+        framebuffer_format = QOpenGLFramebufferObjectFormat()
+        framebuffer_format.setAttachment(QOpenGLFramebufferObject.CombinedDepthStencil)
+        framebuffer_format.setSamples(samples)
+        self.framebuffer = QOpenGLFramebufferObject(width, height, framebuffer_format)
+        # Multisampled framebuffers cannot be read directly and are resolved into a plain one first.
+        self.resolved = QOpenGLFramebufferObject(width, height) if samples else None
+        if not self.framebuffer.isValid():
+            self.close()
+            raise RuntimeError(f"Could not create a {width}x{height} framebuffer object")
+        widget.setup_gl_state(width, height)
+
+        self.frame_bytes = width * height * 4
+        self.pixel_buffers = [int(buffer) for buffer in np.atleast_1d(glGenBuffers(readback_buffers))]
+        for buffer in self.pixel_buffers:
+            glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+            glBufferData(GL_PIXEL_PACK_BUFFER, self.frame_bytes, None, GL_STREAM_READ)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.next_buffer = 0
+        self.pending = deque()
+        self.encoder = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='frame-encoder')
+        self.encodings = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def make_current(self):
+        if not self.context.makeCurrent(self.surface):
+            raise RuntimeError("Could not make the offscreen OpenGL context current")
+
+    def render_scene(self):
+        widget = self.widget
+        self.framebuffer.bind()
+        glViewport(0, 0, self.width, self.height)
+        widget.set_projection(self.width, self.height)
+        widget.render_size = (self.width, self.height)
+        try:
+            widget.render_scene()
+        finally:
+            widget.render_size = None
+        if self.resolved is not None:
+            QOpenGLFramebufferObject.blitFramebuffer(self.resolved, self.framebuffer)
+            self.resolved.bind()
+
+    def render(self):
+        # Synchronous: waits for the frame and returns top-down (height, width, 4) RGBA bytes.
+        self.make_current()
+        self.render_scene()
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        pixels = glReadPixels(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE)
+        QOpenGLFramebufferObject.bindDefault()
+        return np.frombuffer(pixels, dtype=np.uint8).reshape(self.height, self.width, 4)[::-1].copy()
+
+    def render_async(self, consumer):
+        # Starts the transfer of a frame into the next pixel buffer and returns without waiting for it;
+        # consumer(pixels) later runs on the encoder pool.
+        self.make_current()
+        if len(self.pending) == len(self.pixel_buffers):
+            self.collect()
+        buffer = self.pixel_buffers[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % len(self.pixel_buffers)
+        self.render_scene()
+        glPixelStorei(GL_PACK_ALIGNMENT, 1)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+        read_pixels_raw(0, 0, self.width, self.height, GL_RGBA, GL_UNSIGNED_BYTE, ctypes.c_void_p(0))
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        QOpenGLFramebufferObject.bindDefault()
+        self.pending.append((buffer, consumer))
+
+    def collect(self):
+        buffer, consumer = self.pending.popleft()
+        pixels = np.empty((self.height, self.width, 4), dtype=np.uint8)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, buffer)
+        glGetBufferSubData(GL_PIXEL_PACK_BUFFER, 0, self.frame_bytes, pixels)
+        glBindBuffer(GL_PIXEL_PACK_BUFFER, 0)
+        self.encodings.append(self.encoder.submit(consumer, pixels[::-1]))
+
+    def finish(self):
+        # Collects every frame still in flight and waits for their consumers; raises the first failure.
+        if self.pending:
+            self.make_current()
+        while self.pending:
+            self.collect()
+        encodings, self.encodings = self.encodings, []
+        for encoding in encodings:
+            encoding.result()
+
+    def export_frames(self, frames, path_pattern, writer=write_image):
+        # frames yields callables that set up the widget for one frame each; path_pattern is formatted with
+        # the frame index. Returns the written paths.
+        paths = []
+        for index, setup in enumerate(frames):
+            setup()
+            path = path_pattern.format(index)
+            self.render_async(lambda pixels, path=path: writer(path, pixels))
+            paths.append(path)
+        self.finish()
+        return paths
+
+    def close(self):
+        if self.context is None:
+            return
+        try:
+            if hasattr(self, 'encoder'):
+                self.finish()
+        finally:
+            self.make_current()
+            if getattr(self, 'pixel_buffers', None):
+                glDeleteBuffers(len(self.pixel_buffers), self.pixel_buffers)
+            self.framebuffer = None
+            self.resolved = None
+            if not self.shared:
+                # The widget's GL objects were created in this context and die with it.
+                self.widget.free_gl_resources()
+            self.context.doneCurrent()
+            if hasattr(self, 'encoder'):
+                self.encoder.shutdown()
+            self.context = None
+            self.surface.destroy()
@@ -0,0 +1,92 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from visualization_3d_widget.gl_buffers import GLBuffer, draw_vertex_buffer
+
+DEFAULT_PATH_CAPACITY = 1024
+
+
+class PathBuffer:
+    def __init__(self, capacity=DEFAULT_PATH_CAPACITY, max_length=None):
+        self.gpu_buffer = GLBuffer(GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
+        self.allocate(capacity, max_length)
+
+    def allocate(self, capacity, max_length):
+        # With max_length set the buffer is a ring keeping the newest points. Every point is written twice,
+        # at slot and slot + max_length, so the live window is always one contiguous range for drawing.
+        self.max_length = max_length
+        self.start = 0
+        self.length = 0
+        rows = 2 * max_length if max_length else capacity
+        self.vertices = np.zeros((rows, 3), dtype=np.float32)
+        self.gpu_buffer.set_data(self.vertices)
+
+    def set_max_length(self, max_length):
+        vertices = self.view().copy()
+        self.allocate(max(DEFAULT_PATH_CAPACITY, len(vertices)), max_length)
+        self.append(vertices)
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def nbytes(self):
+        return self.vertices.nbytes
+
+    def view(self):
+        return self.vertices[self.start:self.start + self.length]
+
+    def clear(self):
+        self.start = 0
+        self.length = 0
+
+    def append(self, vertices):
+        vertices = np.asarray(vertices, dtype=np.float32).reshape(-1, 3)
+        if self.max_length:
+            self.append_ring(vertices[-self.max_length:])
+        else:
+            self.append_growable(vertices)
+
+    def append_growable(self, vertices):
+        end = self.length + len(vertices)
+        if end > len(self.vertices):
+            capacity = max(end, 2 * len(self.vertices))
+            grown = np.zeros((capacity, 3), dtype=np.float32)
+            grown[:self.length] = self.vertices[:self.length]
+            self.vertices = grown
+            self.gpu_buffer.set_data(self.vertices)
+        self.vertices[self.length:end] = vertices
+        self.gpu_buffer.update_range(self.length, end)
+        self.length = end
+
+    def append_ring(self, vertices):
+        capacity = self.max_length
+        count = len(vertices)
+        first = (self.start + self.length) % capacity
+        slots = (first + np.arange(count)) % capacity
+        self.vertices[slots] = vertices
+        self.vertices[slots + capacity] = vertices
+        for range_start, range_stop in ((first, min(first + count, capacity)), (0, first + count - capacity)):
+            self.gpu_buffer.update_range(range_start, range_stop)
+            self.gpu_buffer.update_range(range_start + capacity, range_stop + capacity)
+        total = self.length + count
+        if total > capacity:
+            self.start = (self.start + total - capacity) % capacity
+        self.length = min(total, capacity)
+
+    def set_z(self, z_values):
+        rows = self.start + np.arange(self.length)
+        self.vertices[rows, 2] = z_values
+        if self.max_length:
+            mirrored = np.where(rows < self.max_length, rows + self.max_length, rows - self.max_length)
+            self.vertices[mirrored, 2] = z_values
+        self.gpu_buffer.update_range(0, len(self.vertices))
+
+    def draw(self, mode, first=0, count=None):
+        if count is None:
+            count = self.length - first
+        draw_vertex_buffer(self.gpu_buffer, mode, self.start + first, count)
+
+    def release(self):
+        self.gpu_buffer.release()
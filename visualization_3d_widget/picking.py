@@ -0,0 +1,136 @@
+import heapq
+
+import numpy as np
+
+from visualization_3d_widget.surface_data import SurfaceData
+
+_EPSILON = 1e-12
+
+
+def _reduce(values, reducer, fill):
+    # Combines 2x2 blocks, padding odd sizes with a value that never wins.
+    nx, ny = values.shape
+    padded = np.full((nx + nx % 2, ny + ny % 2), fill)
+    padded[:nx, :ny] = values
+    rows = reducer(padded[0::2], padded[1::2])
+    return reducer(rows[:, 0::2], rows[:, 1::2])
+
+
+def _slab(origin, inverse_direction, lower, upper):
+    with np.errstate(invalid='ignore'):
+        t0 = (lower - origin) * inverse_direction
+        t1 = (upper - origin) * inverse_direction
+    t_enter = np.nanmax(np.minimum(t0, t1))
+    t_exit = np.nanmin(np.maximum(t0, t1))
+    return t_enter, t_exit
+
+
+def ray_triangles(origin, direction, a, b, c):
+    # Möller-Trumbore for arrays of triangles; returns the ray parameter of each hit, inf for misses.
+    edge1 = b - a
+    edge2 = c - a
+    p = np.cross(direction, edge2)
+    determinant = np.einsum('...i,...i', edge1, p)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        inverse = 1.0 / determinant
+        s = origin - a
+        u = np.einsum('...i,...i', s, p) * inverse
+        q = np.cross(s, edge1)
+        v = np.einsum('...i,...i', np.broadcast_to(direction, q.shape), q) * inverse
+        t = np.einsum('...i,...i', edge2, q) * inverse
+    hit = (np.abs(determinant) > _EPSILON) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t >= 0)
+    return np.where(hit, t, np.inf)
+
+
+class GridPicker:
+    # Min/max mipmap over the cells of a grid surface: level 0 holds the z range of every cell and each
+    # level above combines 2x2 blocks of the one below. Rays descend front to back and skip every block
+    # whose box they miss, so a query visits O(log n) blocks on typical surfaces.
+    def __init__(self, x_values, y_values, z_values):
+        self.x_values = np.asarray(x_values, dtype=np.float64)
+        self.y_values = np.asarray(y_values, dtype=np.float64)
+        self.z_values = np.asarray(z_values)
+        z = self.z_values
+        corners = np.stack((z[:-1, :-1], z[1:, :-1], z[1:, 1:], z[:-1, 1:]))
+        valid = ~np.isnan(corners).any(axis=0)
+        with np.errstate(invalid='ignore'):
+            lower = np.where(valid, corners.min(axis=0), np.inf)
+            upper = np.where(valid, corners.max(axis=0), -np.inf)
+        self.levels = [(lower, upper)]
+        while lower.size and max(lower.shape) > 1:
+            lower = _reduce(lower, np.minimum, np.inf)
+            upper = _reduce(upper, np.maximum, -np.inf)
+            self.levels.append((lower, upper))
+
+    def box(self, level, i, j):
+        size = 2 ** level
+        nx, ny = len(self.x_values), len(self.y_values)
+        lower, upper = self.levels[level]
+        return (np.array((self.x_values[i * size], self.y_values[j * size], lower[i, j])),
+                np.array((self.x_values[min((i + 1) * size, nx - 1)], self.y_values[min((j + 1) * size, ny - 1)],
+                          upper[i, j])))
+
+    def pick(self, origin, direction):
+        origin = np.asarray(origin, dtype=np.float64)
+        direction = np.asarray(direction, dtype=np.float64)
+        if not self.levels[0][0].size:
+            return None
+        with np.errstate(divide='ignore'):
+            inverse_direction = 1.0 / direction
+        best = np.inf
+        queue = []
+        self.push(queue, origin, inverse_direction, len(self.levels) - 1, 0, 0)
+        while queue:
+            t_enter, level, i, j = heapq.heappop(queue)
+            if t_enter >= best:
+                break
+            if level == 0:
+                best = min(best, self.intersect_cell(origin, direction, i, j))
+                continue
+            lower = self.levels[level - 1][0]
+            for ci in (2 * i, 2 * i + 1):
+                for cj in (2 * j, 2 * j + 1):
+                    if ci < lower.shape[0] and cj < lower.shape[1]:
+                        self.push(queue, origin, inverse_direction, level - 1, ci, cj)
+        if best == np.inf:
+            return None
+        return origin + best * direction
+
+    def push(self, queue, origin, inverse_direction, level, i, j):
+        lower, upper = self.levels[level]
+        if lower[i, j] > upper[i, j]:
+            return
+        t_enter, t_exit = _slab(origin, inverse_direction, *self.box(level, i, j))
+        if t_exit >= max(t_enter, 0.0):
+            heapq.heappush(queue, (max(t_enter, 0.0), level, i, j))
+
+    def intersect_cell(self, origin, direction, i, j):
+        x, y, z = self.x_values, self.y_values, self.z_values
+        a = np.array((x[i], y[j], z[i, j]))
+        b = np.array((x[i + 1], y[j], z[i + 1, j]))
+        c = np.array((x[i + 1], y[j + 1], z[i + 1, j + 1]))
+        d = np.array((x[i], y[j + 1], z[i, j + 1]))
+        # Same split as grid_triangle_indices, so the hit lies on the drawn triangles.
+        return ray_triangles(origin, direction, np.stack((a, a)), np.stack((b, c)), np.stack((c, d))).min()
+
+
+class TrianglePicker:
+    # Brute-force but vectorized ray casting for indexed meshes such as adaptive tessellations.
+    def __init__(self, vertices, indices):
+        triangles = np.asarray(vertices, dtype=np.float64)[np.asarray(indices).reshape(-1, 3)]
+        self.a, self.b, self.c = triangles[:, 0], triangles[:, 1], triangles[:, 2]
+
+    def pick(self, origin, direction):
+        if not len(self.a):
+            return None
+        t = ray_triangles(np.asarray(origin, dtype=np.float64), np.asarray(direction, dtype=np.float64),
+                          self.a, self.b, self.c).min()
+        if t == np.inf:
+            return None
+        return np.asarray(origin) + t * np.asarray(direction)
+
+
+def surface_picker(surface):
+    if isinstance(surface, SurfaceData):
+        return GridPicker(surface.x_values, surface.y_values, surface.z_values)
+    return TrianglePicker(surface.raw_vertices(), surface.triangle_indices())
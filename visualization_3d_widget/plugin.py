@@ -1,6 +1,5 @@
 from PyQt5.QtDesigner import QPyDesignerCustomWidgetPlugin
 from PyQt5.QtGui import QIcon
-from visualization_3d_widget.visualization_3d_widget import Visualization3DWidget
 
 
 class Visualization3DWidgetPlugin(QPyDesignerCustomWidgetPlugin):
@@ -17,6 +16,9 @@ class Visualization3DWidgetPlugin(QPyDesignerCustomWidgetPlugin):
         return self.initialized
 
     def createWidget(self, parent):
+        # Designer loads every plugin at startup; numpy, PyOpenGL and the widget are only imported once a
+        # widget is actually placed.
+        from visualization_3d_widget.visualization_3d_widget import Visualization3DWidget
         return Visualization3DWidget(parent)
 
     def name(self):
@@ -0,0 +1,144 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from visualization_3d_widget.colormaps import apply_colormap
+from visualization_3d_widget.gl_buffers import GLBuffer
+from visualization_3d_widget.shaders import COLOR_ATTRIBUTE, POSITION_ATTRIBUTE, SIZE_ATTRIBUTE
+
+DEFAULT_POPULATION_CAPACITY = 4096
+DEFAULT_MEMBER_COLOR = (0.0, 0.4, 1.0)
+DEFAULT_MEMBER_SIZE = 6.0
+
+
+def member_colors(count, colors=None, fitness=None, colormap_lut=None):
+    # Explicit colors win; otherwise members are colored by fitness relative to their own generation,
+    # lowest (best) first in the colormap.
+    if colors is not None:
+        colors = np.asarray(colors, dtype=np.float64)
+        if colors.ndim == 1:
+            colors = np.broadcast_to(colors, (count, len(colors)))
+    elif fitness is not None and colormap_lut is not None:
+        fitness = np.asarray(fitness, dtype=np.float64)
+        valid = fitness[np.isfinite(fitness)]
+        low, high = (valid.min(), valid.max()) if len(valid) else (0.0, 1.0)
+        colors = apply_colormap(colormap_lut, (fitness - low) / (high - low if high != low else 1.0))
+    else:
+        colors = np.broadcast_to(DEFAULT_MEMBER_COLOR, (count, 3))
+    if colors.shape[1] == 3:
+        colors = np.column_stack((colors, np.ones(count)))
+    return np.clip(np.asarray(colors) * 255 + 0.5, 0, 255).astype(np.uint8)
+
+
+class PopulationBuffer:
+    # Members of every generation stored back to back, so any run of generations is one contiguous range
+    # of vertices and is drawn with a single glDrawArrays. Colors are RGBA bytes; positions carry raw z.
+    def __init__(self, capacity=DEFAULT_POPULATION_CAPACITY):
+        self.position_buffer = GLBuffer(GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
+        self.color_buffer = GLBuffer(GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
+        self.size_buffer = GLBuffer(GL_ARRAY_BUFFER, GL_DYNAMIC_DRAW)
+        self.allocate(capacity)
+
+    def allocate(self, capacity):
+        self.positions = np.zeros((capacity, 3), dtype=np.float32)
+        self.colors = np.zeros((capacity, 4), dtype=np.uint8)
+        self.sizes = np.zeros(capacity, dtype=np.float32)
+        self.fitness = np.full(capacity, np.nan, dtype=np.float32)
+        self.offsets = [0]
+        self.upload_all()
+
+    def upload_all(self):
+        for buffer, data in zip(self.buffers, (self.positions, self.colors, self.sizes)):
+            buffer.set_data(data)
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    @property
+    def buffers(self):
+        return (self.position_buffer, self.color_buffer, self.size_buffer)
+
+    @property
+    def generation_count(self):
+        return len(self.offsets) - 1
+
+    @property
+    def nbytes(self):
+        return self.positions.nbytes + self.colors.nbytes + self.sizes.nbytes + self.fitness.nbytes
+
+    def generation_range(self, first, last):
+        return self.offsets[first], self.offsets[last + 1]
+
+    def generation(self, index):
+        start, stop = self.generation_range(index, index)
+        return self.positions[start:stop], self.fitness[start:stop]
+
+    def clear(self):
+        self.offsets = [0]
+
+    def append(self, positions, colors, sizes, fitness=None):
+        positions = np.asarray(positions, dtype=np.float32).reshape(-1, 3)
+        start = len(self)
+        end = start + len(positions)
+        if end > len(self.positions):
+            self.grow(max(end, 2 * len(self.positions)))
+        self.positions[start:end] = positions
+        self.colors[start:end] = colors
+        self.sizes[start:end] = sizes
+        self.fitness[start:end] = np.nan if fitness is None else fitness
+        for buffer in self.buffers:
+            buffer.update_range(start, end)
+        self.offsets.append(end)
+        return self.generation_count - 1
+
+    def grow(self, capacity):
+        count = len(self)
+        for name in ('positions', 'colors', 'sizes', 'fitness'):
+            values = getattr(self, name)
+            grown = np.zeros((capacity,) + values.shape[1:], dtype=values.dtype)
+            grown[:count] = values[:count]
+            setattr(self, name, grown)
+        self.upload_all()
+
+    def set_z(self, z_values):
+        self.positions[:len(self), 2] = z_values
+        self.position_buffer.update_range(0, len(self))
+
+    def draw(self, first, last, sized=False):
+        # sized draws through the population shader, which takes per-member point sizes.
+        start, stop = self.generation_range(first, last)
+        if stop <= start:
+            return
+        if sized:
+            self.draw_sized(start, stop - start)
+            return
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        self.position_buffer.bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        self.color_buffer.bind()
+        glColorPointer(4, GL_UNSIGNED_BYTE, 0, None)
+        glDrawArrays(GL_POINTS, start, stop - start)
+        self.color_buffer.unbind()
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def draw_sized(self, first, count):
+        glEnable(GL_VERTEX_PROGRAM_POINT_SIZE)
+        for location in (POSITION_ATTRIBUTE, COLOR_ATTRIBUTE, SIZE_ATTRIBUTE):
+            glEnableVertexAttribArray(location)
+        self.position_buffer.bind()
+        glVertexAttribPointer(POSITION_ATTRIBUTE, 3, GL_FLOAT, GL_FALSE, 0, None)
+        self.color_buffer.bind()
+        glVertexAttribPointer(COLOR_ATTRIBUTE, 4, GL_UNSIGNED_BYTE, GL_TRUE, 0, None)
+        self.size_buffer.bind()
+        glVertexAttribPointer(SIZE_ATTRIBUTE, 1, GL_FLOAT, GL_FALSE, 0, None)
+        glDrawArrays(GL_POINTS, first, count)
+        self.size_buffer.unbind()
+        for location in (POSITION_ATTRIBUTE, COLOR_ATTRIBUTE, SIZE_ATTRIBUTE):
+            glDisableVertexAttribArray(location)
+        glDisable(GL_VERTEX_PROGRAM_POINT_SIZE)
+
+    def release(self):
+        for buffer in self.buffers:
+            buffer.release()
@@ -0,0 +1,176 @@
+import ctypes
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import OpenGL.error
+from OpenGL.GL import *
+from OpenGL.raw.GL.VERSION.GL_1_5 import glGetQueryObjectuiv as get_query_object_raw
+from OpenGL.raw.GL.VERSION.GL_3_3 import glGetQueryObjectui64v as get_query_object_64_raw
+from PyQt5.QtGui import QOpenGLContext
+
+from visualization_3d_widget.surface_sampling import evaluation_counter
+
+DEFAULT_PROFILE_WINDOW = 240
+# Frames a GPU timer query may stay in flight before its result is waited for.
+MAX_PENDING_QUERY_FRAMES = 4
+
+
+def timer_queries_supported():
+    context = QOpenGLContext.currentContext()
+    if context is None:
+        return False
+    return context.format().version() >= (3, 3) or context.hasExtension(b'GL_ARB_timer_query')
+
+
+# Both read through the raw entry points into explicit output values: PyOpenGL's wrapper of
+# glGetQueryObjectui64v has no array type for 64-bit unsigned results and raises KeyError.
+def query_available(query):
+    available = ctypes.c_uint32()
+    get_query_object_raw(query, GL_QUERY_RESULT_AVAILABLE, ctypes.byref(available))
+    return bool(available.value)
+
+
+def query_nanoseconds(query):
+    nanoseconds = ctypes.c_uint64()
+    get_query_object_64_raw(query, GL_QUERY_RESULT, ctypes.byref(nanoseconds))
+    return nanoseconds.value
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    values = np.fromiter(samples, dtype=np.float64)
+    p95, p99 = np.percentile(values, (95, 99))
+    return {'mean': float(values.mean()), 'p95': float(p95), 'p99': float(p99), 'max': float(values.max()),
+            'last': float(values[-1])}
+
+
+class FrameProfiler:
+    # Rolling windows of CPU time per render stage and of whole frames, plus GPU time per stage from
+    # GL_TIME_ELAPSED queries. Query results are collected a few frames later, once the GPU has them, so
+    # profiling never stalls the pipeline. Events such as surface builds are recorded by duration.
+    def __init__(self, window=DEFAULT_PROFILE_WINDOW):
+        self.window = window
+        self.cpu_times = {}
+        self.gpu_times = {}
+        self.event_times = {}
+        self.frame_times = deque(maxlen=window)
+        self.frame_starts = deque(maxlen=window)
+        self.frame_start = None
+        self.gpu_timing = None
+        self.free_queries = []
+        self.frame_queries = []
+        self.pending_queries = deque()
+        self.evaluations_start = evaluation_counter.count
+
+    def begin_frame(self):
+        if self.gpu_timing is None:
+            self.gpu_timing = timer_queries_supported()
+        if self.gpu_timing:
+            self.collect_queries()
+        self.frame_start = time.perf_counter()
+        self.frame_starts.append(self.frame_start)
+
+    def end_frame(self):
+        if self.frame_start is None:
+            return
+        self.frame_times.append(time.perf_counter() - self.frame_start)
+        self.frame_start = None
+        if self.frame_queries:
+            self.pending_queries.append(self.frame_queries)
+            self.frame_queries = []
+
+    @contextmanager
+    def stage(self, name):
+        query = self.begin_query()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(self.cpu_times, name, time.perf_counter() - start)
+            if query is not None:
+                glEndQuery(GL_TIME_ELAPSED)
+                self.frame_queries.append((name, query))
+
+    def record(self, times, name, seconds):
+        if name not in times:
+            times[name] = deque(maxlen=self.window)
+        times[name].append(seconds)
+
+    def record_event(self, name, seconds):
+        self.record(self.event_times, name, seconds)
+
+    # GPU timer queries
+
+    def begin_query(self):
+        if not self.gpu_timing or self.frame_start is None:
+            return None
+        try:
+            query = self.free_queries.pop() if self.free_queries else int(np.atleast_1d(glGenQueries(1))[0])
+            glBeginQuery(GL_TIME_ELAPSED, query)
+        except (OpenGL.error.Error, TypeError):
+            self.gpu_timing = False
+            return None
+        return query
+
+    def collect_queries(self):
+        while self.pending_queries:
+            queries = self.pending_queries[0]
+            ready = query_available(queries[-1][1])
+            if not ready and len(self.pending_queries) <= MAX_PENDING_QUERY_FRAMES:
+                return
+            for name, query in queries:
+                self.record(self.gpu_times, name, query_nanoseconds(query) / 1e9)
+                self.free_queries.append(query)
+            self.pending_queries.popleft()
+
+    def release(self):
+        queries = self.free_queries + [query for frame in self.pending_queries for _, query in frame]
+        queries += [query for _, query in self.frame_queries]
+        if queries:
+            glDeleteQueries(len(queries), queries)
+        self.free_queries = []
+        self.pending_queries.clear()
+        self.frame_queries = []
+        self.gpu_timing = None
+
+    # Results
+
+    def frame_rate(self):
+        if len(self.frame_starts) < 2:
+            return 0.0
+        span = self.frame_starts[-1] - self.frame_starts[0]
+        return (len(self.frame_starts) - 1) / span if span > 0 else 0.0
+
+    def stats(self):
+        stages = {}
+        for name in self.cpu_times:
+            stages[name] = {'cpu': summarize(self.cpu_times[name]), 'gpu': summarize(self.gpu_times.get(name, ()))}
+        return {
+            'frames': len(self.frame_times),
+            'frame_rate': self.frame_rate(),
+            'frame_time': summarize(self.frame_times),
+            'stages': stages,
+            'events': {name: dict(summarize(times), count=len(times)) for name, times in self.event_times.items()},
+            'evaluations': evaluation_counter.count - self.evaluations_start,
+            'gpu_timing': bool(self.gpu_timing),
+        }
+
+    def overlay_lines(self):
+        stats = self.stats()
+        frame_time = stats['frame_time']
+        if frame_time is None:
+            return []
+        lines = [f"{stats['frame_rate']:.1f} fps  frame {frame_time['mean'] * 1000:.2f} ms  "
+                 f"p95 {frame_time['p95'] * 1000:.2f}  p99 {frame_time['p99'] * 1000:.2f}"]
+        for name, times in stats['stages'].items():
+            line = f"{name:<12} cpu {times['cpu']['mean'] * 1000:6.2f} ms"
+            if times['gpu'] is not None:
+                line += f"  gpu {times['gpu']['mean'] * 1000:6.2f} ms"
+            lines.append(line)
+        for name, times in stats['events'].items():
+            lines.append(f"{name:<12} {times['last'] * 1000:.1f} ms (x{times['count']})")
+        lines.append(f"evaluations  {stats['evaluations']}")
+        return lines
@@ -0,0 +1,81 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from visualization_3d_widget.gl_buffers import GLBuffer, draw_colored_vertex_buffers
+
+GRID_COLOR = (0.7, 0.7, 0.7)
+AXIS_COLORS = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+AXIS_EXTENSION = 0.2
+TICK_SIZE = 0.2
+
+
+def grid_lines(grid_size_x, grid_size_y, grid_size_z, grid_step):
+    z_position = -grid_size_z
+    xs = np.arange(-grid_size_x, grid_size_x + 1, grid_step)
+    ys = np.arange(-grid_size_y, grid_size_y + 1, grid_step)
+    x_lines = np.empty((len(xs), 2, 3))
+    x_lines[:, :, 0] = xs[:, None]
+    x_lines[:, :, 1] = (-grid_size_y, grid_size_y)
+    y_lines = np.empty((len(ys), 2, 3))
+    y_lines[:, :, 0] = (-grid_size_x, grid_size_x)
+    y_lines[:, :, 1] = ys[:, None]
+    vertices = np.concatenate((x_lines, y_lines)).reshape(-1, 3)
+    vertices[:, 2] = z_position
+    return vertices, np.tile(GRID_COLOR, (len(vertices), 1))
+
+
+def axis_lines(grid_size_x, grid_size_y, grid_size_z):
+    vertices = np.zeros((6, 3))
+    for axis, grid_size in enumerate((grid_size_x, grid_size_y, grid_size_z)):
+        vertices[2 * axis, axis] = -grid_size - AXIS_EXTENSION
+        vertices[2 * axis + 1, axis] = grid_size + AXIS_EXTENSION
+    return vertices, np.repeat(AXIS_COLORS, 2, axis=0).astype(np.float64)
+
+
+def tick_lines(grid_size_x, grid_size_y, grid_size_z, grid_step):
+    # Each tick is two short segments crossing the axis along the other two directions.
+    vertices = []
+    colors = []
+    for axis, grid_size in enumerate((grid_size_x, grid_size_y, grid_size_z)):
+        positions = np.arange(-grid_size, grid_size + 1, grid_step)
+        positions = positions[positions != 0]
+        ticks = np.zeros((len(positions), 4, 3))
+        ticks[:, :, axis] = positions[:, None]
+        first, second = [other for other in range(3) if other != axis]
+        ticks[:, 0, first], ticks[:, 1, first] = -TICK_SIZE / 2, TICK_SIZE / 2
+        ticks[:, 2, second], ticks[:, 3, second] = -TICK_SIZE / 2, TICK_SIZE / 2
+        vertices.append(ticks.reshape(-1, 3))
+        colors.append(np.tile(AXIS_COLORS[axis], (4 * len(positions), 1)))
+    return np.concatenate(vertices), np.concatenate(colors)
+
+
+class SceneGeometry:
+    def __init__(self):
+        self.key = None
+        self.ranges = {}
+        self.positions = GLBuffer(GL_ARRAY_BUFFER)
+        self.colors = GLBuffer(GL_ARRAY_BUFFER)
+
+    def build(self, key, grid_size_x, grid_size_y, grid_size_z, grid_step):
+        parts = (
+            ('grid', grid_lines(grid_size_x, grid_size_y, grid_size_z, grid_step)),
+            ('axes', axis_lines(grid_size_x, grid_size_y, grid_size_z)),
+            ('ticks', tick_lines(grid_size_x, grid_size_y, grid_size_z, grid_step)),
+        )
+        self.ranges = {}
+        first = 0
+        for name, (vertices, _) in parts:
+            self.ranges[name] = (first, len(vertices))
+            first += len(vertices)
+        self.positions.set_data(np.concatenate([vertices for _, (vertices, _) in parts]).astype(np.float32))
+        self.colors.set_data(np.concatenate([colors for _, (_, colors) in parts]).astype(np.float32))
+        self.key = key
+
+    def draw(self, part):
+        first, count = self.ranges[part]
+        draw_colored_vertex_buffers(self.positions, self.colors, GL_LINES, first, count)
+
+    def release(self):
+        self.positions.release()
+        self.colors.release()
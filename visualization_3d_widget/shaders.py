@@ -0,0 +1,203 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+POSITION_ATTRIBUTE = 0
+GRADIENT_ATTRIBUTE = 1
+COLOR_ATTRIBUTE = 2
+SIZE_ATTRIBUTE = 3
+
+# Same light as the fixed-function GL_LIGHT0 set up in initializeGL, given in eye coordinates.
+LIGHT_POSITION = (10.0, 10.0, 10.0)
+AMBIENT = 0.4
+DIFFUSE = 0.8
+
+SURFACE_VERTEX_SHADER = """
+#version 120
+attribute vec3 position;
+attribute vec2 gradient;
+uniform float z_min;
+uniform float z_span;
+uniform float grid_size_z;
+varying float height;
+varying vec2 plane_position;
+varying vec3 eye_position;
+varying vec3 eye_normal;
+
+void main() {
+    height = (position.z - z_min) / z_span;
+    float z_scale = 2.0 * grid_size_z / z_span;
+    vec4 world_position = vec4(position.xy, height * 2.0 * grid_size_z - grid_size_z, 1.0);
+    plane_position = position.xy;
+    eye_position = vec3(gl_ModelViewMatrix * world_position);
+    eye_normal = gl_NormalMatrix * normalize(vec3(-gradient * z_scale, 1.0));
+    gl_Position = gl_ModelViewProjectionMatrix * world_position;
+}
+"""
+
+SURFACE_FRAGMENT_SHADER = """
+#version 120
+uniform sampler1D colormap;
+uniform bool use_colormap;
+uniform vec2 grid_size;
+uniform float shadow_strength;
+uniform vec3 light_position;
+uniform float ambient;
+uniform float diffuse;
+varying float height;
+varying vec2 plane_position;
+varying vec3 eye_position;
+varying vec3 eye_normal;
+
+void main() {
+    float t = clamp(height, 0.0, 1.0);
+    vec3 color;
+    if (use_colormap) {
+        color = texture1D(colormap, t).rgb;
+    } else {
+        float shadow = 1.0 - shadow_strength * (1.0 - sqrt(t));
+        color = vec3((plane_position + grid_size) / (2.0 * grid_size), 0.7) * shadow;
+    }
+    vec3 normal = normalize(eye_normal);
+    if (!gl_FrontFacing) {
+        normal = -normal;
+    }
+    float lambert = max(dot(normal, normalize(light_position - eye_position)), 0.0);
+    gl_FragColor = vec4(color * min(ambient + diffuse * lambert, 1.0), 1.0);
+}
+"""
+
+# Population members are drawn as points whose size comes from a vertex attribute. Positions carry raw z;
+# the z normalization is part of the modelview matrix, as for the optimization path.
+POPULATION_VERTEX_SHADER = """
+#version 120
+attribute vec3 position;
+attribute vec4 color;
+attribute float size;
+varying vec4 member_color;
+
+void main() {
+    member_color = color;
+    gl_PointSize = size;
+    gl_Position = gl_ModelViewProjectionMatrix * vec4(position, 1.0);
+}
+"""
+
+POPULATION_FRAGMENT_SHADER = """
+#version 120
+varying vec4 member_color;
+
+void main() {
+    gl_FragColor = member_color;
+}
+"""
+
+
+class ShaderProgram:
+    def __init__(self, vertex_source, fragment_source, attributes):
+        self.vertex_source = vertex_source
+        self.fragment_source = fragment_source
+        self.attributes = attributes
+        self.program_id = None
+        self.uniform_locations = {}
+
+    def build(self):
+        shaders = [self.compile_shader(GL_VERTEX_SHADER, self.vertex_source),
+                   self.compile_shader(GL_FRAGMENT_SHADER, self.fragment_source)]
+        program_id = glCreateProgram()
+        for shader in shaders:
+            glAttachShader(program_id, shader)
+        for name, location in self.attributes.items():
+            glBindAttribLocation(program_id, location, name)
+        glLinkProgram(program_id)
+        for shader in shaders:
+            glDetachShader(program_id, shader)
+            glDeleteShader(shader)
+        if not glGetProgramiv(program_id, GL_LINK_STATUS):
+            log = glGetProgramInfoLog(program_id)
+            glDeleteProgram(program_id)
+            raise RuntimeError(f"Shader program failed to link: {log}")
+        self.program_id = program_id
+
+    @staticmethod
+    def compile_shader(shader_type, source):
+        shader = glCreateShader(shader_type)
+        glShaderSource(shader, source)
+        glCompileShader(shader)
+        if not glGetShaderiv(shader, GL_COMPILE_STATUS):
+            log = glGetShaderInfoLog(shader)
+            glDeleteShader(shader)
+            raise RuntimeError(f"Shader failed to compile: {log}")
+        return shader
+
+    def uniform_location(self, name):
+        if name not in self.uniform_locations:
+            self.uniform_locations[name] = glGetUniformLocation(self.program_id, name)
+        return self.uniform_locations[name]
+
+    def set_int(self, name, value):
+        glUniform1i(self.uniform_location(name), int(value))
+
+    def set_float(self, name, *values):
+        setter = (glUniform1f, glUniform2f, glUniform3f, glUniform4f)[len(values) - 1]
+        setter(self.uniform_location(name), *(float(value) for value in values))
+
+    def use(self):
+        glUseProgram(self.program_id)
+
+    @staticmethod
+    def release_program():
+        glUseProgram(0)
+
+    def release(self):
+        if self.program_id is not None:
+            glDeleteProgram(self.program_id)
+            self.program_id = None
+        self.uniform_locations.clear()
+
+
+class ColormapTexture:
+    def __init__(self):
+        self.texture_id = None
+        self.lut = None
+        self.dirty = False
+
+    def set_lut(self, lut):
+        self.lut = np.ascontiguousarray(lut, dtype=np.float32)
+        self.dirty = True
+
+    def bind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        if self.texture_id is None:
+            self.texture_id = glGenTextures(1)
+        glBindTexture(GL_TEXTURE_1D, self.texture_id)
+        if self.dirty and self.lut is not None:
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MIN_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_MAG_FILTER, GL_LINEAR)
+            glTexParameteri(GL_TEXTURE_1D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE)
+            glTexImage1D(GL_TEXTURE_1D, 0, GL_RGB, len(self.lut), 0, GL_RGB, GL_FLOAT, self.lut)
+            self.dirty = False
+
+    def unbind(self, unit=0):
+        glActiveTexture(GL_TEXTURE0 + unit)
+        glBindTexture(GL_TEXTURE_1D, 0)
+
+    def release(self):
+        if self.texture_id is not None:
+            glDeleteTextures([self.texture_id])
+            self.texture_id = None
+        self.dirty = self.lut is not None
+
+
+def create_surface_program():
+    program = ShaderProgram(SURFACE_VERTEX_SHADER, SURFACE_FRAGMENT_SHADER,
+                            {'position': POSITION_ATTRIBUTE, 'gradient': GRADIENT_ATTRIBUTE})
+    program.build()
+    return program
+
+
+def create_population_program():
+    program = ShaderProgram(POPULATION_VERTEX_SHADER, POPULATION_FRAGMENT_SHADER,
+                            {'position': POSITION_ATTRIBUTE, 'color': COLOR_ATTRIBUTE, 'size': SIZE_ATTRIBUTE})
+    program.build()
+    return program
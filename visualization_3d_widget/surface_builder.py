@@ -0,0 +1,94 @@
+import threading
+import time
+from functools import partial
+
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from visualization_3d_widget.adaptive_mesh import adaptive_tessellation
+from visualization_3d_widget.surface_data import SURFACE_DTYPE, SurfaceData
+from visualization_3d_widget.surface_sampling import (
+    BuildCancelled, combine_masks, constraint_masks, evaluate_objective, make_grid
+)
+
+DEFAULT_PREVIEW_RESOLUTION = 32
+
+
+def progressive_levels(resolution, preview_resolution=DEFAULT_PREVIEW_RESOLUTION):
+    # Each level has 16x the points of the previous one, so the previews add ~7% to the total work. The
+    # last preview can have up to half the final resolution, which puts the worst case at ~27%.
+    levels = []
+    level = min(preview_resolution, resolution) if preview_resolution else resolution
+    while level * 2 <= resolution:
+        levels.append(level)
+        level *= 4
+    levels.append(resolution)
+    return levels
+
+
+def sample_surface(function, constraints, x_range, y_range, resolution, cancelled=None, objective=None,
+                   known_masks=None):
+    # objective and known_masks are results of earlier builds on the same grid that need no sampling.
+    x_values, y_values, X, Y = make_grid(x_range, y_range, resolution)
+    known_masks = known_masks or {}
+    masks = constraint_masks([constraint for constraint in constraints if constraint not in known_masks], X, Y,
+                             cancelled=cancelled)
+    masks.update((constraint, known_masks[constraint]) for constraint in constraints if constraint in known_masks)
+    if objective is None:
+        feasible = combine_masks(masks.values(), X.shape)
+        z_values = evaluate_objective(function, X, Y, feasible, cancelled=cancelled).astype(SURFACE_DTYPE)
+        objective = SurfaceData(x_values, y_values, z_values)
+    return objective.with_constraint_masks(masks)
+
+
+def uniform_build_steps(function, constraints, x_range, y_range, levels, objective=None, known_masks=None):
+    steps = [partial(sample_surface, function, list(constraints), x_range, y_range, level) for level in levels[:-1]]
+    steps.append(partial(sample_surface, function, list(constraints), x_range, y_range, levels[-1],
+                         objective=objective, known_masks=known_masks))
+    return steps
+
+
+def adaptive_build_steps(function, constraints, x_range, y_range, preview_resolution, base_cells, max_depth,
+                         tolerance):
+    # The uniform preview keeps the first frame fast; the quadtree replaces it once it is complete.
+    steps = []
+    if preview_resolution:
+        steps.append(partial(sample_surface, function, list(constraints), x_range, y_range, preview_resolution))
+    steps.append(partial(adaptive_tessellation, function, list(constraints), x_range, y_range, base_cells, max_depth,
+                         tolerance))
+    return steps
+
+
+class SurfaceBuildSignals(QObject):
+    level_ready = pyqtSignal(int, object, int, int, float)
+    failed = pyqtSignal(int, object)
+
+
+class SurfaceBuildJob(QRunnable):
+    # Every step is a callable taking the cancellation check and returning a surface; each result is
+    # shown as soon as it is ready and the last one is the final surface.
+    def __init__(self, signals, generation, steps):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.steps = steps
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            for index, step in enumerate(self.steps):
+                surface = step(cancelled=self.is_cancelled)
+                if self.is_cancelled():
+                    return
+                self.signals.level_ready.emit(self.generation, surface, index + 1, len(self.steps),
+                                              time.perf_counter() - start)
+        except BuildCancelled:
+            pass
+        except Exception as error:
+            self.signals.failed.emit(self.generation, error)
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+
+DEFAULT_SURFACE_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def surface_cache_key(function, constraints, x_range, y_range, detail):
+    # Functions are keyed by identity (or their own __eq__/__hash__); constraint order does not change the mask.
+    # detail is the grid resolution, or a tuple of the tessellation settings for adaptive meshes.
+    try:
+        constraints = frozenset(constraints)
+    except TypeError:
+        return None
+    return _hashable_key((function, constraints, tuple(x_range), tuple(y_range), detail))
+
+
+def constraint_mask_key(constraint, x_range, y_range, resolution):
+    return _hashable_key(('constraint', constraint, tuple(x_range), tuple(y_range), resolution))
+
+
+def _hashable_key(key):
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
+
+
+class SurfaceCache:
+    def __init__(self, max_bytes=DEFAULT_SURFACE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        if key is None:
+            return None
+        surface = self.entries.get(key)
+        if surface is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return surface
+
+    def put(self, key, surface):
+        if key is None:
+            return
+        if key in self.entries:
+            self.current_bytes -= self.entries.pop(key).nbytes
+        if surface.nbytes > self.max_bytes:
+            return
+        self.entries[key] = surface
+        self.current_bytes += surface.nbytes
+        self.evict()
+
+    def evict(self):
+        while self.current_bytes > self.max_bytes and self.entries:
+            _, surface = self.entries.popitem(last=False)
+            self.current_bytes -= surface.nbytes
+            self.evictions += 1
+
+    def set_max_bytes(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.evict()
+
+    def clear(self):
+        self.entries.clear()
+        self.current_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self.entries),
+            'bytes': self.current_bytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
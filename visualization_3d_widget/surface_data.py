@@ -0,0 +1,180 @@
+import numpy as np
+
+from visualization_3d_widget.colormaps import apply_colormap
+from visualization_3d_widget.surface_sampling import (
+    combine_masks, normalize_z, surface_colors, surface_gradients, z_range
+)
+
+# Sampled surfaces are stored in single precision, which is what the GPU buffers hold anyway.
+SURFACE_DTYPE = np.float32
+
+
+def strided_indices(count, step):
+    # Every step-th index, always keeping the last one so a coarser grid spans the same range.
+    indices = np.arange(0, count, step)
+    if indices[-1] != count - 1:
+        indices = np.append(indices, count - 1)
+    return indices
+
+
+def grid_triangle_indices(valid):
+    nx, ny = valid.shape
+    cells = valid[:-1, :-1] & valid[1:, :-1] & valid[1:, 1:] & valid[:-1, 1:]
+    i, j = np.nonzero(cells)
+    a = (i * ny + j).astype(np.uint32)
+    b = a + np.uint32(ny)
+    c = b + np.uint32(1)
+    d = a + np.uint32(1)
+    return np.stack((a, b, c, a, c, d), axis=-1).ravel()
+
+
+def unique_nbytes(holders, counted):
+    # Bytes of the arrays behind holders that are not in counted (a set of ids) yet. Surfaces derived from
+    # one another share their grids and masks, which would otherwise be counted once per surface.
+    nbytes = 0
+    for holder in holders:
+        for array in holder.arrays:
+            while isinstance(array.base, np.ndarray):
+                array = array.base
+            if id(array) not in counted:
+                counted.add(id(array))
+                nbytes += array.nbytes
+    return nbytes
+
+
+class BitMask:
+    # A boolean grid packed eight points to a byte. NumPy functions see it as the unpacked bool array,
+    # so it can be passed wherever a mask is expected.
+    def __init__(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        self.shape = mask.shape
+        self.bits = np.packbits(mask, axis=None)
+
+    @property
+    def arrays(self):
+        return (self.bits,)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def unpack(self):
+        return np.unpackbits(self.bits, count=int(np.prod(self.shape))).reshape(self.shape).view(bool)
+
+    def __array__(self, dtype=None, copy=None):
+        mask = self.unpack()
+        return mask if dtype is None else mask.astype(dtype)
+
+
+def pack_mask(mask):
+    return mask if isinstance(mask, BitMask) else BitMask(mask)
+
+
+class SurfaceData:
+    def __init__(self, x_values, y_values, z_values, objective_values=None, constraint_masks=None):
+        self.x_values = x_values
+        self.y_values = y_values
+        # z_values[i, j] is the sample at (x_values[i], y_values[j]); NaN marks infeasible points.
+        self.z_values = z_values
+        # The objective over the whole grid and the feasibility mask of every constraint, so constraints
+        # can be added or removed without sampling the objective again.
+        self.objective_values = z_values if objective_values is None else objective_values
+        self.constraint_masks = {constraint: pack_mask(mask) for constraint, mask in (constraint_masks or {}).items()}
+        self.z_min, self.z_max = z_range(z_values)
+
+    @property
+    def shape(self):
+        return self.z_values.shape
+
+    @property
+    def resolution(self):
+        return len(self.x_values)
+
+    @property
+    def vertex_count(self):
+        return self.z_values.size
+
+    @property
+    def arrays(self):
+        arrays = [self.x_values, self.y_values, self.z_values, self.objective_values]
+        return arrays + [mask.bits for mask in self.constraint_masks.values()]
+
+    @property
+    def nbytes(self):
+        nbytes = self.x_values.nbytes + self.y_values.nbytes + self.z_values.nbytes
+        if self.objective_values is not self.z_values:
+            nbytes += self.objective_values.nbytes
+        return nbytes + sum(mask.nbytes for mask in self.constraint_masks.values())
+
+    def objective(self):
+        return SurfaceData(self.x_values, self.y_values, self.objective_values)
+
+    def with_constraint_masks(self, constraint_masks):
+        if not constraint_masks:
+            return SurfaceData(self.x_values, self.y_values, self.objective_values)
+        feasible = combine_masks(constraint_masks.values(), self.objective_values.shape)
+        z_values = np.where(feasible, self.objective_values, np.nan).astype(self.objective_values.dtype, copy=False)
+        return SurfaceData(self.x_values, self.y_values, z_values, self.objective_values, dict(constraint_masks))
+
+    def with_constraint(self, constraint, mask):
+        constraint_masks = dict(self.constraint_masks)
+        constraint_masks[constraint] = mask
+        z_values = np.where(mask, self.z_values, np.nan).astype(self.z_values.dtype, copy=False)
+        return SurfaceData(self.x_values, self.y_values, z_values, self.objective_values, constraint_masks)
+
+    def without_constraint(self, constraint):
+        constraint_masks = dict(self.constraint_masks)
+        constraint_masks.pop(constraint, None)
+        return self.with_constraint_masks(constraint_masks)
+
+    def downsampled(self, step):
+        i = strided_indices(len(self.x_values), step)
+        j = strided_indices(len(self.y_values), step)
+        surface = SurfaceData(self.x_values[i], self.y_values[j], self.z_values[np.ix_(i, j)])
+        # Keep the z range of the full surface so every level is normalized the same way.
+        surface.z_min, surface.z_max = self.z_min, self.z_max
+        return surface
+
+    def grid(self):
+        return np.meshgrid(self.x_values, self.y_values, indexing='ij')
+
+    def valid_mask(self):
+        return ~np.isnan(self.z_values)
+
+    def triangle_indices(self):
+        return grid_triangle_indices(self.valid_mask())
+
+    def normalized_z(self, grid_size_z):
+        return normalize_z(self.z_values, self.z_min, self.z_max, grid_size_z)
+
+    def vertices(self, grid_size_z):
+        return self.vertex_array(self.normalized_z(grid_size_z))
+
+    def raw_vertices(self):
+        return self.vertex_array(self.z_values)
+
+    def vertex_array(self, z_values):
+        # Filled in place from the axis values, without full-size coordinate grids in between.
+        vertices = np.empty(self.shape + (3,), dtype=SURFACE_DTYPE)
+        vertices[..., 0] = self.x_values[:, None]
+        vertices[..., 1] = self.y_values[None, :]
+        vertices[..., 2] = z_values
+        return vertices
+
+    def gradients(self):
+        return surface_gradients(self.x_values, self.y_values, self.z_values)
+
+    def colors(self, grid_size_x, grid_size_y, colormap_lut=None):
+        if colormap_lut is not None:
+            span = self.z_max - self.z_min if self.z_max != self.z_min else 1.0
+            colors = apply_colormap(colormap_lut, (self.z_values - self.z_min) / span)
+            colors[~self.valid_mask()] = 0
+            return colors
+        return surface_colors(self.x_values[:, None], self.y_values[None, :], self.z_values, self.z_min, self.z_max,
+                              grid_size_x, grid_size_y)
+
+    def strips(self, grid_size_x, grid_size_y, grid_size_z):
+        # Shape (strips, 2 * ny, 2, 3): every strip is a sequence of (vertex, color) pairs.
+        nx, ny = self.shape
+        strip_data = np.stack((self.vertices(grid_size_z), self.colors(grid_size_x, grid_size_y)), axis=-2)
+        return np.stack((strip_data[:-1], strip_data[1:]), axis=2).reshape(nx - 1, 2 * ny, 2, 3)
@@ -0,0 +1,48 @@
+from visualization_3d_widget.surface_data import SurfaceData
+from visualization_3d_widget.surface_mesh import SurfaceMesh
+
+MIN_LEVEL_RESOLUTION = 16
+DEFAULT_INTERACTION_VERTICES = 256 * 256
+DEFAULT_FRAME_BUDGET = 1 / 30
+
+
+def detail_levels(surface, min_resolution=MIN_LEVEL_RESOLUTION):
+    # Level k keeps every 2 ** k-th sample of the grid; adaptive meshes are already sparse and only
+    # have the full level.
+    levels = [surface]
+    if isinstance(surface, SurfaceData):
+        while levels[-1].resolution // 2 >= min_resolution:
+            levels.append(levels[-1].downsampled(2))
+    return levels
+
+
+class SurfaceLevels:
+    # One mesh per detail level, each built the first time that level is drawn.
+    def __init__(self):
+        self.surfaces = []
+        self.meshes = []
+        self.dirty = []
+
+    def __len__(self):
+        return len(self.surfaces)
+
+    def set_surface(self, surface):
+        self.surfaces = detail_levels(surface)
+        while len(self.meshes) < len(self.surfaces):
+            self.meshes.append(SurfaceMesh())
+        for mesh in self.meshes[len(self.surfaces):]:
+            mesh.clear()
+        self.dirty = [True] * len(self.surfaces)
+
+    def level_for_vertices(self, max_vertices):
+        for level, surface in enumerate(self.surfaces):
+            if surface.vertex_count <= max_vertices:
+                return level
+        return len(self.surfaces) - 1
+
+    def built_levels(self):
+        return [(surface, mesh) for surface, mesh, dirty in zip(self.surfaces, self.meshes, self.dirty) if not dirty]
+
+    def release(self):
+        for mesh in self.meshes:
+            mesh.release()
@@ -0,0 +1,101 @@
+from OpenGL.GL import *
+
+import numpy as np
+
+from visualization_3d_widget.gl_buffers import GLBuffer
+from visualization_3d_widget.shaders import GRADIENT_ATTRIBUTE, POSITION_ATTRIBUTE
+
+
+class SurfaceMesh:
+    # The fixed-function path uses normalized positions and per-vertex colors; the shader path uses
+    # raw positions and height gradients and normalizes, colors and lights the surface on the GPU.
+    def __init__(self):
+        self.positions = GLBuffer(GL_ARRAY_BUFFER)
+        self.colors = GLBuffer(GL_ARRAY_BUFFER)
+        self.gradients = GLBuffer(GL_ARRAY_BUFFER)
+        self.indices = GLBuffer(GL_ELEMENT_ARRAY_BUFFER)
+        self.shaded = False
+
+    def set_positions(self, vertices):
+        positions = np.nan_to_num(np.asarray(vertices, dtype=np.float32).reshape(-1, 3))
+        self.positions.set_data(positions)
+
+    def set_colors(self, colors):
+        self.colors.set_data(np.asarray(colors, dtype=np.float32).reshape(-1, 3))
+
+    def set_indices(self, indices):
+        self.indices.set_data(np.asarray(indices, dtype=np.uint32))
+
+    def set_mesh(self, vertices, colors, indices):
+        self.shaded = False
+        self.set_positions(vertices)
+        self.set_colors(colors)
+        self.gradients.clear()
+        self.set_indices(indices)
+
+    def set_shaded_mesh(self, vertices, gradients, indices):
+        self.shaded = True
+        self.set_positions(vertices)
+        self.colors.clear()
+        self.gradients.set_data(np.nan_to_num(np.asarray(gradients, dtype=np.float32).reshape(-1, 2)))
+        self.set_indices(indices)
+
+    def clear(self):
+        self.positions.clear()
+        self.colors.clear()
+        self.gradients.clear()
+        self.indices.clear()
+
+    @property
+    def index_count(self):
+        return len(self.indices)
+
+    @property
+    def buffers(self):
+        return (self.positions, self.colors, self.gradients, self.indices)
+
+    @property
+    def nbytes(self):
+        return sum(buffer.nbytes for buffer in self.buffers)
+
+    @property
+    def allocated_bytes(self):
+        return sum(buffer.allocated_bytes for buffer in self.buffers)
+
+    def draw(self):
+        if self.index_count == 0:
+            return
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        self.positions.bind()
+        glVertexPointer(3, GL_FLOAT, 0, None)
+        self.colors.bind()
+        glColorPointer(3, GL_FLOAT, 0, None)
+        self.indices.bind()
+        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+        self.indices.unbind()
+        self.colors.unbind()
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
+
+    def draw_shaded(self):
+        if self.index_count == 0:
+            return
+        glEnableVertexAttribArray(POSITION_ATTRIBUTE)
+        glEnableVertexAttribArray(GRADIENT_ATTRIBUTE)
+        self.positions.bind()
+        glVertexAttribPointer(POSITION_ATTRIBUTE, 3, GL_FLOAT, GL_FALSE, 0, None)
+        self.gradients.bind()
+        glVertexAttribPointer(GRADIENT_ATTRIBUTE, 2, GL_FLOAT, GL_FALSE, 0, None)
+        self.indices.bind()
+        glDrawElements(GL_TRIANGLES, self.index_count, GL_UNSIGNED_INT, None)
+        self.indices.unbind()
+        self.gradients.unbind()
+        glDisableVertexAttribArray(GRADIENT_ATTRIBUTE)
+        glDisableVertexAttribArray(POSITION_ATTRIBUTE)
+
+    def release(self):
+        self.positions.release()
+        self.colors.release()
+        self.gradients.release()
+        self.indices.release()
@@ -0,0 +1,233 @@
+import threading
+import weakref
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 4096
+SHADOW_STRENGTH = 0.6
+
+_PROBE_COUNT = 3
+# What a function raises at points where it is undefined, e.g. math.sqrt(-1) or 1 / 0. Anything else is a bug
+# in the function and is raised.
+_UNDEFINED_POINT_ERRORS = (ValueError, ArithmeticError)
+# What calling a scalar-only function with arrays raises: math functions and float() want scalars, and
+# branching on an array is ambiguous.
+_SCALAR_ONLY_ERRORS = (TypeError,) + _UNDEFINED_POINT_ERRORS
+# Whether a function computes the same for arrays as for scalars, so every function is only probed once.
+_vectorized_functions = weakref.WeakKeyDictionary()
+
+
+class BuildCancelled(Exception):
+    pass
+
+
+class EvaluationCounter:
+    # Points passed to objective and constraint functions, summed over every thread that samples them.
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def add(self, count):
+        with self.lock:
+            self.count += count
+
+
+evaluation_counter = EvaluationCounter()
+
+
+def make_grid(x_range, y_range, resolution):
+    x_values = np.linspace(x_range[0], x_range[1], resolution)
+    y_values = np.linspace(y_range[0], y_range[1], resolution)
+    X, Y = np.meshgrid(x_values, y_values, indexing='ij')
+    return x_values, y_values, X, Y
+
+
+def evaluate_points(func, xs, ys, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None, skip_errors=False):
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    if xs.size == 0:
+        return np.empty(xs.shape)
+    _check_cancelled(cancelled)
+    evaluation_counter.add(xs.size)
+    values = _evaluate_vectorized(func, xs, ys)
+    if values is None:
+        values = _evaluate_chunked(func, xs.ravel(), ys.ravel(), chunk_size, cancelled,
+                                   skip_errors).reshape(xs.shape)
+    return values
+
+
+def evaluate_on_grid(func, X, Y, mask=None, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None):
+    result = np.full(X.shape, np.nan)
+    if mask is None:
+        mask = np.ones(X.shape, dtype=bool)
+    if mask.any():
+        result[mask] = evaluate_points(func, X[mask], Y[mask], chunk_size, cancelled)
+    return result
+
+
+def evaluate_objective(func, X, Y, feasible, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None):
+    # Infeasible points are sampled too so constraints can change without resampling; a function that
+    # fails there (e.g. outside its domain) leaves NaN instead of failing the build.
+    values = evaluate_on_grid(func, X, Y, feasible, chunk_size, cancelled)
+    infeasible = ~feasible
+    if infeasible.any():
+        try:
+            values[infeasible] = evaluate_points(func, X[infeasible], Y[infeasible], chunk_size, cancelled,
+                                                 skip_errors=True)
+        except _UNDEFINED_POINT_ERRORS:
+            # Undefined on the whole infeasible part; that is only an error when nothing is feasible either.
+            if not feasible.any():
+                raise
+    return values
+
+
+def constraint_masks(constraints, X, Y, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None):
+    # One mask per constraint over the whole grid, so any of them can later be dropped on its own.
+    return {constraint: single_constraint_mask(constraint, X, Y, chunk_size, cancelled) for constraint in constraints}
+
+
+def single_constraint_mask(constraint, X, Y, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None):
+    # Unlike constraint_mask this also evaluates points other constraints exclude, where a constraint may
+    # be undefined (e.g. outside its domain); points where it fails or returns NaN are infeasible.
+    values = evaluate_points(constraint, X, Y, chunk_size, cancelled, skip_errors=True)
+    with np.errstate(invalid='ignore'):
+        return values <= 0
+
+
+def combine_masks(masks, shape):
+    feasible = np.ones(shape, dtype=bool)
+    for mask in masks:
+        feasible &= mask
+    return feasible
+
+
+def constraint_mask(constraints, X, Y, chunk_size=DEFAULT_CHUNK_SIZE, cancelled=None):
+    mask = np.ones(X.shape, dtype=bool)
+    for constraint in constraints:
+        # Only points that are still feasible are passed on, like all() short-circuiting.
+        values = evaluate_on_grid(constraint, X, Y, mask, chunk_size, cancelled)
+        with np.errstate(invalid='ignore'):
+            mask &= values <= 0
+    return mask
+
+
+def z_range(z_values):
+    valid_z = z_values[~np.isnan(z_values)]
+    if len(valid_z) > 0:
+        return np.min(valid_z), np.max(valid_z)
+    return 0, 1
+
+
+def normalize_z(z_values, z_min, z_max, grid_size_z):
+    span = z_max - z_min if z_max != z_min else 1.0
+    return (z_values - z_min) / span * 2 * grid_size_z - grid_size_z
+
+
+def surface_colors(X, Y, z_values, z_min, z_max, grid_size_x, grid_size_y, shadow_strength=SHADOW_STRENGTH):
+    # X and Y only need to broadcast against z_values, e.g. a column and a row of grid coordinates.
+    span = z_max - z_min if z_max != z_min else 1.0
+    valid = ~np.isnan(z_values)
+    with np.errstate(invalid='ignore'):
+        z_shadow = np.sqrt(np.where(valid, (z_values - z_min) / span, 0.0))
+    shadow_intensity = 1.0 - shadow_strength * (1.0 - z_shadow)
+    colors = np.empty(z_values.shape + (3,), dtype=np.float32)
+    colors[..., 0] = (X + grid_size_x) / (2 * grid_size_x) * shadow_intensity
+    colors[..., 1] = (Y + grid_size_y) / (2 * grid_size_y) * shadow_intensity
+    colors[..., 2] = 0.7 * shadow_intensity
+    colors[~valid] = 0
+    return colors
+
+
+def _vectorized_verdict(func):
+    try:
+        return _vectorized_functions.get(func)
+    except TypeError:
+        return None
+
+
+def _remember_verdict(func, vectorized):
+    try:
+        _vectorized_functions[func] = vectorized
+    except TypeError:
+        pass
+
+
+def _evaluate_vectorized(func, xs, ys):
+    verdict = _vectorized_verdict(func)
+    if verdict is False:
+        return None
+    try:
+        with np.errstate(all='ignore'):
+            values = np.asarray(func(xs, ys), dtype=np.float64)
+        values = np.broadcast_to(values, xs.shape)
+    except _SCALAR_ONLY_ERRORS:
+        # Genuine errors of these kinds surface again when the function is called point by point.
+        _remember_verdict(func, False)
+        return None
+    if verdict:
+        return values.copy()
+    flat_x, flat_y, flat_values = xs.ravel(), ys.ravel(), values.ravel()
+    # A callable can accept arrays and still compute something different from its
+    # scalar result (e.g. Python's max() on arrays), so spot-check a few points.
+    for index in np.linspace(0, flat_x.size - 1, min(_PROBE_COUNT, flat_x.size)).astype(int):
+        try:
+            with np.errstate(all='ignore'):
+                expected = float(func(flat_x[index], flat_y[index]))
+        except _UNDEFINED_POINT_ERRORS:
+            return values.copy()
+        if not np.isclose(flat_values[index], expected, rtol=1e-7, atol=1e-12, equal_nan=True):
+            _remember_verdict(func, False)
+            return None
+    _remember_verdict(func, True)
+    return values.copy()
+
+
+def _check_cancelled(cancelled):
+    if cancelled is not None and cancelled():
+        raise BuildCancelled()
+
+
+def _evaluate_chunked(func, xs, ys, chunk_size, cancelled=None, skip_errors=False):
+    # With skip_errors, points where the function is undefined are NaN; if it is undefined everywhere the
+    # first error is raised, since that is more likely a broken function than an empty domain.
+    values = np.empty(xs.size)
+    first_error = None
+    failures = 0
+    for start in range(0, xs.size, chunk_size):
+        _check_cancelled(cancelled)
+        stop = min(start + chunk_size, xs.size)
+        if not skip_errors:
+            values[start:stop] = [func(x, y) for x, y in zip(xs[start:stop], ys[start:stop])]
+            continue
+        for index in range(start, stop):
+            try:
+                values[index] = func(xs[index], ys[index])
+            except _UNDEFINED_POINT_ERRORS as error:
+                values[index] = np.nan
+                failures += 1
+                if first_error is None:
+                    first_error = error
+    if failures and failures == xs.size:
+        raise first_error
+    return values
+
+
+def surface_gradients(x_values, y_values, z_values):
+    # Central differences where both neighbours are feasible, one-sided ones next to infeasible points
+    # and along the border, zero where a point has no feasible neighbour along an axis.
+    gradients = np.zeros(z_values.shape + (2,), dtype=np.float32)
+    for axis, coordinates in enumerate((x_values, y_values)):
+        if z_values.shape[axis] < 2:
+            continue
+        steps = np.diff(coordinates).reshape((-1, 1) if axis == 0 else (1, -1))
+        differences = np.diff(z_values, axis=axis) / steps
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (1, 0)
+        backward = np.pad(differences, padding, constant_values=np.nan)
+        padding[axis] = (0, 1)
+        forward = np.pad(differences, padding, constant_values=np.nan)
+        stacked = np.stack((backward, forward))
+        counts = np.sum(~np.isnan(stacked), axis=0)
+        totals = np.nansum(stacked, axis=0)
+        gradients[..., axis] = np.where(counts > 0, totals / np.maximum(counts, 1), 0.0)
+    return gradients
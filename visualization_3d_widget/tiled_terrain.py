@@ -0,0 +1,256 @@
+from collections import OrderedDict
+
+import numpy as np
+from PyQt5.QtCore import QObject, QRunnable, pyqtSignal
+
+from visualization_3d_widget.surface_data import SurfaceData
+from visualization_3d_widget.surface_mesh import SurfaceMesh
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_TILE_BUDGET_BYTES = 256 * 1024 * 1024
+# A tile is split into its children while one of its cells would cover more than this many pixels.
+DEFAULT_PIXEL_ERROR = 4.0
+MAX_PENDING_TILES = 8
+# Bytes per vertex of a tile on the GPU: positions, colors or gradients and two triangles of indices.
+_GPU_BYTES_PER_VERTEX = 12 + 12 + 24
+
+
+def tile_indices(start, stop, step):
+    indices = np.arange(start, stop + 1, step)
+    if indices[-1] != stop:
+        indices = np.append(indices, stop)
+    return indices
+
+
+class TerrainTile:
+    def __init__(self, key, surface):
+        self.key = key
+        self.surface = surface
+        self.indices = surface.triangle_indices()
+        valid_z = surface.z_values[~np.isnan(surface.z_values)]
+        self.z_range = (valid_z.min(), valid_z.max()) if len(valid_z) else None
+        self.mesh = SurfaceMesh()
+        self.mesh_key = None
+
+    @property
+    def nbytes(self):
+        return self.surface.nbytes + self.indices.nbytes + self.surface.vertex_count * _GPU_BYTES_PER_VERTEX
+
+    def release(self):
+        self.mesh.release()
+        self.mesh_key = None
+
+
+class TerrainTileSignals(QObject):
+    tile_loaded = pyqtSignal(object, object, object)
+
+
+class TerrainTileJob(QRunnable):
+    def __init__(self, signals, terrain, key):
+        super().__init__()
+        self.signals = signals
+        self.terrain = terrain
+        self.key = key
+
+    def run(self):
+        try:
+            surface = self.terrain.load_tile(self.key)
+        except Exception as error:
+            surface = error
+        self.signals.tile_loaded.emit(self.terrain, self.key, surface)
+
+
+class TiledTerrain:
+    # Splits a height field into a quadtree of tiles: a tile of level L samples every 2 ** L-th point, and
+    # its four children at level L - 1 cover the same area at twice the density. Tiles are read from
+    # the (typically memory-mapped) array on worker threads and kept in an LRU under a byte budget. Every
+    # loaded tile widens the height field's z range, so it never has to be scanned up front.
+    def __init__(self, height_field, tile_size=DEFAULT_TILE_SIZE, budget_bytes=DEFAULT_TILE_BUDGET_BYTES,
+                 pixel_error=DEFAULT_PIXEL_ERROR):
+        self.height_field = height_field
+        self.tile_size = tile_size
+        self.budget_bytes = budget_bytes
+        self.pixel_error = pixel_error
+        nx, ny = height_field.shape
+        self.top_level = 0
+        while tile_size * 2 ** self.top_level < max(nx, ny) - 1:
+            self.top_level += 1
+        self.x_step = (height_field.x_range[1] - height_field.x_range[0]) / max(nx - 1, 1)
+        self.y_step = (height_field.y_range[1] - height_field.y_range[0]) / max(ny - 1, 1)
+        self.tiles = OrderedDict()
+        self.current_bytes = 0
+        self.pending = set()
+        self.failed = set()
+        self.retired = []
+        self.in_use = set()
+        self.loads = 0
+        self.evictions = 0
+        self.root = (self.top_level, 0, 0)
+        self.add_tile(self.root, self.load_tile(self.root))
+
+    # Tile layout
+
+    def index_range(self, level, index, count):
+        span = self.tile_size * 2 ** level
+        start = index * span
+        if start >= max(count - 1, 1):
+            return None
+        return start, min(start + span, count - 1)
+
+    def children(self, key):
+        level, i, j = key
+        if level == 0:
+            return []
+        nx, ny = self.height_field.shape
+        return [(level - 1, 2 * i + di, 2 * j + dj) for di in (0, 1) for dj in (0, 1)
+                if self.index_range(level - 1, 2 * i + di, nx) and self.index_range(level - 1, 2 * j + dj, ny)]
+
+    def bounds(self, key, z_extent):
+        # Box of the tile in the scene, where heights are normalized to [-z_extent, z_extent]; tiles that are
+        # not loaded yet get the full height range.
+        level, i, j = key
+        field = self.height_field
+        nx, ny = field.shape
+        x_start, x_stop = self.index_range(level, i, nx)
+        y_start, y_stop = self.index_range(level, j, ny)
+        tile = self.tiles.get(key)
+        if tile is not None and tile.z_range is not None:
+            span = field.z_max - field.z_min if field.z_max != field.z_min else 1.0
+            z0, z1 = ((z - field.z_min) / span * 2 * z_extent - z_extent for z in tile.z_range)
+        else:
+            z0, z1 = -z_extent, z_extent
+        x0, y0 = field.x_range[0], field.y_range[0]
+        return (x0 + x_start * self.x_step, x0 + x_stop * self.x_step,
+                y0 + y_start * self.y_step, y0 + y_stop * self.y_step, z0, z1)
+
+    def load_tile(self, key):
+        level, i, j = key
+        field = self.height_field
+        nx, ny = field.shape
+        rows = tile_indices(*self.index_range(level, i, nx), 2 ** level)
+        columns = tile_indices(*self.index_range(level, j, ny), 2 ** level)
+        z_values = np.asarray(field.z_values[np.ix_(rows, columns)])
+        if field.mask is not None:
+            z_values = np.where(np.asarray(field.mask[np.ix_(rows, columns)], dtype=bool), z_values, np.nan)
+        x_values = field.x_range[0] + rows * self.x_step
+        y_values = field.y_range[0] + columns * self.y_step
+        surface = SurfaceData(x_values, y_values, z_values)
+        surface.z_min, surface.z_max = field.z_min, field.z_max
+        return surface
+
+    # Tile cache
+
+    def add_tile(self, key, surface):
+        self.pending.discard(key)
+        if isinstance(surface, Exception):
+            self.failed.add(key)
+            return
+        tile = TerrainTile(key, surface)
+        self.tiles[key] = tile
+        self.current_bytes += tile.nbytes
+        self.loads += 1
+        if tile.z_range is not None:
+            self.height_field.extend_z_range(*tile.z_range)
+
+    def tile_bytes_estimate(self):
+        return (self.tile_size + 1) ** 2 * (8 + _GPU_BYTES_PER_VERTEX)
+
+    def request_tiles(self, keys, start_job):
+        # Detail stops increasing once the tiles in view would no longer fit in the budget.
+        in_use_bytes = sum(self.tiles[key].nbytes for key in self.in_use if key in self.tiles)
+        for key in keys:
+            if len(self.pending) >= MAX_PENDING_TILES:
+                break
+            if in_use_bytes + (len(self.pending) + 1) * self.tile_bytes_estimate() > self.budget_bytes:
+                break
+            if key not in self.pending and key not in self.failed:
+                self.pending.add(key)
+                start_job(key)
+
+    def evict(self):
+        # GPU buffers are only released from draw calls, where the GL context is current.
+        for key in list(self.tiles):
+            if self.current_bytes <= self.budget_bytes:
+                break
+            if key in self.in_use or key == self.root:
+                continue
+            tile = self.tiles.pop(key)
+            self.current_bytes -= tile.nbytes
+            self.retired.append(tile)
+            self.evictions += 1
+
+    def set_budget_bytes(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+
+    # Selection
+
+    def select_tiles(self, view_projection, eye, pixels_per_radian, z_extent):
+        # Walks the quadtree from the root, splitting visible tiles whose cells are too large on screen.
+        # A tile is only replaced by its children once all visible children are loaded.
+        selected = []
+        interior = []
+        missing = []
+        stack = [self.root]
+        while stack:
+            key = stack.pop()
+            bounds = self.bounds(key, z_extent)
+            if not self.visible(view_projection, bounds):
+                continue
+            children = [child for child in self.children(key)
+                        if self.visible(view_projection, self.bounds(child, z_extent))]
+            if children and self.cell_pixels(key, bounds, eye, pixels_per_radian) > self.pixel_error:
+                absent = [child for child in children if child not in self.tiles]
+                if not absent:
+                    interior.append(key)
+                    stack.extend(children)
+                    continue
+                missing.extend(child for child in absent if child not in self.failed)
+            selected.append(key)
+        # Tiles the walk passed through must stay loaded too, or the next frame stops above them.
+        self.in_use = set(selected + interior)
+        for key in interior + selected:
+            self.tiles.move_to_end(key)
+        return selected, missing
+
+    @staticmethod
+    def box_corners(bounds):
+        x0, x1, y0, y1, z0, z1 = bounds
+        return np.array([(x, y, z, 1.0) for x in (x0, x1) for y in (y0, y1) for z in (z0, z1)])
+
+    def visible(self, view_projection, bounds):
+        clip = self.box_corners(bounds) @ view_projection.T
+        w = clip[:, 3:4]
+        return not (np.all(clip[:, :3] < -w, axis=0).any() or np.all(clip[:, :3] > w, axis=0).any())
+
+    def cell_pixels(self, key, bounds, eye, pixels_per_radian):
+        x0, x1, y0, y1, z0, z1 = bounds
+        nearest = np.clip(eye, (x0, y0, z0), (x1, y1, z1))
+        distance = max(np.linalg.norm(eye - nearest), 1e-6)
+        spacing = max(self.x_step, self.y_step) * 2 ** key[0]
+        return spacing / distance * pixels_per_radian
+
+    # GPU resources
+
+    def release_retired(self):
+        for tile in self.retired:
+            tile.release()
+        self.retired = []
+
+    def release(self):
+        for tile in self.tiles.values():
+            tile.release()
+        self.release_retired()
+
+    def stats(self):
+        levels = {}
+        for level, _, _ in self.tiles:
+            levels[level] = levels.get(level, 0) + 1
+        return {
+            'tiles': len(self.tiles),
+            'bytes': self.current_bytes,
+            'budget_bytes': self.budget_bytes,
+            'pending': len(self.pending),
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'tiles_per_level': levels,
+        }
@@ -0,0 +1,54 @@
+import numpy as np
+
+# 4x4 matrices for column vectors, composed in the same order as the equivalent glTranslatef/glRotatef calls.
+
+
+def translation(x, y, z):
+    matrix = np.eye(4)
+    matrix[:3, 3] = (x, y, z)
+    return matrix
+
+
+def rotation(angle, x, y, z):
+    axis = np.array((x, y, z), dtype=np.float64)
+    axis /= np.linalg.norm(axis)
+    x, y, z = axis
+    c = np.cos(np.radians(angle))
+    s = np.sin(np.radians(angle))
+    matrix = np.eye(4)
+    matrix[:3, :3] = (
+        (x * x * (1 - c) + c, x * y * (1 - c) - z * s, x * z * (1 - c) + y * s),
+        (y * x * (1 - c) + z * s, y * y * (1 - c) + c, y * z * (1 - c) - x * s),
+        (z * x * (1 - c) - y * s, z * y * (1 - c) + x * s, z * z * (1 - c) + c),
+    )
+    return matrix
+
+
+def look_at(eye, center, up):
+    eye = np.asarray(eye, dtype=np.float64)
+    forward = np.asarray(center, dtype=np.float64) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, up)
+    side /= np.linalg.norm(side)
+    up = np.cross(side, forward)
+    matrix = np.eye(4)
+    matrix[0, :3] = side
+    matrix[1, :3] = up
+    matrix[2, :3] = -forward
+    return matrix @ translation(*-eye)
+
+
+def transform_points(matrix, points):
+    points = np.asarray(points, dtype=np.float64)
+    return points @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def perspective(fovy, aspect, near, far):
+    f = 1.0 / np.tan(np.radians(fovy) / 2)
+    matrix = np.zeros((4, 4))
+    matrix[0, 0] = f / aspect
+    matrix[1, 1] = f
+    matrix[2, 2] = (far + near) / (near - far)
+    matrix[2, 3] = 2 * far * near / (near - far)
+    matrix[3, 2] = -1.0
+    return matrix
@@ -1,15 +1,74 @@
 from PyQt5.QtWidgets import QOpenGLWidget
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import QCoreApplication, QThreadPool, QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QColor, QFont, QPainter
 
+import time
+import warnings
+from contextlib import contextmanager, nullcontext
+
+import OpenGL.error
 from OpenGL.GL import *
-from OpenGL.GLUT import *
-from OpenGL.GLU import *
 
 import numpy as np
 
+from visualization_3d_widget.adaptive_mesh import DEFAULT_BASE_CELLS, DEFAULT_MAX_DEPTH, DEFAULT_TOLERANCE
+from visualization_3d_widget.axis_labels import AxisLabelBatch, axis_label_layout
+from visualization_3d_widget.colormaps import colormap_lut
+from visualization_3d_widget.constraint_boundaries import constraint_boundary_segments
+from visualization_3d_widget.expressions import compile_constraint_expression, compile_expression
+from visualization_3d_widget.gl_buffers import GLBuffer, draw_vertex_buffer
+from visualization_3d_widget.height_fields import DEFAULT_HEIGHT_FIELD_RESOLUTION, HeightField
+from visualization_3d_widget.offscreen import OffscreenRenderer, camera_sweep, timeline_frames, write_image
+from visualization_3d_widget.path_buffer import DEFAULT_PATH_CAPACITY, PathBuffer
+from visualization_3d_widget.picking import surface_picker
+from visualization_3d_widget.population_buffer import DEFAULT_MEMBER_SIZE, PopulationBuffer, member_colors
+from visualization_3d_widget.profiler import DEFAULT_PROFILE_WINDOW, FrameProfiler
+from visualization_3d_widget.scene_geometry import SceneGeometry
+from visualization_3d_widget.shaders import (
+    AMBIENT, DIFFUSE, LIGHT_POSITION, ColormapTexture, ShaderProgram, create_population_program,
+    create_surface_program
+)
+from visualization_3d_widget.surface_builder import (
+    DEFAULT_PREVIEW_RESOLUTION, SurfaceBuildJob, SurfaceBuildSignals, adaptive_build_steps, progressive_levels,
+    uniform_build_steps
+)
+from visualization_3d_widget.surface_cache import SurfaceCache, constraint_mask_key, surface_cache_key
+from visualization_3d_widget.surface_data import SurfaceData, pack_mask, unique_nbytes
+from visualization_3d_widget.surface_lod import DEFAULT_FRAME_BUDGET, DEFAULT_INTERACTION_VERTICES, SurfaceLevels
+from visualization_3d_widget.surface_sampling import SHADOW_STRENGTH, evaluate_points, single_constraint_mask
+from visualization_3d_widget.tiled_terrain import (
+    DEFAULT_TILE_BUDGET_BYTES, DEFAULT_TILE_SIZE, TerrainTileJob, TerrainTileSignals, TiledTerrain
+)
+from visualization_3d_widget.transforms import look_at, perspective, rotation, translation
+
+FIELD_OF_VIEW = 45
+NEAR_PLANE = 1
+FAR_PLANE = 100
+TESSELLATION_MODES = ('uniform', 'adaptive')
+# How long after the last wheel event zooming still counts as interaction.
+WHEEL_SETTLE_MS = 250
+# A press and release closer than this many pixels is a click rather than a drag.
+CLICK_TOLERANCE = 3
+# Iterations per second when replaying a recorded optimization run.
+DEFAULT_PLAYBACK_SPEED = 30.0
+# Profiling statistics are emitted at most this often, in seconds.
+PROFILE_SIGNAL_INTERVAL = 0.5
+
+
 class Visualization3DWidget(QOpenGLWidget):
+    # completed levels, total levels, resolution of the level just shown, seconds since the build started
+    surface_build_progress = pyqtSignal(int, int, int, float)
+    surface_build_finished = pyqtSignal(float)
+    surface_build_failed = pyqtSignal(object)
+    # x, y and f(x, y) of the surface point under the cursor
+    point_hovered = pyqtSignal(float, float, float)
+    point_clicked = pyqtSignal(float, float, float)
+    # iteration shown by timeline playback
+    timeline_position_changed = pyqtSignal(int)
+    # FrameProfiler.stats() while profiling is enabled
+    frame_stats_updated = pyqtSignal(object)
+
     def __init__(self, parent=None):
-        glutInit()
         super().__init__(parent)
 
         self.default_rotation_x = -50
@@ -28,6 +87,11 @@ class Visualization3DWidget(QOpenGLWidget):
 
         self.mouse_last_x = 0
         self.mouse_last_y = 0
+        self.mouse_press_x = 0
+        self.mouse_press_y = 0
+        self.picking_enabled = False
+        self.picker = None
+        self.picker_surface = None
         self.is_rotating = False
         self.is_moving = False
 
@@ -36,24 +100,96 @@ class Visualization3DWidget(QOpenGLWidget):
         self.grid_size_z = 10
         self.grid_step = 1
         self.resolution = 250
+        self.tessellation_mode = 'uniform'
+        self.adaptive_base_cells = DEFAULT_BASE_CELLS
+        self.adaptive_max_depth = DEFAULT_MAX_DEPTH
+        self.adaptive_tolerance = DEFAULT_TOLERANCE
 
         self.grid_visible = True
         self.axes_visible = True
         self.axis_ticks_and_numbers_visible = True
+        self.axis_labels = AxisLabelBatch()
+        self.scene_geometry = SceneGeometry()
 
         self.current_function = None
+        self.height_field = None
+        self.terrain = None
+        self.retired_terrains = []
+        self.terrain_signals = TerrainTileSignals(self)
+        self.terrain_signals.tile_loaded.connect(self.on_terrain_tile_loaded)
         self.constraints = []
         self.show_constraints = False
-        self.objective_function_data = None
-        self.display_lists = {}
+        self.constraint_segments = {}
+        self.constraint_boundary_key = None
+        self.constraint_boundary_lines = GLBuffer()
+        self.surface = None
+        self.surface_levels = SurfaceLevels()
+        self.interaction_lod = True
+        self.interaction_max_vertices = DEFAULT_INTERACTION_VERTICES
+        self.frame_budget = DEFAULT_FRAME_BUDGET
+        self.interaction_level = None
+        self.use_shaders = True
+        self.surface_program = None
+        self.surface_program_failed = False
+        self.colormap = None
+        self.colormap_lut = None
+        self.colormap_texture = ColormapTexture()
+        # Off by default so surface, z_min and z_max are up to date as soon as a setter returns; with it on,
+        # builds run on the thread pool and wait_for_surface() blocks until the final level is shown.
+        self.async_surface_builds = False
+        self.preview_resolution = DEFAULT_PREVIEW_RESOLUTION
+        self.surface_build_job = None
+        self.surface_build_generation = 0
+        self.surface_build_settings = None
+        self.complete_surface_settings = None
+        self.update_batch_depth = 0
+        self.surface_build_pending = False
+        self.surface_cache = SurfaceCache()
+        self.surface_build_signals = SurfaceBuildSignals(self)
+        self.surface_build_signals.level_ready.connect(self.on_surface_level_ready)
+        self.surface_build_signals.failed.connect(self.on_surface_build_failed)
         self.z_min = 0
         self.z_max = 0
-        self.optimization_path = np.array([])
+        self.path_buffer = PathBuffer()
+        # Set with set_optimization_path_limit; a loaded history is kept in full until the timeline stops.
+        self.path_limit = None
         self.connect_optimization_points = True
+        self.timeline_active = False
+        self.timeline_playing = False
+        self.timeline_position = 0.0
+        self.timeline_speed = DEFAULT_PLAYBACK_SPEED
+        self.timeline_trail = None
+        self.timeline_last_tick = 0.0
+        self.population_buffer = PopulationBuffer()
+        self.population_generations_visible = 1
+        self.population_point_size = DEFAULT_MEMBER_SIZE
+        self.population_colormap_lut = colormap_lut('viridis')
+        self.population_program = None
+        self.population_program_failed = False
+
+        self.render_on_demand = True
+        self.max_frame_rate = None
+        self.active_animations = set()
+        self.last_frame_time = 0.0
+        self.last_paint_duration = 0.0
+        # Size of the offscreen target while rendering into one, None when rendering the widget itself.
+        self.render_size = None
+        self.profiler = None
+        self.profile_overlay_visible = False
+        self.last_stats_emit = 0.0
 
         self.animation_timer = QTimer(self)
+        self.animation_timer.setInterval(16)
         self.animation_timer.timeout.connect(self.update)
-        self.animation_timer.start(16)
+
+        self.frame_cap_timer = QTimer(self)
+        self.frame_cap_timer.setSingleShot(True)
+        self.frame_cap_timer.timeout.connect(self.update)
+
+        self.wheel_timer = QTimer(self)
+        self.wheel_timer.setSingleShot(True)
+        self.wheel_timer.setInterval(WHEEL_SETTLE_MS)
+        self.wheel_timer.timeout.connect(self.schedule_update)
 
     def restore_default_view(self):
         self.rotation_x = self.default_rotation_x
@@ -62,10 +198,58 @@ class Visualization3DWidget(QOpenGLWidget):
         self.zoom_level = self.default_zoom_level
         self.position_x = self.default_position_x
         self.position_y = self.default_position_y
+        self.schedule_update()
+
+    # Repaint scheduling
+
+    def schedule_update(self):
+        # QWidget.update() already merges repeated requests into one paint event; the frame cap only
+        # delays that event when the previous frame was painted too recently.
+        if self.animation_timer.isActive() or self.frame_cap_timer.isActive():
+            return
+        if self.max_frame_rate:
+            remaining = 1.0 / self.max_frame_rate - (time.perf_counter() - self.last_frame_time)
+            if remaining > 0:
+                self.frame_cap_timer.start(int(remaining * 1000) + 1)
+                return
         self.update()
 
+    def begin_animation(self, name):
+        self.active_animations.add(name)
+        self.update_animation_timer()
+
+    def end_animation(self, name):
+        self.active_animations.discard(name)
+        self.update_animation_timer()
+
+    def update_animation_timer(self):
+        animating = bool(self.active_animations) or not self.render_on_demand
+        if animating and not self.animation_timer.isActive():
+            self.animation_timer.start()
+        elif not animating and self.animation_timer.isActive():
+            self.animation_timer.stop()
+
+    def set_render_on_demand(self, on_demand):
+        self.render_on_demand = on_demand
+        self.update_animation_timer()
+        self.schedule_update()
+
+    def get_render_on_demand(self):
+        return self.render_on_demand
+
+    def set_max_frame_rate(self, frame_rate):
+        self.max_frame_rate = frame_rate
+        self.animation_timer.setInterval(int(1000 / frame_rate) if frame_rate else 16)
+
+    def get_max_frame_rate(self):
+        return self.max_frame_rate
+
     def initializeGL(self):
-        glutInitDisplayMode(GLUT_DOUBLE | GLUT_RGB | GLUT_DEPTH)
+        self.setup_gl_state(self.width(), self.height())
+        self.context().aboutToBeDestroyed.connect(self.release_gl_resources)
+
+    def setup_gl_state(self, width, height):
+        # Everything initializeGL sets up in a fresh context; offscreen renderers call it for theirs.
         glEnable(GL_DEPTH_TEST)
         glEnable(GL_LINE_SMOOTH)
         glEnable(GL_BLEND)
@@ -91,430 +275,789 @@ class Visualization3DWidget(QOpenGLWidget):
         glLightfv(GL_LIGHT0, GL_SPECULAR, light_specular)
 
         glClearColor(1.0, 1.0, 1.0, 1.0)
-        glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(45, self.width() / self.height(), 1, 100)
-        glMatrixMode(GL_MODELVIEW)
+        self.set_projection(width, height)
+
+    def release_gl_resources(self):
+        self.makeCurrent()
+        self.free_gl_resources()
+        self.doneCurrent()
+
+    def free_gl_resources(self):
+        # Deletes every GL object of the scene in the current context; all of them are recreated on demand.
+        self.surface_levels.release()
+        self.release_retired_terrains()
+        if self.terrain is not None:
+            self.terrain.release()
+        self.constraint_boundary_lines.release()
+        self.path_buffer.release()
+        self.population_buffer.release()
+        self.axis_labels.release()
+        self.scene_geometry.release()
+        self.colormap_texture.release()
+        if self.surface_program is not None:
+            self.surface_program.release()
+            self.surface_program = None
+        if self.population_program is not None:
+            self.population_program.release()
+            self.population_program = None
+        if self.profiler is not None:
+            self.profiler.release()
 
     def resizeGL(self, width, height):
-        if height == 0:
-            height = 1
         glViewport(0, 0, width, height)
+        self.set_projection(width, height)
+
+    def set_projection(self, width, height):
+        height = max(height, 1)
         glMatrixMode(GL_PROJECTION)
-        glLoadIdentity()
-        gluPerspective(45, width / height, 1, 100)
+        # Matrices are row-major with column vectors, so their transpose is OpenGL's column-major layout.
+        glLoadMatrixd(perspective(FIELD_OF_VIEW, width / height, NEAR_PLANE, FAR_PLANE).T)
         glMatrixMode(GL_MODELVIEW)
 
+    def camera_matrix(self):
+        # The modelview matrix render_scene loads; also used on the CPU for picking and labels.
+        return (look_at((0, 0, self.zoom_level), (0, 0, 0), (0, 1, 0))
+                @ translation(self.position_x, self.position_y, 0)
+                @ rotation(self.rotation_x, 1, 0, 0)
+                @ rotation(self.rotation_y, 0, 1, 0)
+                @ rotation(self.rotation_z, 0, 0, 1))
+
+    def viewport_size(self):
+        return self.render_size or (self.width(), self.height())
+
+    def projection_matrix(self):
+        width, height = self.viewport_size()
+        return perspective(FIELD_OF_VIEW, width / max(height, 1), NEAR_PLANE, FAR_PLANE)
+
     def paintGL(self):
+        self.last_frame_time = time.perf_counter()
+        self.advance_timeline()
+        if self.profiler is None:
+            self.render_scene()
+        elif not self.profile_overlay_visible:
+            self.render_profiled_scene()
+        else:
+            painter = QPainter(self)
+            painter.beginNativePainting()
+            # QPainter leaves its own GL state behind, so the scene's is set up again.
+            self.setup_gl_state(self.width(), self.height())
+            self.render_profiled_scene()
+            painter.endNativePainting()
+            self.draw_profile_overlay(painter)
+            painter.end()
+        # CPU time to submit the frame; software rasterizers do most of their work inside the draw calls.
+        self.last_paint_duration = time.perf_counter() - self.last_frame_time
+
+    def render_scene(self):
+        # Draws the whole scene into the current framebuffer; shared by paintGL and offscreen rendering.
         glEnable(GL_LINE_SMOOTH)
         glEnable(GL_POLYGON_SMOOTH)
         glClear(GL_COLOR_BUFFER_BIT | GL_DEPTH_BUFFER_BIT)
-        glLoadIdentity()
-        gluLookAt(0, 0, self.zoom_level, 0, 0, 0, 0, 1, 0)
-        glTranslatef(self.position_x, self.position_y, 0)
-        glRotatef(self.rotation_x, 1, 0, 0)
-        glRotatef(self.rotation_y, 0, 1, 0)
-        glRotatef(self.rotation_z, 0, 0, 1)
+        glLoadMatrixd(self.camera_matrix().T)
         glPolygonMode(GL_FRONT_AND_BACK, GL_FILL)
         glDisable(GL_POLYGON_SMOOTH)
         glDisable(GL_LINE_SMOOTH)
 
         if self.grid_visible:
-            self.render_grid()
+            with self.profile_stage('grid'):
+                self.render_grid()
 
         if self.axes_visible:
-            self.render_axes()
-
-        if self.current_function and self.objective_function_data:
-            if 'function' not in self.display_lists:
-                self.display_lists['function'] = self.create_function_display_list()
-            glCallList(self.display_lists['function'])
+            with self.profile_stage('axes'):
+                self.render_axes()
+
+        self.release_retired_terrains()
+        with self.profile_stage('surface'):
+            if self.terrain is not None:
+                self.draw_terrain()
+            elif self.surface is not None and self.has_surface_source():
+                mesh = self.update_surface_mesh(self.surface_detail_level())
+                if mesh.shaded:
+                    self.draw_shaded_surface([mesh])
+                else:
+                    mesh.draw()
 
-        self.draw_optimization_path()
+        with self.profile_stage('path'):
+            self.draw_optimization_path()
+        with self.profile_stage('populations'):
+            self.draw_populations()
 
         if self.show_constraints and self.constraints:
-            self.draw_constraints()
-
-    def create_function_display_list(self):
-        display_list = glGenLists(1)
-        glNewList(display_list, GL_COMPILE)
-        if self.objective_function_data:
-            for strip in self.objective_function_data:
-                glBegin(GL_QUAD_STRIP)
-                current_strip_valid = False
-                for idx, (vertex, color) in enumerate(strip):
-                    current_valid = not np.isnan(vertex[2])
-                    if current_valid:
-                        glColor3f(*color)
-                        glVertex3f(*vertex)
-                        current_strip_valid = True
-                    elif current_strip_valid:
-                        glEnd()
-                        glBegin(GL_QUAD_STRIP)
-                        current_strip_valid = False
-                glEnd()
-        glEndList()
-        return display_list
+            with self.profile_stage('constraints'):
+                self.draw_constraints()
+
+    # Profiling
+
+    def profile_stage(self, name):
+        return self.profiler.stage(name) if self.profiler is not None else nullcontext()
+
+    def render_profiled_scene(self):
+        self.profiler.begin_frame()
+        self.render_scene()
+        self.profiler.end_frame()
+        now = time.perf_counter()
+        if now - self.last_stats_emit >= PROFILE_SIGNAL_INTERVAL:
+            self.last_stats_emit = now
+            self.frame_stats_updated.emit(self.profiler.stats())
+
+    def draw_profile_overlay(self, painter):
+        lines = self.profiler.overlay_lines()
+        if not lines:
+            return
+        painter.setFont(QFont('monospace', 9))
+        metrics = painter.fontMetrics()
+        line_height = metrics.height()
+        width = max(metrics.horizontalAdvance(line) for line in lines) + 8
+        painter.fillRect(4, 4, width, line_height * len(lines) + 8, QColor(255, 255, 255, 200))
+        painter.setPen(QColor(0, 0, 0))
+        for index, line in enumerate(lines):
+            painter.drawText(8, 8 + metrics.ascent() + index * line_height, line)
+
+    @property
+    def objective_function_data(self):
+        # Built on request from the float32 surface arrays as a list of (vertex, color) strips, like the list
+        # the widget used to keep; adaptive meshes give one degenerate quad strip per triangle.
+        if self.surface is None:
+            return None
+        return list(self.surface.strips(self.grid_size_x, self.grid_size_y, self.grid_size_z))
+
+    def memory_usage(self):
+        # Bytes held per component. Arrays shared between surfaces are counted once, under the first component
+        # holding them. Memory-mapped height fields are left out since their pages are loaded on demand;
+        # 'meshes' are the CPU copies kept for re-upload, 'gpu' what buffers currently hold.
+        levels = self.surface_levels
+        counted = set()
+        field = self.height_field
+        usage = {
+            'surface': unique_nbytes([self.surface] if self.surface is not None else [], counted),
+            'detail_levels': unique_nbytes(levels.surfaces[1:], counted),
+            'surface_cache': unique_nbytes(self.surface_cache.entries.values(), counted),
+            'height_field': field.z_values.nbytes if field is not None and not isinstance(field.z_values, np.memmap)
+            else 0,
+            'terrain': self.terrain.current_bytes if self.terrain is not None else 0,
+            'meshes': sum(mesh.nbytes for mesh in levels.meshes),
+            'optimization_path': self.path_buffer.nbytes,
+            'populations': self.population_buffer.nbytes,
+        }
+        usage['total'] = sum(usage.values())
+        meshes = list(levels.meshes)
+        if self.terrain is not None:
+            meshes.extend(tile.mesh for tile in self.terrain.tiles.values())
+        usage['gpu'] = (sum(mesh.allocated_bytes for mesh in meshes) + self.path_buffer.gpu_buffer.allocated_bytes
+                        + sum(buffer.allocated_bytes for buffer in self.population_buffer.buffers))
+        return usage
 
     def build_objective_function_data(self):
+        self.cancel_surface_build()
         if self.current_function is None:
             return
-        x_values = np.linspace(-self.grid_size_x, self.grid_size_x, self.resolution)
-        y_values = np.linspace(-self.grid_size_y, self.grid_size_y, self.resolution)
-        z_values = np.full((len(x_values), len(y_values)), np.nan)
-        for i in range(len(x_values)):
-            for j in range(len(y_values)):
-                x = x_values[i]
-                y = y_values[j]
-                if self.constraints:
-                    valid = all(constraint(x, y) <= 0 for constraint in self.constraints)
-                else:
-                    valid = True
-                if valid:
-                    z_values[i, j] = self.current_function(x, y)
-        valid_z = z_values[~np.isnan(z_values)]
-        if len(valid_z) > 0:
-            self.z_min = np.min(valid_z)
-            self.z_max = np.max(valid_z)
+        objective, known_masks = self.cached_surface_parts()
+        surface = self.compose_surface(objective, known_masks)
+        if surface is None:
+            start = time.perf_counter()
+            surface = self.surface_build_steps(objective, known_masks)[-1]()
+            self.record_profile_event('surface_build', time.perf_counter() - start)
+            self.cache_surface(surface)
+        self.set_surface(surface)
+        self.complete_surface_settings = self.surface_settings()
+
+    def surface_settings(self):
+        # Everything the objective samples of a uniform grid depend on. Adaptive meshes are refined along
+        # the constraint boundaries, so they are never reused across constraint changes.
+        if self.tessellation_mode == 'adaptive':
+            return None
+        return (self.current_function, (-self.grid_size_x, self.grid_size_x),
+                (-self.grid_size_y, self.grid_size_y), self.resolution)
+
+    def current_surface_key(self):
+        # Uniform grids are cached as the bare objective plus one mask per constraint.
+        x_range = (-self.grid_size_x, self.grid_size_x)
+        y_range = (-self.grid_size_y, self.grid_size_y)
+        if self.tessellation_mode == 'adaptive':
+            detail = ('adaptive', self.adaptive_base_cells, self.adaptive_max_depth, self.adaptive_tolerance)
+            return surface_cache_key(self.current_function, self.constraints, x_range, y_range, detail)
+        return surface_cache_key(self.current_function, (), x_range, y_range, self.resolution)
+
+    def current_constraint_mask_key(self, constraint):
+        return constraint_mask_key(constraint, (-self.grid_size_x, self.grid_size_x),
+                                   (-self.grid_size_y, self.grid_size_y), self.resolution)
+
+    def cached_surface_parts(self):
+        surface = self.surface_cache.get(self.current_surface_key())
+        known_masks = {}
+        if self.tessellation_mode != 'adaptive':
+            for constraint in self.constraints:
+                mask = self.surface_cache.get(self.current_constraint_mask_key(constraint))
+                if mask is not None:
+                    known_masks[constraint] = mask
+        return surface, known_masks
+
+    def compose_surface(self, surface, known_masks):
+        # The complete surface from cached parts, or None when something still has to be sampled.
+        if surface is None or self.tessellation_mode == 'adaptive':
+            return surface
+        if len(known_masks) < len(self.constraints):
+            return None
+        return surface.with_constraint_masks(known_masks)
+
+    def cache_surface(self, surface):
+        if self.tessellation_mode == 'adaptive':
+            self.surface_cache.put(self.current_surface_key(), surface)
+            return
+        self.surface_cache.put(self.current_surface_key(), surface.objective())
+        for constraint, mask in surface.constraint_masks.items():
+            self.surface_cache.put(self.current_constraint_mask_key(constraint), mask)
+
+    def surface_build_steps(self, objective=None, known_masks=None):
+        x_range = (-self.grid_size_x, self.grid_size_x)
+        y_range = (-self.grid_size_y, self.grid_size_y)
+        if self.tessellation_mode == 'adaptive':
+            return adaptive_build_steps(self.current_function, self.constraints, x_range, y_range,
+                                        self.preview_resolution, self.adaptive_base_cells, self.adaptive_max_depth,
+                                        self.adaptive_tolerance)
+        return uniform_build_steps(self.current_function, self.constraints, x_range, y_range,
+                                   progressive_levels(self.resolution, self.preview_resolution), objective, known_masks)
+
+    def request_surface_build(self):
+        if self.update_batch_depth:
+            self.surface_build_pending = True
+            return
+        if not self.async_surface_builds:
+            self.build_objective_function_data()
+            return
+        self.cancel_surface_build()
+        if self.current_function is None:
+            return
+        self.surface_build_settings = self.surface_settings()
+        objective, known_masks = self.cached_surface_parts()
+        surface = self.compose_surface(objective, known_masks)
+        if surface is not None:
+            self.set_surface(surface)
+            self.complete_surface_settings = self.surface_build_settings
+            self.surface_build_progress.emit(1, 1, surface.resolution, 0.0)
+            self.surface_build_finished.emit(0.0)
+            return
+        self.surface_build_job = SurfaceBuildJob(self.surface_build_signals, self.surface_build_generation,
+                                                 self.surface_build_steps(objective, known_masks))
+        QThreadPool.globalInstance().start(self.surface_build_job)
+
+    def wait_for_surface(self, timeout=None):
+        # Blocks until the running build has shown its final surface or failed, delivering its queued
+        # signals meanwhile; returns False if that took longer than timeout seconds.
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while self.surface_build_job is not None:
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            QCoreApplication.processEvents()
+            time.sleep(0.001)
+        return True
+
+    def cancel_surface_build(self):
+        # Results of superseded jobs that are already queued are dropped by the generation check.
+        self.surface_build_generation += 1
+        self.complete_surface_settings = None
+        if self.surface_build_job is not None:
+            self.surface_build_job.cancel()
+            self.surface_build_job = None
+
+    def on_surface_level_ready(self, generation, surface, completed_levels, total_levels, elapsed):
+        if generation != self.surface_build_generation:
+            return
+        self.set_surface(surface)
+        self.surface_build_progress.emit(completed_levels, total_levels, surface.resolution, elapsed)
+        if completed_levels == total_levels:
+            self.cache_surface(surface)
+            self.complete_surface_settings = self.surface_build_settings
+            self.surface_build_job = None
+            self.record_profile_event('surface_build', elapsed)
+            self.surface_build_finished.emit(elapsed)
+        self.schedule_update()
+
+    def on_surface_build_failed(self, generation, error):
+        if generation != self.surface_build_generation:
+            return
+        self.surface_build_job = None
+        self.surface_build_failed.emit(error)
+
+    def set_surface(self, surface):
+        self.surface = surface
+        self.z_min, self.z_max = surface.z_min, surface.z_max
+        self.surface_levels.set_surface(surface)
+
+    def shaders_available(self):
+        if not self.use_shaders or self.surface_program_failed:
+            return False
+        if self.surface_program is None:
+            try:
+                self.surface_program = create_surface_program()
+            except (RuntimeError, OpenGL.error.Error) as error:
+                self.surface_program_failed = True
+                warnings.warn(f"Falling back to fixed-function surface rendering: {error}")
+                return False
+        return True
+
+    def update_surface_mesh(self, level=0):
+        shaded = self.shaders_available()
+        mesh = self.surface_levels.meshes[level]
+        if not self.surface_levels.dirty[level] and shaded == mesh.shaded:
+            return mesh
+        self.fill_surface_mesh(mesh, self.surface_levels.surfaces[level], shaded)
+        self.surface_levels.dirty[level] = False
+        return mesh
+
+    def fill_surface_mesh(self, mesh, surface, shaded, indices=None):
+        start = time.perf_counter()
+        if indices is None:
+            indices = surface.triangle_indices()
+        if shaded:
+            mesh.set_shaded_mesh(surface.raw_vertices(), surface.gradients(), indices)
         else:
-            self.z_min = 0
-            self.z_max = 1
-        shadow_strength = 0.6
-        self.objective_function_data = []
-        for i in range(len(x_values) - 1):
-            strip = []
-            for j in range(len(y_values)):
-                x1 = x_values[i]
-                x2 = x_values[i + 1]
-                y = y_values[j]
-                z1 = z_values[i, j]
-                z2 = z_values[i + 1, j]
-                z1_norm = (z1 - self.z_min) / (
-                        self.z_max - self.z_min) * 2 * self.grid_size_z - self.grid_size_z if not np.isnan(
-                    z1) else np.nan
-                z2_norm = (z2 - self.z_min) / (
-                        self.z_max - self.z_min) * 2 * self.grid_size_z - self.grid_size_z if not np.isnan(
-                    z2) else np.nan
-                if not np.isnan(z1):
-                    z1_shadow = ((z1 - self.z_min) / (self.z_max - self.z_min)) ** 0.5
-                    shadow_intensity1 = 1.0 - shadow_strength * (1.0 - z1_shadow)
-                    color1 = (((x1 + self.grid_size_x) / (2 * self.grid_size_x)) * shadow_intensity1,
-                              ((y + self.grid_size_y) / (2 * self.grid_size_y)) * shadow_intensity1,
-                              0.7 * shadow_intensity1)
-                else:
-                    color1 = (0, 0, 0)
-                if not np.isnan(z2):
-                    z2_shadow = ((z2 - self.z_min) / (self.z_max - self.z_min)) ** 0.5
-                    shadow_intensity2 = 1.0 - shadow_strength * (1.0 - z2_shadow)
-                    color2 = (((x2 + self.grid_size_x) / (2 * self.grid_size_x)) * shadow_intensity2,
-                              ((y + self.grid_size_y) / (2 * self.grid_size_y)) * shadow_intensity2,
-                              0.7 * shadow_intensity2)
-                else:
-                    color2 = (0, 0, 0)
-                strip.append(((x1, y, z1_norm), color1))
-                strip.append(((x2, y, z2_norm), color2))
-            self.objective_function_data.append(strip)
-        if 'function' in self.display_lists:
-            glDeleteLists(self.display_lists['function'], 1)
-            self.display_lists.pop('function')
+            mesh.set_mesh(surface.vertices(self.grid_size_z),
+                          surface.colors(self.grid_size_x, self.grid_size_y, self.colormap_lut), indices)
+        self.record_profile_event('mesh_build', time.perf_counter() - start)
+
+    def record_profile_event(self, name, seconds):
+        if self.profiler is not None:
+            self.profiler.record_event(name, seconds)
+
+    def is_interacting(self):
+        return self.is_rotating or self.is_moving or self.wheel_timer.isActive()
+
+    def surface_detail_level(self):
+        # While the view is dragged or zoomed, draw the finest level within the vertex budget and step
+        # down one level whenever an interactive frame overruns the frame budget.
+        if not self.interaction_lod or not self.is_interacting():
+            self.interaction_level = None
+            return 0
+        if self.interaction_level is None:
+            self.interaction_level = self.surface_levels.level_for_vertices(self.interaction_max_vertices)
+        elif self.last_paint_duration > self.frame_budget:
+            self.interaction_level = min(self.interaction_level + 1, len(self.surface_levels) - 1)
+        return self.interaction_level
+
+    def draw_shaded_surface(self, meshes):
+        program = self.surface_program
+        program.use()
+        program.set_float('z_min', self.z_min)
+        program.set_float('z_span', self.z_max - self.z_min if self.z_max != self.z_min else 1.0)
+        program.set_float('grid_size_z', self.grid_size_z)
+        program.set_float('grid_size', self.grid_size_x, self.grid_size_y)
+        program.set_float('shadow_strength', SHADOW_STRENGTH)
+        program.set_float('light_position', *LIGHT_POSITION)
+        program.set_float('ambient', AMBIENT)
+        program.set_float('diffuse', DIFFUSE)
+        program.set_int('use_colormap', self.colormap is not None)
+        if self.colormap is not None:
+            self.colormap_texture.bind(0)
+            program.set_int('colormap', 0)
+        for mesh in meshes:
+            mesh.draw_shaded()
+        if self.colormap is not None:
+            self.colormap_texture.unbind(0)
+        ShaderProgram.release_program()
+
+    # Picking
+
+    def pick(self, x, y):
+        # Casts a ray through widget pixel (x, y) and returns the (x, y, f(x, y)) surface point it hits first.
+        # Tiled terrain has no whole-field surface; its picker is built once from a downsampled one.
+        source = self.surface if self.surface is not None else self.height_field
+        if source is None or not self.has_surface_source():
+            return None
+        if self.picker_surface is not source:
+            surface = self.surface if self.surface is not None else self.height_field.surface()
+            self.picker = surface_picker(surface)
+            self.picker_surface = source
+        inverse = np.linalg.inv(self.projection_matrix() @ self.camera_matrix())
+        ndc_x = 2.0 * x / max(self.width(), 1) - 1.0
+        ndc_y = 1.0 - 2.0 * y / max(self.height(), 1)
+        near, far = (inverse @ (ndc_x, ndc_y, depth, 1.0) for depth in (-1.0, 1.0))
+        near, far = near[:3] / near[3], far[:3] / far[3]
+        # The picker works on raw function values, so undo the z normalization of the scene.
+        span = self.z_max - self.z_min if self.z_max != self.z_min else 1.0
+        scale = 2 * self.grid_size_z / span
+        origin = np.array((near[0], near[1], (near[2] + self.grid_size_z) / scale + self.z_min))
+        direction = np.array((far[0] - near[0], far[1] - near[1], (far[2] - near[2]) / scale))
+        hit = self.picker.pick(origin, direction)
+        if hit is None:
+            return None
+        hit_x, hit_y, hit_z = (float(value) for value in hit)
+        if self.current_function:
+            hit_z = float(evaluate_points(self.current_function, [hit_x], [hit_y])[0])
+        return hit_x, hit_y, hit_z
+
+    def emit_pick(self, signal, x, y):
+        if not self.picking_enabled:
+            return
+        hit = self.pick(x, y)
+        if hit is not None:
+            signal.emit(*hit)
+
+    # Offscreen rendering
+
+    def render_image(self, width, height):
+        # Renders the scene at any size without showing the widget; returns top-down (height, width, 4) RGBA bytes.
+        with OffscreenRenderer(self, width, height) as renderer:
+            return renderer.render()
+
+    def save_image(self, path, width, height):
+        write_image(path, self.render_image(width, height))
+
+    def export_camera_sweep(self, path_pattern, count, width, height, axis='z', degrees=360.0):
+        # path_pattern is formatted with the frame index, e.g. 'frames/sweep_{:04d}.png'. The view is
+        # restored afterwards.
+        attribute = f'rotation_{axis}'
+        angle = getattr(self, attribute)
+        try:
+            with OffscreenRenderer(self, width, height) as renderer:
+                return renderer.export_frames(camera_sweep(self, count, axis, degrees), path_pattern)
+        finally:
+            setattr(self, attribute, angle)
+
+    def export_timeline(self, path_pattern, width, height, step=1):
+        # One frame per step iterations of the history loaded with load_optimization_history.
+        if not self.timeline_active or len(self.path_buffer) == 0:
+            raise RuntimeError("No optimization history to export; load one with load_optimization_history")
+        position = self.timeline_position
+        try:
+            with OffscreenRenderer(self, width, height) as renderer:
+                return renderer.export_frames(timeline_frames(self, step), path_pattern)
+        finally:
+            self.seek_timeline(position)
+
+    # Work with tiled terrain
+
+    def draw_terrain(self):
+        terrain = self.terrain
+        terrain.release_retired()
+        camera = self.camera_matrix()
+        eye = np.linalg.inv(camera)[:3, 3]
+        pixels_per_radian = self.viewport_size()[1] / (2 * np.tan(np.radians(FIELD_OF_VIEW) / 2))
+        selected, missing = terrain.select_tiles(self.projection_matrix() @ camera, eye, pixels_per_radian,
+                                                 self.grid_size_z)
+        terrain.request_tiles(missing, self.start_terrain_tile_job)
+        terrain.evict()
+        shaded = self.shaders_available()
+        meshes = [self.update_terrain_mesh(terrain.tiles[key], shaded) for key in selected]
+        if shaded:
+            self.draw_shaded_surface(meshes)
+        else:
+            for mesh in meshes:
+                mesh.draw()
+
+    def update_terrain_mesh(self, tile, shaded):
+        # Fixed-function tiles bake normalized z and colors, so they are rebuilt when those settings change.
+        # The z range grows as tiles load, which also changes the normalization of tiles built before.
+        key = (True,) if shaded else (False, self.grid_size_x, self.grid_size_y, self.grid_size_z, self.colormap,
+                                      self.z_min, self.z_max)
+        if tile.mesh_key != key:
+            tile.surface.z_min, tile.surface.z_max = self.z_min, self.z_max
+            self.fill_surface_mesh(tile.mesh, tile.surface, shaded, tile.indices)
+            tile.mesh_key = key
+        return tile.mesh
+
+    def start_terrain_tile_job(self, key):
+        QThreadPool.globalInstance().start(TerrainTileJob(self.terrain_signals, self.terrain, key))
+
+    def on_terrain_tile_loaded(self, terrain, key, surface):
+        if terrain is not self.terrain:
+            return
+        if isinstance(surface, Exception):
+            warnings.warn(f"Failed to load terrain tile {key}: {surface}")
+        terrain.add_tile(key, surface)
+        self.update_terrain_z_range()
+        self.schedule_update()
+
+    def update_terrain_z_range(self):
+        field = self.height_field
+        self.z_min, self.z_max = (field.z_min, field.z_max) if field.has_z_range() else (0, 1)
+
+    def retire_terrain(self):
+        # The GPU buffers of a replaced terrain are released on the next paint, with the context current.
+        if self.terrain is not None:
+            self.retired_terrains.append(self.terrain)
+            self.terrain = None
+
+    def release_retired_terrains(self):
+        for terrain in self.retired_terrains:
+            terrain.release()
+        self.retired_terrains = []
+
+    def apply_z_transform(self):
+        # Maps raw function values to [-grid_size_z, grid_size_z] like normalize_z, so geometry stored
+        # with raw z never has to be rebuilt when the z range or grid_size_z changes.
+        span = self.z_max - self.z_min if self.z_max != self.z_min else 1.0
+        scale = 2 * self.grid_size_z / span
+        glTranslatef(0, 0, -self.z_min * scale - self.grid_size_z)
+        glScalef(1, 1, scale)
+
+    def update_surface_positions(self):
+        # The shader path normalizes z on the GPU and a dirty mesh is rebuilt before it is drawn anyway.
+        for surface, mesh in self.surface_levels.built_levels():
+            if not mesh.shaded:
+                mesh.set_positions(surface.vertices(self.grid_size_z))
+
+    def update_surface_colors(self):
+        for surface, mesh in self.surface_levels.built_levels():
+            if not mesh.shaded:
+                mesh.set_colors(surface.colors(self.grid_size_x, self.grid_size_y, self.colormap_lut))
 
     # Work with optimization path
 
     def draw_optimization_path(self):
-        if self.optimization_path.size == 0:
+        if len(self.path_buffer) == 0:
             return
 
-        points = np.array(self.optimization_path, dtype=np.float32)
-        z_values = np.zeros(len(points))
-
-        for i in range(len(points)):
-            z_values[i] = self.current_function(points[i, 0], points[i, 1])
-        z_norm = (z_values - self.z_min) / (self.z_max - self.z_min) * 2 * self.grid_size_z - self.grid_size_z
-        vertices = np.column_stack((points, z_norm)).astype(np.float32)
+        glPushMatrix()
+        if self.has_surface_source():
+            self.apply_z_transform()
 
+        first, count = self.visible_path_range()
         glPointSize(10)
         glColor3f(1, 0, 0)
-        glEnableClientState(GL_VERTEX_ARRAY)
-        glVertexPointer(3, GL_FLOAT, 0, vertices)
-        glDrawArrays(GL_POINTS, 0, len(vertices))
+        self.path_buffer.draw(GL_POINTS, first, count)
 
         if self.connect_optimization_points:
             glLineWidth(2)
-            glDrawArrays(GL_LINE_STRIP, 0, len(vertices))
-
-        glDisableClientState(GL_VERTEX_ARRAY)
+            self.path_buffer.draw(GL_LINE_STRIP, first, count)
 
-    def update_optimization_path(self, points):
-        self.optimization_path = points
-        self.update()
+        glPopMatrix()
 
-    ### Number rendering
+    @property
+    def optimization_path(self):
+        return self.path_buffer.view()[:, :2]
 
-    def render_number_0(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_1(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x, y + size / 2, z)
-        glVertex3f(x, y - size / 2, z)
-        glVertex3f(x - size / 4, y + size / 2, z)
-        glVertex3f(x, y + size / 2, z)
-        glEnd()
-
-    def render_number_2(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_3(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_4(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_5(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_6(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_7(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_8(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
-
-    def render_number_9(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y, z)
-        glEnd()
-
-    def render_number_minus(self, x, y, z, size):
-        glLineWidth(1.5)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y, z)
-        glVertex3f(x + size / 2, y, z)
-        glEnd()
+    def lift_points(self, points):
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        if self.current_function:
+            z_values = evaluate_points(self.current_function, points[:, 0], points[:, 1])
+        elif self.height_field is not None:
+            z_values = self.height_field.sample(points[:, 0], points[:, 1])
+        else:
+            z_values = np.zeros(len(points))
+        return np.column_stack((points, z_values))
 
-    def render_negative_number(self, x, y, z, number, size):
-        self.render_number_minus(x - size, y, z, size / 2)
-        self.render_number(x, y, z, abs(number), size)
+    def update_optimization_path(self, points):
+        self.path_buffer.clear()
+        self.append_optimization_points(points)
+
+    def append_optimization_points(self, points):
+        self.stop_timeline()
+        if np.size(points):
+            self.path_buffer.append(self.lift_points(points))
+        self.schedule_update()
+
+    def clear_optimization_path(self):
+        self.stop_timeline()
+        self.path_buffer.clear()
+        self.schedule_update()
+
+    def set_optimization_path_limit(self, max_length):
+        self.path_limit = max_length
+        if not self.timeline_active:
+            self.path_buffer.set_max_length(max_length)
+        self.schedule_update()
+
+    def get_optimization_path_limit(self):
+        return self.path_limit
+
+    def update_path_heights(self):
+        if len(self.path_buffer):
+            self.path_buffer.set_z(self.lift_points(self.optimization_path)[:, 2])
+
+    # Timeline playback
+
+    def load_optimization_history(self, points):
+        # Uploads a finished run once; playback and seeking afterwards only change the drawn range.
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        self.path_buffer.allocate(max(DEFAULT_PATH_CAPACITY, len(points)), None)
+        if len(points):
+            self.path_buffer.append(self.lift_points(points))
+        self.timeline_active = True
+        self.pause_timeline()
+        self.seek_timeline(len(points) - 1)
+
+    def visible_path_range(self):
+        length = len(self.path_buffer)
+        if not self.timeline_active:
+            return 0, length
+        stop = min(int(self.timeline_position) + 1, length)
+        first = max(stop - self.timeline_trail, 0) if self.timeline_trail else 0
+        return first, stop - first
+
+    def advance_timeline(self):
+        if not self.timeline_playing:
+            return
+        now = time.perf_counter()
+        last = len(self.path_buffer) - 1
+        position = min(self.timeline_position + (now - self.timeline_last_tick) * self.timeline_speed, last)
+        self.timeline_last_tick = now
+        self.set_timeline_position(position)
+        if position >= last:
+            self.pause_timeline()
+
+    def set_timeline_position(self, position):
+        previous = int(self.timeline_position)
+        self.timeline_position = position
+        if int(position) != previous:
+            self.timeline_position_changed.emit(int(position))
+
+    def play_timeline(self):
+        if not self.timeline_active or len(self.path_buffer) == 0:
+            return
+        if self.timeline_position >= len(self.path_buffer) - 1:
+            self.set_timeline_position(0.0)
+        self.timeline_playing = True
+        self.timeline_last_tick = time.perf_counter()
+        self.begin_animation('timeline')
+
+    def pause_timeline(self):
+        self.timeline_playing = False
+        self.end_animation('timeline')
+
+    def stop_timeline(self):
+        # Leaves timeline mode; the whole path is drawn again, cut back to the path limit.
+        self.pause_timeline()
+        if self.timeline_active and self.path_buffer.max_length != self.path_limit:
+            self.path_buffer.set_max_length(self.path_limit)
+        self.timeline_active = False
+
+    def seek_timeline(self, iteration):
+        if not self.timeline_active:
+            return
+        self.set_timeline_position(float(min(max(iteration, 0), max(len(self.path_buffer) - 1, 0))))
+        self.timeline_last_tick = time.perf_counter()
+        self.schedule_update()
+
+    def get_timeline_position(self):
+        return int(self.timeline_position)
+
+    def get_history_length(self):
+        return len(self.path_buffer)
+
+    def is_timeline_playing(self):
+        return self.timeline_playing
+
+    def set_playback_speed(self, iterations_per_second):
+        self.timeline_speed = iterations_per_second
+
+    def get_playback_speed(self):
+        return self.timeline_speed
+
+    def set_timeline_trail(self, length):
+        # Only the last length iterations up to the current one are drawn; None draws the run from the start.
+        self.timeline_trail = length
+        self.schedule_update()
+
+    def get_timeline_trail(self):
+        return self.timeline_trail
+
+    # Work with populations
+
+    def population_shaders_available(self):
+        if not self.use_shaders or self.population_program_failed:
+            return False
+        if self.population_program is None:
+            try:
+                self.population_program = create_population_program()
+            except (RuntimeError, OpenGL.error.Error) as error:
+                self.population_program_failed = True
+                warnings.warn(f"Falling back to uniform population point sizes: {error}")
+                return False
+        return True
+
+    def draw_populations(self):
+        count = self.population_buffer.generation_count
+        if count == 0:
+            return
+        visible = self.population_generations_visible
+        first = 0 if visible is None else max(count - visible, 0)
 
-    def render_number(self, x, y, z, number, size):
-        glPushMatrix()
-        glTranslatef(x, y, z)
         glPushMatrix()
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        glLoadIdentity()
-        glTranslatef(modelview[3][0], modelview[3][1], modelview[3][2])
-        scale = 0.5
-        glScalef(scale, scale, scale)
-        if number < 0:
-            self.render_negative_number(0, 0, 0, number, size)
+        if self.has_surface_source():
+            self.apply_z_transform()
+        if self.population_shaders_available():
+            self.population_program.use()
+            self.population_buffer.draw(first, count - 1, sized=True)
+            ShaderProgram.release_program()
         else:
-            digits = str(number)
-            total_width = len(digits) * size * 0.75
-            start_x = -total_width / 2 + size / 2
-            for digit in digits:
-                digit = int(digit)
-                if digit == 0:
-                    self.render_number_0(start_x, 0, 0, size)
-                elif digit == 1:
-                    self.render_number_1(start_x, 0, 0, size)
-                elif digit == 2:
-                    self.render_number_2(start_x, 0, 0, size)
-                elif digit == 3:
-                    self.render_number_3(start_x, 0, 0, size)
-                elif digit == 4:
-                    self.render_number_4(start_x, 0, 0, size)
-                elif digit == 5:
-                    self.render_number_5(start_x, 0, 0, size)
-                elif digit == 6:
-                    self.render_number_6(start_x, 0, 0, size)
-                elif digit == 7:
-                    self.render_number_7(start_x, 0, 0, size)
-                elif digit == 8:
-                    self.render_number_8(start_x, 0, 0, size)
-                elif digit == 9:
-                    self.render_number_9(start_x, 0, 0, size)
-                start_x += size * 0.75
-        glPopMatrix()
+            glPointSize(self.population_point_size)
+            self.population_buffer.draw(first, count - 1)
         glPopMatrix()
 
+    def add_population(self, points, colors=None, sizes=None, fitness=None):
+        # One generation of a swarm or evolutionary optimizer: points is (n, 2); colors is one RGB(A) color
+        # or one per member, sizes one or per-member point sizes in pixels, fitness optional values used
+        # for coloring when no colors are given. Returns the index of the generation.
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        sizes = self.population_point_size if sizes is None else sizes
+        colors = member_colors(len(points), colors, fitness, self.population_colormap_lut)
+        index = self.population_buffer.append(self.lift_points(points), colors, sizes, fitness)
+        self.schedule_update()
+        return index
+
+    def clear_populations(self):
+        self.population_buffer.clear()
+        self.schedule_update()
+
+    def get_population(self, index):
+        positions, fitness = self.population_buffer.generation(index)
+        return positions[:, :2].copy(), fitness.copy()
+
+    def get_population_count(self):
+        return self.population_buffer.generation_count
+
+    def set_visible_generations(self, count):
+        # None shows every generation submitted so far.
+        self.population_generations_visible = count
+        self.schedule_update()
+
+    def get_visible_generations(self):
+        return self.population_generations_visible
+
+    def set_population_point_size(self, size):
+        self.population_point_size = size
+        self.schedule_update()
+
+    def set_population_colormap(self, name):
+        self.population_colormap_lut = colormap_lut(name)
+
+    def update_population_heights(self):
+        buffer = self.population_buffer
+        if len(buffer):
+            buffer.set_z(self.lift_points(buffer.positions[:len(buffer), :2])[:, 2])
+
     ### Axis rendering
 
-    def render_axis_label(self, x, y, z, label, color=(0.0, 0.0, 0.0)):
+    def draw_axis_labels(self):
+        key = (self.grid_size_x, self.grid_size_y, self.grid_size_z, self.grid_step,
+               self.axis_ticks_and_numbers_visible)
+        if key != self.axis_labels.key:
+            self.axis_labels.build(key, *axis_label_layout(*key))
         glDisable(GL_LIGHTING)
-        glColor3f(*color)
-        glPushMatrix()
-        glTranslatef(x, y, z)
-        glPushMatrix()
-        modelview = glGetFloatv(GL_MODELVIEW_MATRIX)
-        glLoadIdentity()
-        glTranslatef(modelview[3][0], modelview[3][1], modelview[3][2])
-        scale = 0.5
-        glScalef(scale, scale, scale)
-        size = 0.5
-        if label == "X":
-            self.render_x_symbol(0, 0, 0, size)
-        elif label == "Y":
-            self.render_y_symbol(0, 0, 0, size)
-        elif label == "Z":
-            self.render_z_symbol(0, 0, 0, size)
-        glPopMatrix()
-        glPopMatrix()
+        glColor3f(0, 0, 0)
+        self.axis_labels.draw(self.camera_matrix())
         glEnable(GL_LIGHTING)
 
-    def render_x_symbol(self, x, y, z, size):
-        glLineWidth(2.0)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glEnd()
-
-    def render_y_symbol(self, x, y, z, size):
-        glLineWidth(2.0)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x, y, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x, y, z)
-        glVertex3f(x, y, z)
-        glVertex3f(x, y - size / 2, z)
-        glEnd()
-
-    def render_z_symbol(self, x, y, z, size):
-        glLineWidth(2.0)
-        glBegin(GL_LINES)
-        glVertex3f(x - size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x + size / 2, y + size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x - size / 2, y - size / 2, z)
-        glVertex3f(x + size / 2, y - size / 2, z)
-        glEnd()
+    def update_scene_geometry(self):
+        key = (self.grid_size_x, self.grid_size_y, self.grid_size_z, self.grid_step)
+        if key != self.scene_geometry.key:
+            self.scene_geometry.build(key, *key)
 
     def render_axes(self):
         if not self.axes_visible:
             return
 
+        self.update_scene_geometry()
         glDisable(GL_LIGHTING)
 
         glLineWidth(2)
-        glBegin(GL_LINES)
-
-        axis_extension = 0.2
-        glColor3f(1, 0, 0)
-        glVertex3f(-self.grid_size_x - axis_extension, 0, 0)
-        glVertex3f(self.grid_size_x + axis_extension, 0, 0)
-        glColor3f(0, 1, 0)
-        glVertex3f(0, -self.grid_size_y - axis_extension, 0)
-        glVertex3f(0, self.grid_size_y + axis_extension, 0)
-        glColor3f(0, 0, 1)
-        glVertex3f(0, 0, -self.grid_size_z - axis_extension)
-        glVertex3f(0, 0, self.grid_size_z + axis_extension)
-        glEnd()
+        self.scene_geometry.draw('axes')
 
         if self.axis_ticks_and_numbers_visible:
             self.render_axis_ticks()
 
-        offset = 0.3
-        self.render_axis_label(self.grid_size_x + offset, 0, 0, "X", (0, 0, 0))
-        self.render_axis_label(0, self.grid_size_y + offset, 0, "Y", (0, 0, 0))
-        self.render_axis_label(0, 0, self.grid_size_z + offset, "Z", (0, 0, 0))
+        self.draw_axis_labels()
         glLineWidth(1)
         glEnable(GL_LIGHTING)
 
@@ -522,155 +1065,105 @@ class Visualization3DWidget(QOpenGLWidget):
         if not self.axis_ticks_and_numbers_visible:
             return
 
+        self.update_scene_geometry()
         glDisable(GL_LIGHTING)
         glLineWidth(1.5)
-        tick_size = 0.2
-        label_offset = 0.3
-        label_size = 0.3
-
-        glColor3f(1, 0, 0)
-        glBegin(GL_LINES)
-        for i in range(-self.grid_size_x, self.grid_size_x + 1, self.grid_step):
-            if i != 0:
-                glVertex3f(i, -tick_size / 2, 0)
-                glVertex3f(i, tick_size / 2, 0)
-                glVertex3f(i, 0, -tick_size / 2)
-                glVertex3f(i, 0, tick_size / 2)
-        glEnd()
-
-        glColor3f(0, 0, 0)
-        for i in range(-self.grid_size_x, self.grid_size_x + 1, self.grid_step):
-            if i != 0:
-                self.render_number(i, -label_offset, 0, i, label_size)
-
-        glColor3f(0, 1, 0)
-        glBegin(GL_LINES)
-        for i in range(-self.grid_size_y, self.grid_size_y + 1, self.grid_step):
-            if i != 0:
-                glVertex3f(-tick_size / 2, i, 0)
-                glVertex3f(tick_size / 2, i, 0)
-                glVertex3f(0, i, -tick_size / 2)
-                glVertex3f(0, i, tick_size / 2)
-        glEnd()
-
-        glColor3f(0, 0, 0)
-        for i in range(-self.grid_size_y, self.grid_size_y + 1, self.grid_step):
-            if i != 0:
-                self.render_number(-label_offset, i, 0, i, label_size)
-
-        glColor3f(0, 0, 1)
-        glBegin(GL_LINES)
-        for i in range(-self.grid_size_z, self.grid_size_z + 1, self.grid_step):
-            if i != 0:
-                glVertex3f(-tick_size / 2, 0, i)
-                glVertex3f(tick_size / 2, 0, i)
-                glVertex3f(0, -tick_size / 2, i)
-                glVertex3f(0, tick_size / 2, i)
-        glEnd()
-
-        glColor3f(0, 0, 0)
-        for i in range(-self.grid_size_z, self.grid_size_z + 1, self.grid_step):
-            if i != 0:
-                self.render_number(0, -label_offset, i, i, label_size)
-
+        self.scene_geometry.draw('ticks')
         glEnable(GL_LIGHTING)
 
     def render_grid(self):
+        self.update_scene_geometry()
         glLineWidth(1)
-        glColor3f(0.7, 0.7, 0.7)
-        z_position = -self.grid_size_z
-        for i in range(-self.grid_size_x, self.grid_size_x + 1, self.grid_step):
-            glBegin(GL_LINES)
-            glVertex3f(i, -self.grid_size_y, z_position)
-            glVertex3f(i, self.grid_size_y, z_position)
-            glEnd()
-        for i in range(-self.grid_size_y, self.grid_size_y + 1, self.grid_step):
-            glBegin(GL_LINES)
-            glVertex3f(-self.grid_size_x, i, z_position)
-            glVertex3f(self.grid_size_x, i, z_position)
-            glEnd()
+        self.scene_geometry.draw('grid')
 
     # Work with constraints
 
     def draw_constraints(self):
+        self.update_constraint_boundaries()
         glDisable(GL_LIGHTING)
         glColor3f(1, 0, 0)
         glLineWidth(2)
 
-        for constraint in self.constraints:
-            self.draw_constraint_boundary(constraint)
+        glPushMatrix()
+        if self.has_surface_source():
+            self.apply_z_transform()
+        draw_vertex_buffer(self.constraint_boundary_lines, GL_LINES)
+        glPopMatrix()
 
         glEnable(GL_LIGHTING)
 
-    def draw_constraint_boundary(self, constraint):
-        x = np.linspace(-self.grid_size_x, self.grid_size_x, self.resolution)
-        y = np.linspace(-self.grid_size_y, self.grid_size_y, self.resolution)
-        X, Y = np.meshgrid(x, y)
-        Z = np.zeros_like(X)
-
-        for i in range(self.resolution):
-            for j in range(self.resolution):
-                Z[i, j] = constraint(X[i, j], Y[i, j])
-        glBegin(GL_LINES)
-
-        for i in range(self.resolution - 1):
-            for j in range(self.resolution - 1):
-                edges = []
-                if Z[i, j] * Z[i + 1, j] <= 0:
-                    t = abs(Z[i, j]) / (abs(Z[i, j]) + abs(Z[i + 1, j])) if abs(Z[i, j]) + abs(Z[i + 1, j]) > 0 else 0.5
-                    x0 = X[i, j] + t * (X[i + 1, j] - X[i, j])
-                    y0 = Y[i, j]
-                    edges.append((x0, y0))
-                if Z[i + 1, j] * Z[i + 1, j + 1] <= 0:
-                    t = abs(Z[i + 1, j]) / (abs(Z[i + 1, j]) + abs(Z[i + 1, j + 1])) if abs(Z[i + 1, j]) + abs(
-                        Z[i + 1, j + 1]) > 0 else 0.5
-                    x0 = X[i + 1, j]
-                    y0 = Y[i + 1, j] + t * (Y[i + 1, j + 1] - Y[i + 1, j])
-                    edges.append((x0, y0))
-                if Z[i, j + 1] * Z[i + 1, j + 1] <= 0:
-                    t = abs(Z[i, j + 1]) / (abs(Z[i, j + 1]) + abs(Z[i + 1, j + 1])) if abs(Z[i, j + 1]) + abs(
-                        Z[i + 1, j + 1]) > 0 else 0.5
-                    x0 = X[i, j + 1] + t * (X[i + 1, j + 1] - X[i, j + 1])
-                    y0 = Y[i, j + 1]
-                    edges.append((x0, y0))
-                if Z[i, j] * Z[i, j + 1] <= 0:
-                    t = abs(Z[i, j]) / (abs(Z[i, j]) + abs(Z[i, j + 1])) if abs(Z[i, j]) + abs(Z[i, j + 1]) > 0 else 0.5
-                    x0 = X[i, j]
-                    y0 = Y[i, j] + t * (Y[i, j + 1] - Y[i, j])
-                    edges.append((x0, y0))
-                if len(edges) >= 2:
-                    for k in range(len(edges) - 1):
-                        x0, y0 = edges[k]
-                        x1, y1 = edges[k + 1]
-                        if self.current_function:
-                            z0 = self.current_function(x0, y0)
-                            z1 = self.current_function(x1, y1)
-                            z0_norm = (z0 - self.z_min) / (
-                                        self.z_max - self.z_min) * 2 * self.grid_size_z - self.grid_size_z
-                            z1_norm = (z1 - self.z_min) / (
-                                        self.z_max - self.z_min) * 2 * self.grid_size_z - self.grid_size_z
-                        else:
-                            z0_norm = z1_norm = 0
-                        glVertex3f(x0, y0, z0_norm)
-                        glVertex3f(x1, y1, z1_norm)
-        glEnd()
+    def update_constraint_boundaries(self):
+        x_range = (-self.grid_size_x, self.grid_size_x)
+        y_range = (-self.grid_size_y, self.grid_size_y)
+        key = (self.current_function, self.height_field, tuple(self.constraints), x_range, y_range, self.resolution)
+        if key == self.constraint_boundary_key:
+            return
+        constraint_segments = {}
+        for constraint in self.constraints:
+            segments_key = (constraint, x_range, y_range, self.resolution)
+            segments = self.constraint_segments.get(segments_key)
+            if segments is None:
+                segments = constraint_boundary_segments(constraint, x_range, y_range, self.resolution)
+            constraint_segments[segments_key] = segments
+        self.constraint_segments = constraint_segments
+
+        points = np.concatenate([np.empty((0, 2))] +
+                                [segments.reshape(-1, 2) for segments in constraint_segments.values()])
+        self.constraint_boundary_lines.set_data(self.lift_points(points).astype(np.float32))
+        self.constraint_boundary_key = key
+
+    def surface_reusable(self):
+        # True when the current surface is a complete grid of the current objective, so constraint
+        # changes only need masks.
+        settings = self.surface_settings()
+        return settings is not None and settings == self.complete_surface_settings
+
+    def surface_constraint_mask(self, constraint):
+        key = self.current_constraint_mask_key(constraint)
+        mask = self.surface_cache.get(key)
+        if mask is None:
+            mask = pack_mask(single_constraint_mask(constraint, *self.surface.grid()))
+            self.surface_cache.put(key, mask)
+        return mask
 
     def add_constraint(self, constraint_func):
         if constraint_func not in self.constraints:
             self.constraints.append(constraint_func)
-            self.build_objective_function_data()
-            self.update()
+            if self.surface_reusable():
+                self.set_surface(self.surface.with_constraint(constraint_func,
+                                                              self.surface_constraint_mask(constraint_func)))
+            else:
+                self.request_surface_build()
+            self.schedule_update()
+
+    def remove_constraint(self, constraint_func):
+        if constraint_func in self.constraints:
+            self.constraints.remove(constraint_func)
+            if self.surface_reusable():
+                self.set_surface(self.surface.without_constraint(constraint_func))
+            else:
+                self.request_surface_build()
+            self.schedule_update()
+
+    def add_constraint_expression(self, source):
+        # e.g. "x**2 + y**2 <= 4"; raises ValueError for anything outside the expression grammar.
+        constraint = compile_constraint_expression(source)
+        self.add_constraint(constraint)
+        return constraint
 
     def clear_constraints(self):
         self.constraints.clear()
-        self.build_objective_function_data()
-        self.update()
+        if self.surface_reusable():
+            self.set_surface(self.surface.with_constraint_masks({}))
+        else:
+            self.request_surface_build()
+        self.schedule_update()
 
     # Overridden methods
 
     def mousePressEvent(self, event):
-        self.mouse_last_x = event.x()
-        self.mouse_last_y = event.y()
+        self.mouse_last_x = self.mouse_press_x = event.x()
+        self.mouse_last_y = self.mouse_press_y = event.y()
 
         if event.modifiers() & Qt.ControlModifier:
             self.is_moving = True
@@ -681,9 +1174,14 @@ class Visualization3DWidget(QOpenGLWidget):
         delta = event.angleDelta().y() / 120
         self.zoom_level -= delta
         self.zoom_level = max(5, min(self.zoom_level, 50))
-        self.update()
+        self.wheel_timer.start()
+        self.schedule_update()
 
     def mouseMoveEvent(self, event):
+        if not self.is_rotating and not self.is_moving:
+            # Only reached with mouse tracking, i.e. when picking is enabled; hovering needs no repaint.
+            self.emit_pick(self.point_hovered, event.x(), event.y())
+            return
         dx, dy = event.x() - self.mouse_last_x, event.y() - self.mouse_last_y
 
         if self.is_rotating:
@@ -698,44 +1196,193 @@ class Visualization3DWidget(QOpenGLWidget):
             self.position_y -= dy * movement_speed
 
         self.mouse_last_x, self.mouse_last_y = event.x(), event.y()
-        self.update()
+        self.schedule_update()
 
     def mouseReleaseEvent(self, event):
         self.is_rotating = False
         self.is_moving = False
+        if (self.picking_enabled and abs(event.x() - self.mouse_press_x) <= CLICK_TOLERANCE
+                and abs(event.y() - self.mouse_press_y) <= CLICK_TOLERANCE):
+            self.emit_pick(self.point_clicked, event.x(), event.y())
+        if self.interaction_level:
+            self.schedule_update()
+
+    # Batched updates
+
+    @contextmanager
+    def batch_update(self):
+        # Setters called inside the block only record that the surface is stale; it is rebuilt once
+        # when the outermost block exits.
+        self.update_batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.update_batch_depth -= 1
+            if self.update_batch_depth == 0 and self.surface_build_pending:
+                self.surface_build_pending = False
+                self.request_surface_build()
+
+    def configure(self, **settings):
+        # configure(grid_size_x=5, resolution=500, function=f) calls the matching setters in order.
+        setters = {}
+        for name in settings:
+            setter = getattr(self, f'set_{name}', None)
+            if setter is None:
+                raise TypeError(f"Unknown setting '{name}'")
+            setters[name] = setter
+        with self.batch_update():
+            for name, value in settings.items():
+                setters[name](value)
 
     # Setters & Getters
 
     def set_connect_optimization_points(self, connect):
         self.connect_optimization_points = connect
-        self.update()
+        self.schedule_update()
+
+    def set_function_expression(self, source):
+        # e.g. "x**2 + 10*sin(y)"; compiled once into NumPy code, raises ValueError if it does not parse.
+        function = compile_expression(source)
+        self.set_function(function)
+        return function
+
+    def has_surface_source(self):
+        return bool(self.current_function) or self.height_field is not None
 
     def set_function(self, func):
         self.current_function = func
-        self.build_objective_function_data()
-        self.update()
+        self.height_field = None
+        self.retire_terrain()
+        self.update_path_heights()
+        self.update_population_heights()
+        self.request_surface_build()
+        self.schedule_update()
+
+    def set_surface_data(self, z_values, x_range, y_range, mask=None, max_resolution=DEFAULT_HEIGHT_FIELD_RESOLUTION,
+                         z_range=None):
+        # Shows a precomputed height field instead of sampling a function; mask marks feasible points and
+        # z_range, if known, saves a pass over the array.
+        self.cancel_surface_build()
+        self.current_function = None
+        self.retire_terrain()
+        self.height_field = HeightField(z_values, x_range, y_range, mask, z_range)
+        self.set_surface(self.height_field.surface(max_resolution))
+        self.update_path_heights()
+        self.update_population_heights()
+        self.schedule_update()
+
+    def set_tiled_surface_data(self, z_values, x_range, y_range, mask=None, tile_size=DEFAULT_TILE_SIZE,
+                               budget_bytes=DEFAULT_TILE_BUDGET_BYTES, z_range=None):
+        # Like set_surface_data, but pages tiles of the array in and out as the view moves instead of
+        # holding one mesh of the whole grid. The array is never scanned on this thread: without z_range
+        # the height range starts from the root tile and grows as finer tiles load.
+        self.cancel_surface_build()
+        self.current_function = None
+        self.retire_terrain()
+        self.height_field = HeightField(z_values, x_range, y_range, mask, z_range, scan_range=False)
+        self.terrain = TiledTerrain(self.height_field, tile_size, budget_bytes)
+        self.surface = None
+        self.update_terrain_z_range()
+        self.update_path_heights()
+        self.update_population_heights()
+        self.schedule_update()
+
+    def get_surface_data(self):
+        return self.height_field
+
+    def set_terrain_budget(self, budget_bytes):
+        if self.terrain is not None:
+            self.terrain.set_budget_bytes(budget_bytes)
+            self.schedule_update()
+
+    def get_terrain_stats(self):
+        return self.terrain.stats() if self.terrain is not None else None
+
+    def set_colormap(self, name):
+        self.colormap_lut = colormap_lut(name) if name else None
+        self.colormap = name or None
+        if self.colormap_lut is not None:
+            self.colormap_texture.set_lut(self.colormap_lut)
+        self.update_surface_colors()
+        self.schedule_update()
+
+    def get_colormap(self):
+        return self.colormap
+
+    def set_use_shaders(self, use_shaders):
+        self.use_shaders = use_shaders
+        self.schedule_update()
+
+    def get_use_shaders(self):
+        return self.use_shaders
+
+    def set_interaction_lod(self, enabled, max_vertices=None, frame_budget=None):
+        self.interaction_lod = enabled
+        if max_vertices is not None:
+            self.interaction_max_vertices = max_vertices
+        if frame_budget is not None:
+            self.frame_budget = frame_budget
+
+    def get_interaction_lod(self):
+        return self.interaction_lod
+
+    def set_picking_enabled(self, enabled):
+        # Hover picking needs move events without a pressed button.
+        self.picking_enabled = enabled
+        self.setMouseTracking(enabled)
+
+    def get_picking_enabled(self):
+        return self.picking_enabled
+
+    def set_profiling_enabled(self, enabled, window=DEFAULT_PROFILE_WINDOW):
+        # Per-stage CPU and GPU frame times, build times and function evaluations; see get_frame_stats().
+        if enabled and self.profiler is None:
+            self.profiler = FrameProfiler(window)
+        elif not enabled and self.profiler is not None:
+            if self.context() is not None:
+                self.makeCurrent()
+                self.profiler.release()
+                self.doneCurrent()
+            self.profiler = None
+            self.profile_overlay_visible = False
+        self.schedule_update()
+
+    def get_profiling_enabled(self):
+        return self.profiler is not None
+
+    def set_profile_overlay_visible(self, visible):
+        if visible:
+            self.set_profiling_enabled(True)
+        self.profile_overlay_visible = visible
+        self.schedule_update()
+
+    def get_profile_overlay_visible(self):
+        return self.profile_overlay_visible
+
+    def get_frame_stats(self):
+        return self.profiler.stats() if self.profiler is not None else None
 
     def set_show_constraints(self, show):
         self.show_constraints = show
-        self.update()
+        self.schedule_update()
 
     def set_axes_visible(self, show):
         self.axes_visible = show
-        self.update()
+        self.schedule_update()
 
     def get_axes_visible(self):
         return self.axes_visible
 
     def set_axis_ticks_and_numbers_visible(self, show):
         self.axis_ticks_and_numbers_visible = show
-        self.update()
+        self.schedule_update()
 
     def get_axis_ticks_and_numbers_visible(self):
         return self.axis_ticks_and_numbers_visible
 
     def set_grid_visible(self, show):
         self.grid_visible = show
-        self.update()
+        self.schedule_update()
 
     def get_grid_visible(self):
         return self.grid_visible
@@ -751,26 +1398,73 @@ class Visualization3DWidget(QOpenGLWidget):
 
     def set_grid_size_x(self, size_x):
         self.grid_size_x = size_x
-        self.build_objective_function_data()
-        self.update()
+        self.request_surface_build()
+        self.schedule_update()
 
     def set_grid_size_y(self, size_y):
         self.grid_size_y = size_y
-        self.build_objective_function_data()
-        self.update()
+        self.request_surface_build()
+        self.schedule_update()
 
     def set_grid_size_z(self, size_z):
         self.grid_size_z = size_z
-        self.build_objective_function_data()
-        self.update()
+        self.update_surface_positions()
+        self.schedule_update()
+
+    def set_surface_cache_size(self, max_bytes):
+        self.surface_cache.set_max_bytes(max_bytes)
+
+    def get_surface_cache_stats(self):
+        return self.surface_cache.stats()
+
+    def clear_surface_cache(self):
+        self.surface_cache.clear()
 
     def get_resolution(self):
         return self.resolution
 
     def set_resolution(self, resolution):
         self.resolution = resolution
-        self.build_objective_function_data()
-        self.update()
+        self.request_surface_build()
+        self.schedule_update()
+
+    def set_async_surface_builds(self, enabled):
+        self.async_surface_builds = enabled
+        if not enabled:
+            self.wait_for_surface()
+
+    def get_async_surface_builds(self):
+        return self.async_surface_builds
+
+    def set_tessellation_mode(self, mode):
+        if mode not in TESSELLATION_MODES:
+            raise ValueError(f"Unknown tessellation mode '{mode}', expected one of {list(TESSELLATION_MODES)}")
+        self.tessellation_mode = mode
+        self.request_surface_build()
+        self.schedule_update()
+
+    def get_tessellation_mode(self):
+        return self.tessellation_mode
+
+    def set_adaptive_tessellation(self, tolerance=None, base_cells=None, max_depth=None):
+        # tolerance is relative to the z range of the surface; the finest cells are
+        # 1 / (base_cells * 2 ** max_depth) of the plotted area wide.
+        if tolerance is not None:
+            self.adaptive_tolerance = tolerance
+        if base_cells is not None:
+            self.adaptive_base_cells = base_cells
+        if max_depth is not None:
+            self.adaptive_max_depth = max_depth
+        if self.tessellation_mode == 'adaptive':
+            self.request_surface_build()
+            self.schedule_update()
+
+    def get_adaptive_tessellation(self):
+        return {
+            'tolerance': self.adaptive_tolerance,
+            'base_cells': self.adaptive_base_cells,
+            'max_depth': self.adaptive_max_depth,
+        }
 
     def get_x_axis_range(self):
         return [-self.grid_size_x, self.grid_size_x]